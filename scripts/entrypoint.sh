@@ -4,6 +4,9 @@
 
 set -e
 
+# 启动开始时间（用于launcher.setup span）
+LAUNCH_START_NS=$(date +%s%N)
+
 # 颜色输出
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -37,13 +40,14 @@ THINKING_MODE=${1:-${THINKING_MODE:-fast}}
 echo -e "${GREEN}Running mode: ${THINKING_MODE}${NC}"
 
 # 验证模式
-if [[ "$THINKING_MODE" != "fast" && "$THINKING_MODE" != "slow" ]]; then
-    echo -e "${RED}Invalid mode: ${THINKING_MODE}. Must be 'fast' or 'slow'${NC}"
+if [[ "$THINKING_MODE" != "fast" && "$THINKING_MODE" != "slow" && "$THINKING_MODE" != "quant" ]]; then
+    echo -e "${RED}Invalid mode: ${THINKING_MODE}. Must be 'fast', 'slow' or 'quant'${NC}"
     exit 1
 fi
 
-# 检查模型是否存在
-MODEL_PATH=${MODEL_PATH:-/models/qwen3-0.6b}
+# 检查模型是否存在（默认使用配置文件中的模型路径）
+DEFAULT_MODEL_PATH=$(grep -m1 -E '^\s+path:' "/workspace/config/${THINKING_MODE}_mode.yaml" 2>/dev/null | awk '{print $2}' | tr -d '"')
+MODEL_PATH=${MODEL_PATH:-${DEFAULT_MODEL_PATH:-/models/qwen3-0.6b}}
 echo -e "${YELLOW}Checking model path: ${MODEL_PATH}${NC}"
 
 if [ ! -d "$MODEL_PATH" ]; then
@@ -79,20 +83,58 @@ echo -e "${GREEN}Configuration:${NC}"
 cat "$CONFIG_FILE" | grep -E "max_model_len|max_num_seqs|temperature" || true
 echo -e "${GREEN}================================================${NC}"
 
+# 并行配置（run.sh传入的环境变量优先，否则按配置文件解析）
+if [ -n "${TENSOR_PARALLEL_SIZE}" ]; then
+    PARALLEL_ARGS=(--tensor-parallel-size "${TENSOR_PARALLEL_SIZE}")
+    if [ "${PIPELINE_PARALLEL_SIZE:-1}" -gt 1 ]; then
+        PARALLEL_ARGS+=(--pipeline-parallel-size "${PIPELINE_PARALLEL_SIZE}")
+    fi
+else
+    PARALLEL_OUTPUT=$(python /workspace/src/server.py --mode "${THINKING_MODE}" --parallel-args --log-level ERROR)
+    mapfile -t PARALLEL_ARGS <<< "${PARALLEL_OUTPUT}"
+fi
+echo -e "${GREEN}Visible devices: ${ASCEND_RT_VISIBLE_DEVICES:-all} (${PARALLEL_ARGS[*]})${NC}"
+
+# 量化配置
+QUANTIZATION=$(grep -E '^\s+quantization:' "$CONFIG_FILE" | awk '{print $2}' | tr -d '"')
+QUANT_ARGS=()
+if [ -n "$QUANTIZATION" ] && [ "$QUANTIZATION" != "null" ]; then
+    QUANT_ARGS=(--quantization "${QUANTIZATION}")
+    echo -e "${GREEN}Quantization: ${QUANTIZATION}${NC}"
+fi
+
+# 投机解码配置
+SPEC_ARGS=()
+SPEC_OUTPUT=$(python /workspace/src/server.py --mode "${THINKING_MODE}" --speculative-args --log-level ERROR)
+if [ -n "$SPEC_OUTPUT" ]; then
+    mapfile -t SPEC_ARGS <<< "${SPEC_OUTPUT}"
+    echo -e "${GREEN}Speculative decoding: ${SPEC_ARGS[*]}${NC}"
+fi
+
 # 启动服务器
 echo -e "${GREEN}Starting vLLM server...${NC}"
 
+VLLM_ARGS=(
+    --model "${MODEL_PATH}"
+    --device npu
+    --host 0.0.0.0
+    --port 8000
+    --max-model-len "$(grep max_model_len "$CONFIG_FILE" | awk '{print $2}')"
+    --max-num-seqs "$(grep max_num_seqs "$CONFIG_FILE" | awk '{print $2}')"
+    --dtype bfloat16
+    --gpu-memory-utilization 0.85
+    --enable-prefix-caching
+    --disable-log-requests
+    "${PARALLEL_ARGS[@]}"
+    "${QUANT_ARGS[@]}"
+    "${SPEC_ARGS[@]}"
+    "$@"
+)
+
+# 启用tracing时记录启动span（失败不影响启动）
+python /workspace/src/server.py --mode "${THINKING_MODE}" --log-level ERROR \
+    --trace-launch "${VLLM_ARGS[*]}" --launch-start-ns "${LAUNCH_START_NS}" || true
+
 # 使用Python启动服务器
 cd /workspace
-python -m vllm.entrypoints.openai.api_server \
-    --model "${MODEL_PATH}" \
-    --device npu \
-    --host 0.0.0.0 \
-    --port 8000 \
-    --max-model-len $(grep max_model_len "$CONFIG_FILE" | awk '{print $2}') \
-    --max-num-seqs $(grep max_num_seqs "$CONFIG_FILE" | awk '{print $2}') \
-    --dtype bfloat16 \
-    --gpu-memory-utilization 0.85 \
-    --enable-prefix-caching \
-    --disable-log-requests \
-    "$@"
+python -m vllm.entrypoints.openai.api_server "${VLLM_ARGS[@]}"
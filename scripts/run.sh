@@ -17,14 +17,21 @@ IMAGE_TAG=${IMAGE_TAG:-"v0.1"}
 CONTAINER_NAME_PREFIX=${CONTAINER_NAME_PREFIX:-"vllm"}
 MODEL_PATH=${MODEL_PATH:-"$(pwd)/models"}
 PORT=${PORT:-8000}
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(dirname "${SCRIPT_DIR}")"
+
+# 并行拓扑覆盖（默认使用配置文件中的设置）
+DEVICES=${DEVICES:-""}        # 例如 "0,1"
+TP_SIZE=${TP_SIZE:-""}        # 张量并行规模
+PP_SIZE=${PP_SIZE:-""}        # 流水线并行规模
 
 # 获取运行模式
 MODE=${1:-"fast"}
 
 # 验证模式
-if [[ "$MODE" != "fast" && "$MODE" != "slow" ]]; then
-    echo -e "${RED}Error: Invalid mode '${MODE}'. Must be 'fast' or 'slow'${NC}"
-    echo "Usage: $0 [fast|slow]"
+if [[ "$MODE" != "fast" && "$MODE" != "slow" && "$MODE" != "quant" ]]; then
+    echo -e "${RED}Error: Invalid mode '${MODE}'. Must be 'fast', 'slow' or 'quant'${NC}"
+    echo "Usage: $0 [fast|slow|quant]"
     exit 1
 fi
 
@@ -62,6 +69,39 @@ if [ ! -d "$MODEL_PATH" ]; then
     echo -e "${YELLOW}Example: huggingface-cli download Qwen/Qwen3-0.6B --local-dir ${MODEL_PATH}/qwen3-0.6b${NC}"
 fi
 
+# 根据配置生成设备挂载、设备可见性和HCCL环境变量，并提前验证拓扑
+TOPOLOGY_ARGS=(--mode "${MODE}" --docker-args)
+[ -n "$DEVICES" ] && TOPOLOGY_ARGS+=(--devices "${DEVICES}")
+[ -n "$TP_SIZE" ] && TOPOLOGY_ARGS+=(--tensor-parallel-size "${TP_SIZE}")
+[ -n "$PP_SIZE" ] && TOPOLOGY_ARGS+=(--pipeline-parallel-size "${PP_SIZE}")
+
+# 拓扑解析在宿主机上运行 src/server.py，需要python3和PyYAML
+if ! command -v python3 &> /dev/null; then
+    echo -e "${RED}Error: python3 is required on the host to resolve the device topology${NC}"
+    exit 1
+fi
+if ! python3 -c "import yaml" &> /dev/null; then
+    echo -e "${RED}Error: PyYAML is required on the host to read the mode config${NC}"
+    echo -e "${YELLOW}Install it with: pip3 install pyyaml${NC}"
+    exit 1
+fi
+CONFIG_FILE="${PROJECT_DIR}/config/${MODE}_mode.yaml"
+if [ ! -f "$CONFIG_FILE" ]; then
+    echo -e "${RED}Error: Config file not found: ${CONFIG_FILE}${NC}"
+    exit 1
+fi
+
+if ! DOCKER_DEVICE_OUTPUT=$(python3 "${PROJECT_DIR}/src/server.py" "${TOPOLOGY_ARGS[@]}" --log-level ERROR 2> /tmp/vllm-topology-$$.log); then
+    echo -e "${RED}Error: Invalid device topology for mode '${MODE}'${NC}"
+    sed 's/^.* - ERROR - /  /' /tmp/vllm-topology-$$.log >&2
+    rm -f /tmp/vllm-topology-$$.log
+    exit 1
+fi
+rm -f /tmp/vllm-topology-$$.log
+mapfile -t DOCKER_DEVICE_ARGS <<< "${DOCKER_DEVICE_OUTPUT}"
+
+echo -e "${GREEN}Devices: $(printf '%s\n' "${DOCKER_DEVICE_ARGS[@]}" | grep -o 'davinci[0-9]\+' | tr '\n' ' ')${NC}"
+
 # 检查是否已有同名容器运行
 if docker ps -a --format '{{.Names}}' | grep -q "^${CONTAINER_NAME}$"; then
     echo -e "${YELLOW}Container ${CONTAINER_NAME} already exists${NC}"
@@ -83,14 +123,10 @@ echo ""
 
 docker run -d \
     --name "${CONTAINER_NAME}" \
-    --device=/dev/davinci0 \
-    --device=/dev/davinci_manager \
-    --device=/dev/devmm_svm \
-    --device=/dev/hisi_hdc \
+    "${DOCKER_DEVICE_ARGS[@]}" \
     -v /usr/local/Ascend/driver:/usr/local/Ascend/driver:ro \
     -v "${MODEL_PATH}:/models:ro" \
     -e THINKING_MODE="${MODE}" \
-    -e ASCEND_DEVICE_ID=0 \
     -p "${PORT}:8000" \
     --restart unless-stopped \
     --shm-size=16g \
@@ -0,0 +1,904 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SLO-driven autoscaler for vLLM-Ascend
+基于SLO的引擎副本自动扩缩容
+
+周期性读取各副本 /metrics 中的等待队列长度、TTFT p95 和KV Cache使用率：
+  - 任一指标连续 scale_up_windows 次超过扩容阈值时，在空闲NPU上启动新副本
+  - 全部指标连续 scale_down_windows 次低于缩容阈值时，移除最新的副本
+  - 两组阈值之间为滞回区间，扩缩容后各自有冷却时间，避免抖动
+
+新副本健康检查通过并完成预热请求后才加入路由；缩容的副本先从路由中
+摘除，等待在途请求完成后再停止。run.sh 启动的原始副本不会被移除。
+
+网关启用 autoscaler 段时在后台运行控制器；本模块的命令行入口使用
+模拟后端和虚拟时钟回放负载曲线，无需NPU即可验证扩缩容策略。
+"""
+
+import sys
+import asyncio
+import argparse
+import logging
+import time
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import aiohttp
+
+from utils import (
+    load_config,
+    get_config_path,
+    parse_thinking_mode,
+    parse_device_list,
+    resolve_parallel_config,
+    build_parallel_env,
+    build_device_mounts,
+    parse_prometheus_metrics,
+    metric_total,
+    histogram_buckets,
+    histogram_quantile,
+    THINKING_MODES,
+    QUEUE_METRIC,
+    RUNNING_METRIC,
+    KV_USAGE_METRIC,
+    TTFT_METRIC,
+    TTFT_BUCKETS,
+)
+
+# 配置日志
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# 副本状态
+REPLICA_STARTING = "starting"
+REPLICA_WARMING = "warming"
+REPLICA_READY = "ready"
+REPLICA_DRAINING = "draining"
+
+WARMUP_PROMPT = "你好"
+
+
+def format_signals(signals: Dict[str, Optional[float]]) -> str:
+    """格式化扩缩容指标，用于日志"""
+    def fmt(value, pattern):
+        return "n/a" if value is None else pattern.format(value)
+
+    return (
+        f"queue_depth={fmt(signals.get('queue_depth'), '{:.1f}')}, "
+        f"ttft_p95={fmt(signals.get('ttft_p95'), '{:.3f}s')}, "
+        f"kv_usage={fmt(signals.get('kv_usage'), '{:.1%}')}"
+    )
+
+
+class Replica:
+    """引擎副本"""
+
+    def __init__(self, name: str, url: str, devices: List[int], managed: bool = True):
+        """
+        Args:
+            name: 副本名称（Docker后端即容器名）
+            url: 副本API地址
+            devices: 占用的NPU设备
+            managed: 是否由控制器启动和移除
+        """
+        self.name = name
+        self.url = url
+        self.devices = devices
+        self.managed = managed
+        self.state = REPLICA_STARTING
+        self.state_since = 0.0
+        self.last_buckets: Optional[Dict[float, float]] = None
+        self.in_flight: Optional[float] = None
+
+    def set_state(self, state: str, now: float) -> None:
+        self.state = state
+        self.state_since = now
+
+    def __repr__(self) -> str:
+        return f"Replica({self.name}, {self.state}, devices={self.devices})"
+
+
+class ScalingPolicy:
+    """带滞回和冷却时间的扩缩容策略"""
+
+    def __init__(
+        self,
+        min_replicas: int = 1,
+        max_replicas: int = 2,
+        ttft_p95_slo: float = 1.0,
+        ttft_low_ratio: float = 0.5,
+        queue_high: float = 8,
+        queue_low: float = 1,
+        kv_high: float = 0.9,
+        kv_low: float = 0.5,
+        scale_up_windows: int = 2,
+        scale_down_windows: int = 12,
+        scale_up_cooldown: float = 60,
+        scale_down_cooldown: float = 300
+    ):
+        """
+        初始化策略
+
+        Args:
+            min_replicas: 最少副本数
+            max_replicas: 最多副本数
+            ttft_p95_slo: TTFT p95目标（秒），超过即触发扩容
+            ttft_low_ratio: TTFT p95低于 slo * ratio 才允许缩容
+            queue_high: 每副本平均等待请求数的扩容阈值
+            queue_low: 每副本平均等待请求数的缩容阈值
+            kv_high: KV Cache使用率的扩容阈值（取各副本最大值）
+            kv_low: KV Cache使用率的缩容阈值
+            scale_up_windows: 连续超过阈值多少次评估后扩容
+            scale_down_windows: 连续低于阈值多少次评估后缩容
+            scale_up_cooldown: 两次扩容的最小间隔（秒）
+            scale_down_cooldown: 任意扩缩容后到下一次缩容的最小间隔（秒）
+        """
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.ttft_p95_slo = ttft_p95_slo
+        self.ttft_low_ratio = ttft_low_ratio
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.kv_high = kv_high
+        self.kv_low = kv_low
+        self.scale_up_windows = scale_up_windows
+        self.scale_down_windows = scale_down_windows
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+
+        self._up_streak = 0
+        self._down_streak = 0
+        self._last_scale_up = float('-inf')
+        self._last_scale = float('-inf')
+
+    @classmethod
+    def from_config(cls, autoscaler_config: Dict[str, Any]) -> "ScalingPolicy":
+        """根据autoscaler配置段创建策略"""
+        keys = (
+            'min_replicas', 'max_replicas', 'ttft_p95_slo', 'ttft_low_ratio',
+            'queue_high', 'queue_low', 'kv_high', 'kv_low',
+            'scale_up_windows', 'scale_down_windows',
+            'scale_up_cooldown', 'scale_down_cooldown',
+        )
+        return cls(**{k: autoscaler_config[k] for k in keys if k in autoscaler_config})
+
+    def breaches(self, signals: Dict[str, Optional[float]]) -> List[str]:
+        """返回超过扩容阈值的指标说明"""
+        reasons = []
+        queue_depth = signals.get('queue_depth')
+        ttft_p95 = signals.get('ttft_p95')
+        kv_usage = signals.get('kv_usage')
+        if queue_depth is not None and queue_depth > self.queue_high:
+            reasons.append(f"queue_depth {queue_depth:.1f} > {self.queue_high}")
+        if ttft_p95 is not None and ttft_p95 > self.ttft_p95_slo:
+            reasons.append(f"ttft_p95 {ttft_p95:.3f}s > slo {self.ttft_p95_slo}s")
+        if kv_usage is not None and kv_usage > self.kv_high:
+            reasons.append(f"kv_usage {kv_usage:.1%} > {self.kv_high:.0%}")
+        return reasons
+
+    def is_idle(self, signals: Dict[str, Optional[float]]) -> bool:
+        """全部指标低于缩容阈值（没有TTFT观测值视为空闲）"""
+        queue_depth = signals.get('queue_depth')
+        ttft_p95 = signals.get('ttft_p95')
+        kv_usage = signals.get('kv_usage')
+        if queue_depth is None or kv_usage is None:
+            return False
+        return (
+            queue_depth <= self.queue_low
+            and kv_usage < self.kv_low
+            and (ttft_p95 is None or ttft_p95 < self.ttft_p95_slo * self.ttft_low_ratio)
+        )
+
+    def evaluate(
+        self,
+        signals: Dict[str, Optional[float]],
+        replicas: int,
+        now: float,
+        pending: int = 0,
+        headroom: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        评估一次扩缩容
+
+        Args:
+            signals: queue_depth、ttft_p95、kv_usage
+            replicas: 当前副本数（包括启动/预热中，不包括摘除中）
+            now: 当前时间（秒）
+            pending: 启动/预热中的副本数
+            headroom: 还能启动的副本数（受空闲设备限制），None表示不限
+
+        Returns:
+            {"delta": 1/0/-1, "reason": 说明}
+        """
+        if replicas < self.min_replicas:
+            return {"delta": 1, "reason": f"replicas {replicas} < min_replicas {self.min_replicas}"}
+
+        breaches = self.breaches(signals)
+        if breaches:
+            self._up_streak += 1
+            self._down_streak = 0
+        elif self.is_idle(signals):
+            self._down_streak += 1
+            self._up_streak = 0
+        else:
+            # 滞回区间内保持现状
+            self._up_streak = 0
+            self._down_streak = 0
+
+        if breaches:
+            reason = "; ".join(breaches)
+            if self._up_streak < self.scale_up_windows:
+                return {"delta": 0, "reason": f"{reason} ({self._up_streak}/{self.scale_up_windows} windows)"}
+            if replicas >= self.max_replicas:
+                return {"delta": 0, "reason": f"{reason}, already at max_replicas {self.max_replicas}"}
+            if headroom is not None and headroom <= 0:
+                return {"delta": 0, "reason": f"{reason}, no free devices"}
+            if pending:
+                return {"delta": 0, "reason": f"{reason}, waiting for {pending} replica(s) to warm up"}
+            if now - self._last_scale_up < self.scale_up_cooldown:
+                return {"delta": 0, "reason": f"{reason}, in scale-up cooldown"}
+            self._up_streak = 0
+            self._last_scale_up = now
+            self._last_scale = now
+            return {"delta": 1, "reason": reason}
+
+        if self._down_streak >= self.scale_down_windows and replicas > self.min_replicas:
+            if pending:
+                return {"delta": 0, "reason": "idle, waiting for pending replicas"}
+            if now - self._last_scale < self.scale_down_cooldown:
+                return {"delta": 0, "reason": "idle, in scale-down cooldown"}
+            self._down_streak = 0
+            self._last_scale = now
+            return {"delta": -1, "reason": f"all signals below scale-down thresholds for {self.scale_down_windows} windows"}
+
+        return {"delta": 0, "reason": "within thresholds"}
+
+
+class DockerBackend:
+    """以Docker容器运行副本（与 run.sh 相同的镜像、挂载和环境变量）"""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        mode: str,
+        image: str = "vllm-ascend:v0.1",
+        model_dir: str = "./models",
+        container_prefix: str = "vllm",
+        request_timeout: float = 10
+    ):
+        """
+        Args:
+            config: 完整配置字典
+            mode: 运行模式
+            image: Docker镜像
+            model_dir: 宿主机模型目录（挂载到 /models）
+            container_prefix: 容器名前缀
+            request_timeout: 健康检查和指标请求超时（秒）
+        """
+        self.config = config
+        self.mode = mode
+        self.image = image
+        self.model_dir = model_dir
+        self.container_prefix = container_prefix
+        self.request_timeout = request_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._session
+
+    def build_run_args(self, replica: Replica, port: int) -> List[str]:
+        """
+        构建 docker run 命令
+
+        Args:
+            replica: 副本
+            port: 宿主机端口
+
+        Returns:
+            命令参数列表
+        """
+        inference_config = self.config['inference']
+        parallel_config = resolve_parallel_config(dict(inference_config, devices=replica.devices))
+        env = build_parallel_env(parallel_config, inference_config.get('hccl'), in_container=True)
+        env['TENSOR_PARALLEL_SIZE'] = str(parallel_config['tensor_parallel_size'])
+        env['PIPELINE_PARALLEL_SIZE'] = str(parallel_config['pipeline_parallel_size'])
+        env['THINKING_MODE'] = self.mode
+
+        args = ['docker', 'run', '-d', '--name', replica.name]
+        args.extend(build_device_mounts(replica.devices))
+        args.extend([
+            '-v', '/usr/local/Ascend/driver:/usr/local/Ascend/driver:ro',
+            '-v', f"{self.model_dir}:/models:ro",
+        ])
+        for key, value in env.items():
+            args.extend(['-e', f"{key}={value}"])
+        args.extend(['-p', f"{port}:8000", '--shm-size=16g', self.image, self.mode])
+        return args
+
+    async def _docker(self, *args: str) -> Tuple[int, str]:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        output, _ = await process.communicate()
+        return process.returncode, output.decode(errors='replace').strip()
+
+    async def start(self, replica: Replica, port: int) -> None:
+        """启动副本容器"""
+        # 清理同名的残留容器
+        await self._docker('docker', 'rm', '-f', replica.name)
+        code, output = await self._docker(*self.build_run_args(replica, port))
+        if code != 0:
+            raise RuntimeError(f"docker run failed: {output}")
+
+    async def stop(self, replica: Replica) -> None:
+        """停止并删除副本容器"""
+        code, output = await self._docker('docker', 'rm', '-f', replica.name)
+        if code != 0:
+            logger.warning(f"Failed to remove container {replica.name}: {output}")
+
+    async def is_healthy(self, replica: Replica) -> bool:
+        try:
+            async with self._get_session().get(f"{replica.url}/health") as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            return False
+
+    async def warmup(self, replica: Replica, requests: int) -> None:
+        """发送预热请求，触发图编译和内存分配"""
+        payload = {"model": self.config['model']['path'], "prompt": WARMUP_PROMPT, "max_tokens": 8}
+        for _ in range(requests):
+            async with self._get_session().post(
+                f"{replica.url}/v1/completions", json=payload,
+                timeout=aiohttp.ClientTimeout(total=self.config['server'].get('request_timeout', 60))
+            ) as response:
+                response.raise_for_status()
+
+    async def fetch_metrics(self, replica: Replica) -> str:
+        async with self._get_session().get(f"{replica.url}/metrics") as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+class SimulatedBackend:
+    """
+    模拟副本后端
+
+    每个副本近似为处理能力为 capacity_rps 的队列：负载在就绪副本间
+    均分，超出能力的部分进入等待队列，TTFT随利用率和积压增长。
+    使用控制器的时钟推进，配合虚拟时钟可以快速回放长时间负载。
+    """
+
+    def __init__(
+        self,
+        load: Callable[[float], float],
+        clock: Callable[[], float] = time.monotonic,
+        capacity_rps: float = 8.0,
+        base_ttft: float = 0.15,
+        startup_time: float = 90.0,
+        max_num_seqs: int = 64
+    ):
+        """
+        Args:
+            load: 时间到总请求速率（请求/秒）的函数
+            clock: 时钟
+            capacity_rps: 单副本处理能力（请求/秒）
+            base_ttft: 空载时的TTFT（秒）
+            startup_time: 副本从启动到健康的时间（秒）
+            max_num_seqs: 单副本最大并发序列数
+        """
+        self.load = load
+        self.clock = clock
+        self.capacity_rps = capacity_rps
+        self.base_ttft = base_ttft
+        self.startup_time = startup_time
+        self.max_num_seqs = max_num_seqs
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._replicas: Dict[str, Replica] = {}
+
+    def attach(self, replica: Replica) -> None:
+        """登记不由控制器启动的副本（如 run.sh 启动的原始副本）"""
+        self._replicas[replica.name] = replica
+        self._state[replica.name] = {
+            "ready_at": self.clock(),
+            "updated_at": self.clock(),
+            "backlog": 0.0,
+            "running": 0.0,
+            "buckets": [0.0] * (len(TTFT_BUCKETS) + 1),
+        }
+
+    async def start(self, replica: Replica, port: int) -> None:
+        self.attach(replica)
+        self._state[replica.name]["ready_at"] = self.clock() + self.startup_time
+
+    async def stop(self, replica: Replica) -> None:
+        self._replicas.pop(replica.name, None)
+        self._state.pop(replica.name, None)
+
+    async def is_healthy(self, replica: Replica) -> bool:
+        return self.clock() >= self._state[replica.name]["ready_at"]
+
+    async def warmup(self, replica: Replica, requests: int) -> None:
+        return None
+
+    def _advance(self, name: str) -> Dict[str, Any]:
+        state = self._state[name]
+        now = self.clock()
+        dt = now - state["updated_at"]
+        state["updated_at"] = now
+
+        # 只有就绪副本接收流量
+        routed = [r for r in self._replicas.values() if r.state == REPLICA_READY]
+        share = self.load(now) / len(routed) if self._replicas[name] in routed else 0.0
+
+        arrivals = share * dt
+        state["backlog"] = max(0.0, state["backlog"] + arrivals - self.capacity_rps * dt)
+        utilization = min(share / self.capacity_rps, 0.95)
+        state["running"] = min(self.max_num_seqs, utilization * self.max_num_seqs)
+
+        ttft = self.base_ttft / (1 - utilization) + state["backlog"] / self.capacity_rps
+        index = next((i for i, le in enumerate(TTFT_BUCKETS) if ttft <= le), len(TTFT_BUCKETS))
+        state["buckets"][index] += arrivals
+        return state
+
+    async def fetch_metrics(self, replica: Replica) -> str:
+        state = self._advance(replica.name)
+        label = 'model_name="simulated"'
+        lines = [
+            f'{QUEUE_METRIC}{{{label}}} {state["backlog"]}',
+            f'{RUNNING_METRIC}{{{label}}} {state["running"]}',
+            f'{KV_USAGE_METRIC}{{{label}}} {state["running"] / self.max_num_seqs}',
+        ]
+        cumulative = 0.0
+        for le, count in zip(TTFT_BUCKETS + (float('inf'),), state["buckets"]):
+            cumulative += count
+            le_label = '+Inf' if le == float('inf') else le
+            lines.append(f'{TTFT_METRIC}_bucket{{{label},le="{le_label}"}} {cumulative}')
+        lines.append(f'{TTFT_METRIC}_count{{{label}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    async def close(self) -> None:
+        return None
+
+
+class Autoscaler:
+    """副本扩缩容控制器"""
+
+    def __init__(
+        self,
+        backend: Any,
+        policy: ScalingPolicy,
+        device_pool: List[int],
+        devices_per_replica: int = 1,
+        base_port: int = 8100,
+        container_prefix: str = "vllm",
+        interval: float = 5,
+        startup_timeout: float = 600,
+        warmup_requests: int = 2,
+        drain_timeout: float = 120,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化控制器
+
+        Args:
+            backend: 副本后端（DockerBackend 或 SimulatedBackend）
+            policy: 扩缩容策略
+            device_pool: 可用于新增副本的NPU设备
+            devices_per_replica: 每个副本占用的设备数（tensor_parallel_size * pipeline_parallel_size）
+            base_port: 新增副本的宿主机端口起点
+            container_prefix: 副本名称前缀
+            interval: 评估间隔（秒）
+            startup_timeout: 副本启动超时（秒）
+            warmup_requests: 加入路由前的预热请求数
+            drain_timeout: 缩容时等待在途请求完成的最长时间（秒）
+            clock: 时钟
+        """
+        self.backend = backend
+        self.policy = policy
+        self.device_pool = device_pool
+        self.devices_per_replica = devices_per_replica
+        self.base_port = base_port
+        self.container_prefix = container_prefix
+        self.interval = interval
+        self.startup_timeout = startup_timeout
+        self.warmup_requests = warmup_requests
+        self.drain_timeout = drain_timeout
+        self.clock = clock
+
+        self.replicas: List[Replica] = []
+        self.decisions: List[Dict[str, Any]] = []
+        self.last_signals: Dict[str, Optional[float]] = {}
+        self._next_index = 1
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Dict[str, Any],
+        mode: str,
+        backend: Any = None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> "Autoscaler":
+        """
+        根据配置创建控制器
+
+        Args:
+            config: 完整配置字典
+            mode: 运行模式
+            backend: 副本后端，默认使用Docker
+            clock: 时钟
+
+        Returns:
+            Autoscaler实例
+        """
+        autoscaler_config = config.get('autoscaler') or {}
+        parallel_config = resolve_parallel_config(config['inference'])
+        container_prefix = f"{autoscaler_config.get('container_prefix', 'vllm')}-{mode}"
+
+        if backend is None:
+            backend = DockerBackend(
+                config,
+                mode,
+                image=autoscaler_config.get('image', 'vllm-ascend:v0.1'),
+                model_dir=autoscaler_config.get('model_dir', './models'),
+            )
+
+        return cls(
+            backend,
+            ScalingPolicy.from_config(autoscaler_config),
+            device_pool=parse_device_list(autoscaler_config.get('devices')),
+            devices_per_replica=len(parallel_config['devices']),
+            base_port=autoscaler_config.get('base_port', 8100),
+            container_prefix=container_prefix,
+            interval=autoscaler_config.get('interval', 5),
+            startup_timeout=autoscaler_config.get('startup_timeout', 600),
+            warmup_requests=autoscaler_config.get('warmup_requests', 2),
+            drain_timeout=autoscaler_config.get('drain_timeout', 120),
+            clock=clock,
+        )
+
+    def add_static_replica(self, url: str, devices: List[int]) -> Replica:
+        """
+        登记已在运行、不由控制器管理的副本
+
+        Args:
+            url: 副本地址
+            devices: 占用的设备（不会分配给新副本）
+
+        Returns:
+            Replica实例
+        """
+        replica = Replica(f"{self.container_prefix}-static-{len(self.replicas)}", url.rstrip('/'),
+                          devices, managed=False)
+        replica.set_state(REPLICA_READY, self.clock())
+        self.replicas.append(replica)
+        if hasattr(self.backend, 'attach'):
+            self.backend.attach(replica)
+        return replica
+
+    def ready_urls(self) -> List[str]:
+        """可接收流量的副本地址"""
+        return [r.url for r in self.replicas if r.state == REPLICA_READY]
+
+    def free_device_groups(self) -> List[List[int]]:
+        """按副本规模划分的空闲设备组"""
+        used = {d for r in self.replicas for d in r.devices}
+        free = [d for d in self.device_pool if d not in used]
+        size = self.devices_per_replica
+        return [free[i:i + size] for i in range(0, len(free) - size + 1, size)]
+
+    async def collect_signals(self) -> Dict[str, Optional[float]]:
+        """
+        读取就绪副本的指标并汇总
+
+        Returns:
+            queue_depth（每副本平均等待数）、ttft_p95（本评估周期内）、kv_usage（最大值）
+        """
+        waiting = []
+        kv_usage = []
+        window: Dict[float, float] = {}
+
+        for replica in self.replicas:
+            if replica.state not in (REPLICA_READY, REPLICA_DRAINING):
+                continue
+            try:
+                metrics = parse_prometheus_metrics(await self.backend.fetch_metrics(replica))
+            except Exception as e:
+                logger.warning(f"Failed to fetch metrics from {replica.name}: {e}")
+                continue
+
+            replica_waiting = metric_total(metrics, QUEUE_METRIC) or 0.0
+            replica.in_flight = replica_waiting + (metric_total(metrics, RUNNING_METRIC) or 0.0)
+
+            # TTFT按两次采样间的桶增量计算，只反映本周期的请求
+            buckets = dict(histogram_buckets(metrics, TTFT_METRIC))
+            if replica.last_buckets is not None:
+                for le, count in buckets.items():
+                    delta = count - replica.last_buckets.get(le, 0.0)
+                    # 计数减少说明副本重启过
+                    window[le] = window.get(le, 0.0) + (delta if delta >= 0 else count)
+            replica.last_buckets = buckets
+
+            if replica.state == REPLICA_READY:
+                waiting.append(replica_waiting)
+                kv_usage.append(metric_total(metrics, KV_USAGE_METRIC) or 0.0)
+
+        return {
+            "queue_depth": sum(waiting) / len(waiting) if waiting else None,
+            "ttft_p95": histogram_quantile(sorted(window.items()), 0.95),
+            "kv_usage": max(kv_usage) if kv_usage else None,
+        }
+
+    async def _advance_replicas(self, now: float) -> None:
+        """推进启动、预热和摘除中的副本"""
+        for replica in list(self.replicas):
+            if replica.state == REPLICA_STARTING:
+                if await self.backend.is_healthy(replica):
+                    replica.set_state(REPLICA_WARMING, now)
+                    try:
+                        await self.backend.warmup(replica, self.warmup_requests)
+                    except Exception as e:
+                        logger.error(f"Warmup failed on {replica.name}: {e}")
+                        await self._remove(replica)
+                        continue
+                    replica.set_state(REPLICA_READY, now)
+                    logger.info(f"Replica {replica.name} is warm, routing traffic to {replica.url}")
+                elif now - replica.state_since > self.startup_timeout:
+                    logger.error(f"Replica {replica.name} not healthy after {self.startup_timeout}s, removing")
+                    await self._remove(replica)
+
+            elif replica.state == REPLICA_DRAINING:
+                drained = replica.in_flight is not None and replica.in_flight <= 0
+                if drained or now - replica.state_since > self.drain_timeout:
+                    logger.info(f"Replica {replica.name} drained, stopping")
+                    await self._remove(replica)
+
+    async def _remove(self, replica: Replica) -> None:
+        try:
+            await self.backend.stop(replica)
+        finally:
+            self.replicas.remove(replica)
+
+    async def scale_up(self, now: float) -> Optional[Replica]:
+        """在空闲设备上启动一个副本"""
+        groups = self.free_device_groups()
+        if not groups:
+            return None
+
+        index = self._next_index
+        self._next_index += 1
+        port = self.base_port + index
+        replica = Replica(f"{self.container_prefix}-r{index}", f"http://127.0.0.1:{port}", groups[0])
+        replica.set_state(REPLICA_STARTING, now)
+        self.replicas.append(replica)
+
+        try:
+            await self.backend.start(replica, port)
+        except Exception as e:
+            logger.error(f"Failed to start replica {replica.name}: {e}")
+            self.replicas.remove(replica)
+            return None
+        return replica
+
+    async def scale_down(self, now: float) -> Optional[Replica]:
+        """将最新的受管副本摘除路由，等待在途请求完成后停止"""
+        candidates = [r for r in self.replicas if r.managed and r.state == REPLICA_READY]
+        if not candidates:
+            return None
+        replica = candidates[-1]
+        replica.set_state(REPLICA_DRAINING, now)
+        replica.in_flight = None
+        return replica
+
+    async def step(self) -> Dict[str, Any]:
+        """
+        执行一次评估
+
+        Returns:
+            本次决策（delta、reason、replicas、signals）
+        """
+        now = self.clock()
+        await self._advance_replicas(now)
+        signals = await self.collect_signals()
+        self.last_signals = signals
+
+        active = [r for r in self.replicas if r.state != REPLICA_DRAINING]
+        pending = sum(1 for r in active if r.state in (REPLICA_STARTING, REPLICA_WARMING))
+        decision = self.policy.evaluate(
+            signals, len(active), now, pending=pending, headroom=len(self.free_device_groups())
+        )
+
+        replica = None
+        if decision["delta"] > 0:
+            replica = await self.scale_up(now)
+            if replica is not None:
+                logger.info(
+                    f"Scaling up to {len(active) + 1} replicas, starting {replica.name} on "
+                    f"devices {replica.devices}: {decision['reason']} [{format_signals(signals)}]"
+                )
+        elif decision["delta"] < 0:
+            replica = await self.scale_down(now)
+            if replica is not None:
+                logger.info(
+                    f"Scaling down to {len(active) - 1} replicas, draining {replica.name}: "
+                    f"{decision['reason']} [{format_signals(signals)}]"
+                )
+
+        if replica is None and decision["delta"] != 0:
+            decision = {"delta": 0, "reason": f"{decision['reason']}, no replica to change"}
+        decision.update({
+            "time": now,
+            "replicas": len([r for r in self.replicas if r.state != REPLICA_DRAINING]),
+            "signals": signals,
+        })
+        if decision["delta"] != 0:
+            self.decisions.append(decision)
+        return decision
+
+    async def run(self) -> None:
+        """按评估间隔持续运行"""
+        logger.info(
+            f"Autoscaler started: {len(self.replicas)} replica(s), device pool {self.device_pool}, "
+            f"replicas {self.policy.min_replicas}-{self.policy.max_replicas}"
+        )
+        while True:
+            try:
+                await self.step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Autoscaler step failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def shutdown(self) -> None:
+        """停止所有受管副本"""
+        for replica in [r for r in self.replicas if r.managed]:
+            logger.info(f"Stopping replica {replica.name}")
+            await self._remove(replica)
+        await self.backend.close()
+
+
+class VirtualClock:
+    """模拟用的虚拟时钟"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def parse_load_profile(profile: str) -> Callable[[float], float]:
+    """
+    解析阶梯负载曲线
+
+    Args:
+        profile: 逗号分隔的 "起始秒:请求速率"，例如 "0:4,300:30,900:4"
+
+    Returns:
+        时间到请求速率的函数
+    """
+    steps = sorted(
+        (float(start), float(rate))
+        for start, rate in (item.split(':') for item in profile.split(',') if item.strip())
+    )
+    if not steps:
+        raise ValueError(f"Empty load profile: {profile!r}")
+
+    def load(t: float) -> float:
+        rate = steps[0][1]
+        for start, value in steps:
+            if t < start:
+                break
+            rate = value
+        return rate
+
+    return load
+
+
+async def simulate(autoscaler: Autoscaler, clock: VirtualClock, duration: float) -> List[Dict[str, Any]]:
+    """
+    在虚拟时钟上运行控制器
+
+    Returns:
+        每次评估的时间线
+    """
+    timeline = []
+    while clock() < duration:
+        clock.advance(autoscaler.interval)
+        decision = await autoscaler.step()
+        timeline.append({
+            "time": clock(),
+            "ready": len(autoscaler.ready_urls()),
+            "replicas": decision["replicas"],
+            "delta": decision["delta"],
+            "signals": decision["signals"],
+        })
+    return timeline
+
+
+def main():
+    """主函数：用模拟后端回放负载曲线，验证扩缩容策略"""
+    parser = argparse.ArgumentParser(description='vLLM-Ascend Autoscaler Simulation')
+
+    parser.add_argument('--mode', type=str, default='fast', choices=THINKING_MODES,
+                        help='Thinking mode whose autoscaler config is used (default: fast)')
+    parser.add_argument('--config', type=str, default=None,
+                        help='Path to custom configuration file')
+    parser.add_argument('--load-profile', type=str, default='0:4,300:12,1200:4',
+                        help='Step load profile "start_s:requests_per_s,..." (default: 0:4,300:12,1200:4)')
+    parser.add_argument('--duration', type=float, default=2400,
+                        help='Simulated duration in seconds (default: 2400)')
+    parser.add_argument('--capacity', type=float, default=8.0,
+                        help='Requests per second one replica can sustain (default: 8)')
+    parser.add_argument('--base-ttft', type=float, default=0.15,
+                        help='Unloaded TTFT in seconds (default: 0.15)')
+    parser.add_argument('--startup-time', type=float, default=90,
+                        help='Seconds for a new replica to become healthy (default: 90)')
+
+    args = parser.parse_args()
+
+    mode = parse_thinking_mode(args.mode)
+    config = load_config(args.config or get_config_path(mode))
+
+    clock = VirtualClock()
+    try:
+        load = parse_load_profile(args.load_profile)
+    except ValueError as e:
+        logger.error(f"Invalid load profile: {e}")
+        sys.exit(1)
+
+    backend = SimulatedBackend(
+        load,
+        clock=clock,
+        capacity_rps=args.capacity,
+        base_ttft=args.base_ttft,
+        startup_time=args.startup_time,
+        max_num_seqs=config['inference']['max_num_seqs'],
+    )
+    autoscaler = Autoscaler.from_config(config, mode, backend=backend, clock=clock)
+    autoscaler.add_static_replica(
+        f"http://127.0.0.1:{config['server']['port']}",
+        resolve_parallel_config(config['inference'])['devices'],
+    )
+
+    timeline = asyncio.run(simulate(autoscaler, clock, args.duration))
+
+    print(f"\n{'='*72}")
+    print(f"Autoscaler Simulation - {mode} mode")
+    print(f"{'='*72}")
+    print(f"{'time':>7} {'load':>6} {'ready':>6} {'total':>6} {'queue':>8} {'ttft_p95':>9} {'kv':>7}")
+    for row in timeline:
+        signals = row["signals"]
+        marker = {1: ' +', -1: ' -'}.get(row["delta"], '')
+        queue = signals['queue_depth']
+        ttft = signals['ttft_p95']
+        kv = signals['kv_usage']
+        print(
+            f"{row['time']:>7.0f} {load(row['time']):>6.1f} {row['ready']:>6} {row['replicas']:>6} "
+            f"{'n/a' if queue is None else f'{queue:.1f}':>8} "
+            f"{'n/a' if ttft is None else f'{ttft:.3f}':>9} "
+            f"{'n/a' if kv is None else f'{kv:.1%}':>7}{marker}"
+        )
+    print(f"\n📈 Scale events: {len(autoscaler.decisions)}")
+    for decision in autoscaler.decisions:
+        action = "up" if decision["delta"] > 0 else "down"
+        print(f"  t={decision['time']:.0f}s {action:>4} -> {decision['replicas']}: {decision['reason']}")
+    print(f"{'='*72}\n")
+
+
+if __name__ == "__main__":
+    main()
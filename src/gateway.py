@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+vLLM-Ascend Gateway
+请求网关：位于客户端和vLLM引擎之间的轻量反向代理
+
+为每个请求分配/透传 X-Request-ID，并记录准入、上游连接、首token
+和完成阶段的追踪span。启用shaping时在准入阶段按token预算整形请求；
+启用autoscaler时在后台运行扩缩容控制器，请求轮询分发到就绪副本。
+"""
+
+import sys
+import time
+import json
+import asyncio
+import itertools
+import argparse
+import logging
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+from utils import load_config, get_config_path, parse_thinking_mode, resolve_parallel_config, THINKING_MODES
+from tracing import (
+    Tracer,
+    REQUEST_ID_HEADER,
+    SPAN_KIND_SERVER,
+    SPAN_KIND_CLIENT,
+    new_request_id,
+)
+from shaping import (
+    TokenBudgetShaper,
+    PROMPT_TOKENS_HEADER,
+    COMPLETIONS_PATH,
+    CHAT_COMPLETIONS_PATH,
+)
+from autoscaler import Autoscaler
+
+# 配置日志
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# 不转发的逐跳头
+HOP_BY_HOP_HEADERS = {
+    'host', 'content-length', 'transfer-encoding', 'connection',
+    'keep-alive', 'upgrade', 'te', 'trailer',
+}
+
+
+class Gateway:
+    """请求网关"""
+
+    def __init__(
+        self,
+        upstream_url: str,
+        tracer: Tracer,
+        request_timeout: float = 60,
+        shaper: Optional[TokenBudgetShaper] = None,
+        autoscaler: Optional[Autoscaler] = None
+    ):
+        """
+        初始化网关
+
+        Args:
+            upstream_url: vLLM引擎地址，例如 http://127.0.0.1:8000
+            tracer: 追踪器
+            request_timeout: 上游请求超时（秒）
+            shaper: token预算整形器，None表示不整形
+            autoscaler: 副本扩缩容控制器，None表示只转发到upstream_url
+        """
+        self.upstream_url = upstream_url.rstrip('/')
+        self.tracer = tracer
+        self.request_timeout = request_timeout
+        self.shaper = shaper
+        self.autoscaler = autoscaler
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._autoscaler_task: Optional[asyncio.Task] = None
+        self._round_robin = itertools.count()
+
+    async def _on_startup(self, app: web.Application) -> None:
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        self._session = aiohttp.ClientSession(timeout=timeout, auto_decompress=False)
+        if self.autoscaler is not None:
+            self._autoscaler_task = asyncio.create_task(self.autoscaler.run())
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._autoscaler_task is not None:
+            self._autoscaler_task.cancel()
+            try:
+                await self._autoscaler_task
+            except asyncio.CancelledError:
+                pass
+            await self.autoscaler.shutdown()
+        if self._session is not None:
+            await self._session.close()
+        if self.shaper is not None:
+            await self.shaper.close()
+        self.tracer.close()
+
+    def pick_upstream(self) -> str:
+        """选择上游引擎地址（启用扩缩容时在就绪副本间轮询）"""
+        if self.autoscaler is not None:
+            urls = self.autoscaler.ready_urls()
+            if urls:
+                return urls[next(self._round_robin) % len(urls)]
+        return self.upstream_url
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """转发请求到上游引擎并流式返回响应"""
+        request_id = request.headers.get(REQUEST_ID_HEADER) or new_request_id()
+        root = self.tracer.start_span(
+            "gateway.request",
+            request_id,
+            kind=SPAN_KIND_SERVER,
+            attributes={"http.method": request.method, "http.target": request.path},
+        )
+
+        # 准入：读取并解析请求体
+        admission = self.tracer.start_span("gateway.admission", request_id, parent=root)
+        body = await request.read()
+        payload = None
+        if body and request.content_type == 'application/json':
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+        if isinstance(payload, dict):
+            admission.set_attribute("request.stream", bool(payload.get("stream", False)))
+            if isinstance(payload.get("max_tokens"), int):
+                admission.set_attribute("request.max_tokens", payload["max_tokens"])
+
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        headers[REQUEST_ID_HEADER] = request_id
+
+        # token预算整形
+        if (
+            self.shaper is not None
+            and isinstance(payload, dict)
+            and request.method == 'POST'
+            and request.path in (COMPLETIONS_PATH, CHAT_COMPLETIONS_PATH)
+        ):
+            try:
+                shaped = await self.shaper.shape_async(payload, chat=request.path == CHAT_COMPLETIONS_PATH)
+            except Exception as e:
+                # 超出预算（ValueError）或tokenizer无法处理请求内容（如chat消息格式错误）
+                message = str(e) if isinstance(e, ValueError) else f"Invalid request: {e}"
+                admission.set_error(message)
+                admission.end()
+                root.set_attribute("http.status_code", 400)
+                root.end()
+                logger.info(f"[{request_id}] Rejected before reaching engine: {message}")
+                return web.json_response(
+                    {"object": "error", "message": message, "type": "BadRequestError", "code": 400},
+                    status=400,
+                    headers={REQUEST_ID_HEADER: request_id},
+                )
+            if shaped is not None:
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                headers[PROMPT_TOKENS_HEADER] = str(shaped['prompt_tokens'])
+                root.set_attribute("request.prompt_tokens", shaped['prompt_tokens'])
+                root.set_attribute("request.shaped_max_tokens", shaped['max_tokens'])
+                if shaped['clamped']:
+                    logger.debug(f"[{request_id}] max_tokens clamped to {shaped['max_tokens']}")
+        admission.end()
+
+        upstream = self.pick_upstream()
+        url = f"{upstream}{request.rel_url}"
+
+        start = time.perf_counter()
+        connect = self.tracer.start_span(
+            "gateway.upstream_connect", request_id, parent=root, kind=SPAN_KIND_CLIENT,
+            attributes={"upstream.url": upstream},
+        )
+        try:
+            upstream_resp = await self._session.request(
+                request.method, url, headers=headers, data=body
+            )
+        except (aiohttp.ClientError, OSError) as e:
+            connect.set_error(str(e))
+            connect.end()
+            root.set_error(str(e))
+            root.set_attribute("http.status_code", 502)
+            root.end()
+            logger.error(f"[{request_id}] Upstream request failed: {e}")
+            return web.json_response(
+                {"error": f"Upstream unavailable: {e}"},
+                status=502,
+                headers={REQUEST_ID_HEADER: request_id},
+            )
+        connect.set_attribute("http.status_code", upstream_resp.status)
+        connect.end()
+
+        response = web.StreamResponse(status=upstream_resp.status)
+        for key, value in upstream_resp.headers.items():
+            if key.lower() not in HOP_BY_HOP_HEADERS:
+                response.headers[key] = value
+        response.headers[REQUEST_ID_HEADER] = request_id
+        if PROMPT_TOKENS_HEADER in headers:
+            response.headers[PROMPT_TOKENS_HEADER] = headers[PROMPT_TOKENS_HEADER]
+
+        # 引擎内部的阶段对网关不可见：首token之前包含引擎排队和prefill，之后为解码和流式返回
+        ttft = self.tracer.start_span("gateway.ttft", request_id, parent=root,
+                                      attributes={"engine.phase": "queue+prefill"})
+        completion = None
+        chunks = 0
+        try:
+            await response.prepare(request)
+            async for chunk in upstream_resp.content.iter_any():
+                if chunks == 0:
+                    ttft.end()
+                    root.set_attribute("gateway.ttft_ms", (time.perf_counter() - start) * 1000)
+                    completion = self.tracer.start_span("gateway.completion", request_id, parent=root,
+                                                        attributes={"engine.phase": "decode"})
+                chunks += 1
+                await response.write(chunk)
+            await response.write_eof()
+        except (aiohttp.ClientError, ConnectionResetError) as e:
+            root.set_error(str(e))
+            logger.warning(f"[{request_id}] Stream interrupted: {e}")
+        finally:
+            upstream_resp.release()
+            ttft.end()
+            if completion is not None:
+                completion.set_attribute("response.chunks", chunks)
+                completion.end()
+            root.set_attribute("http.status_code", upstream_resp.status)
+            root.set_attribute("gateway.latency_ms", (time.perf_counter() - start) * 1000)
+            root.end()
+
+        return response
+
+    def build_app(self) -> web.Application:
+        """构建aiohttp应用"""
+        app = web.Application()
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        return app
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='vLLM-Ascend Gateway')
+
+    parser.add_argument(
+        '--mode',
+        type=str,
+        default='fast',
+        choices=THINKING_MODES,
+        help='Thinking mode: fast, slow or quant (default: fast)'
+    )
+
+    parser.add_argument(
+        '--config',
+        type=str,
+        default=None,
+        help='Path to custom configuration file'
+    )
+
+    parser.add_argument(
+        '--upstream',
+        type=str,
+        default=None,
+        help='Upstream vLLM URL (default: derived from server.port in config)'
+    )
+
+    parser.add_argument(
+        '--tokenizer',
+        type=str,
+        default=None,
+        help='Local tokenizer/model directory for request shaping (default: shaping.tokenizer_path or model.path)'
+    )
+
+    parser.add_argument(
+        '--host',
+        type=str,
+        default='0.0.0.0',
+        help='Gateway listen host (default: 0.0.0.0)'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='Gateway listen port (default: 8080)'
+    )
+
+    args = parser.parse_args()
+
+    mode = parse_thinking_mode(args.mode)
+    config = load_config(args.config or get_config_path(mode))
+    server_config = config['server']
+
+    upstream = args.upstream or f"http://127.0.0.1:{server_config['port']}"
+    tracer = Tracer.from_config(config, service_name=f"vllm-gateway-{mode}")
+
+    shaper = None
+    if (config.get('shaping') or {}).get('enabled', False):
+        if args.tokenizer:
+            config['shaping']['tokenizer_path'] = args.tokenizer
+        try:
+            shaper = TokenBudgetShaper.from_config(config)
+        except Exception as e:
+            # model.path 是容器内路径，在宿主机上运行网关时可能不存在
+            logger.warning(
+                f"Failed to load tokenizer for request shaping, forwarding requests unshaped: {e} "
+                f"(use --tokenizer to point at a local model directory)"
+            )
+
+    autoscaler = None
+    if (config.get('autoscaler') or {}).get('enabled', False):
+        autoscaler = Autoscaler.from_config(config, mode)
+        # run.sh 启动的副本作为固定副本，其设备不参与分配
+        autoscaler.add_static_replica(upstream, resolve_parallel_config(config['inference'])['devices'])
+
+    gateway = Gateway(
+        upstream,
+        tracer,
+        request_timeout=server_config.get('request_timeout', 60),
+        shaper=shaper,
+        autoscaler=autoscaler,
+    )
+
+    logger.info(f"Gateway listening on {args.host}:{args.port}, upstream: {upstream}")
+    try:
+        web.run_app(gateway.build_app(), host=args.host, port=args.port, print=None)
+    except Exception as e:
+        logger.error(f"Gateway failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline weight quantization for vLLM-Ascend
+离线权重量化工具
+
+将 validate_model_path 校验通过的bf16/fp16模型目录转换为int8量化
+权重，输出目录可直接作为量化模式（config/quant_mode.yaml）的模型
+路径，使用 --quantization ascend 加载。
+
+输出格式与msModelSlim一致：
+  - w8a16: 每个线性层保存int8 weight、逐输出通道的weight_scale/weight_offset
+  - w8a8:  额外保存校准得到的input_scale/input_offset，以及deq_scale/quant_bias
+  - quant_model_description.json 记录每个张量的量化类型
+
+全部计算在CPU上完成，可以用小模型快速验证。
+"""
+
+import sys
+import json
+import shutil
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from utils import validate_model_path, QUANT_TYPES
+
+# 配置日志
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# 保持浮点精度的层（按名称匹配）
+SKIP_PATTERNS = ('embed_tokens', 'lm_head', 'norm')
+
+# 默认校准语料
+DEFAULT_CALIB_PROMPTS = [
+    "什么是人工智能？请简要回答。",
+    "详细解释深度学习的工作原理，包括神经网络、反向传播和梯度下降等核心概念：",
+    "请写一首关于春天的短诗。",
+    "Explain the difference between TCP and UDP in a few sentences.",
+    "def fibonacci(n):",
+    "将下面的句子翻译成英文：今天天气很好，我们去公园散步吧。",
+]
+
+# w8a8校准需要在transformers中运行模型前向，各架构可用的最低transformers版本
+# （requirements.txt 固定的4.37.2不支持Qwen3）
+MIN_TRANSFORMERS_VERSIONS = {
+    'qwen3': '4.51.0',
+    'qwen3_moe': '4.51.0',
+}
+
+# 原始权重文件后缀（不复制到输出目录）
+WEIGHT_SUFFIXES = ('.safetensors', '.bin')
+
+
+def load_state_dict(model_path: str) -> Dict[str, Any]:
+    """
+    加载模型目录下的全部权重
+
+    Args:
+        model_path: 模型路径
+
+    Returns:
+        张量名到张量的字典
+    """
+    import torch
+
+    model_path = Path(model_path)
+    state_dict = {}
+
+    safetensor_files = sorted(model_path.glob('*.safetensors'))
+    if safetensor_files:
+        from safetensors.torch import load_file
+        for file in safetensor_files:
+            state_dict.update(load_file(str(file)))
+    else:
+        for file in sorted(model_path.glob('*.bin')):
+            state_dict.update(torch.load(str(file), map_location='cpu'))
+
+    logger.info(f"Loaded {len(state_dict)} tensors from {model_path}")
+    return state_dict
+
+
+def should_quantize(name: str, tensor: Any) -> bool:
+    """判断张量是否为需要量化的线性层权重"""
+    if not name.endswith('.weight') or tensor.dim() != 2:
+        return False
+    return not any(pattern in name for pattern in SKIP_PATTERNS)
+
+
+def quantize_weight(weight: Any):
+    """
+    逐输出通道对称int8量化
+
+    Args:
+        weight: [out_features, in_features] 浮点权重
+
+    Returns:
+        (int8权重, [out_features, 1] float32 scale)
+    """
+    import torch
+
+    weight = weight.float()
+    scale = weight.abs().amax(dim=1, keepdim=True).clamp(min=1e-8) / 127.0
+    quantized = torch.round(weight / scale).clamp(-128, 127).to(torch.int8)
+    return quantized, scale
+
+
+def dequantize_weight(quantized: Any, scale: Any) -> Any:
+    """反量化为float32，用于误差验证"""
+    return quantized.float() * scale
+
+
+def check_calibration_support(model_path: str) -> None:
+    """
+    检查当前transformers能否加载模型用于w8a8激活校准
+
+    Args:
+        model_path: 模型路径
+
+    Raises:
+        RuntimeError: transformers版本过低或不支持该模型架构
+    """
+    import transformers
+    from packaging import version
+    from transformers.models.auto.configuration_auto import CONFIG_MAPPING
+
+    with open(Path(model_path) / 'config.json', 'r', encoding='utf-8') as f:
+        model_type = json.load(f).get('model_type')
+
+    installed = transformers.__version__
+    required = MIN_TRANSFORMERS_VERSIONS.get(model_type)
+    if (required and version.parse(installed) < version.parse(required)) or (
+        model_type and model_type not in CONFIG_MAPPING
+    ):
+        needs = f"transformers>={required}" if required else "a transformers version that supports it"
+        raise RuntimeError(
+            f"w8a8 calibration runs the '{model_type}' model on CPU and needs {needs} "
+            f"(installed: {installed}); upgrade transformers or use --quant-type w8a16"
+        )
+
+
+def calibrate_activation_scales(
+    model_path: str,
+    prompts: List[str],
+    max_length: int = 512
+) -> Dict[str, float]:
+    """
+    在CPU上运行校准语料，统计每个线性层输入激活的最大绝对值
+
+    Args:
+        model_path: 模型路径
+        prompts: 校准语料
+        max_length: 每条语料的最大token数
+
+    Returns:
+        层名（不含.weight后缀）到激活absmax的字典
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    logger.info(f"Calibrating activation scales with {len(prompts)} prompts...")
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32)
+    model.eval()
+
+    amax: Dict[str, float] = {}
+    hooks = []
+
+    def make_hook(name):
+        def hook(module, inputs, output):
+            value = inputs[0].detach().abs().max().item()
+            amax[name] = max(amax.get(name, 0.0), value)
+        return hook
+
+    for name, module in model.named_modules():
+        if isinstance(module, torch.nn.Linear) and not any(p in name for p in SKIP_PATTERNS):
+            hooks.append(module.register_forward_hook(make_hook(name)))
+
+    try:
+        with torch.no_grad():
+            for prompt in prompts:
+                inputs = tokenizer(prompt, return_tensors='pt', truncation=True, max_length=max_length)
+                model(**inputs)
+    finally:
+        for hook in hooks:
+            hook.remove()
+
+    logger.info(f"Collected activation ranges for {len(amax)} layers")
+    return amax
+
+
+def quantize_state_dict(
+    state_dict: Dict[str, Any],
+    quant_type: str,
+    activation_amax: Optional[Dict[str, float]] = None
+):
+    """
+    量化权重字典
+
+    Args:
+        state_dict: 原始权重
+        quant_type: 量化类型（w8a8 或 w8a16）
+        activation_amax: w8a8所需的激活absmax（calibrate_activation_scales的结果）
+
+    Returns:
+        (量化后的权重字典, 量化描述字典)
+    """
+    import torch
+
+    if quant_type not in QUANT_TYPES:
+        raise ValueError(f"Invalid quant_type: {quant_type}, must be one of {QUANT_TYPES}")
+    if quant_type == 'w8a8' and activation_amax is None:
+        raise ValueError("w8a8 quantization requires activation calibration")
+
+    tag = quant_type.upper()
+    quantized: Dict[str, Any] = {}
+    description: Dict[str, str] = {"model_quant_type": tag}
+
+    for name, tensor in state_dict.items():
+        prefix = name[:-len('.weight')]
+        if not should_quantize(name, tensor) or (
+            quant_type == 'w8a8' and prefix not in activation_amax
+        ):
+            quantized[name] = tensor
+            description[name] = "FLOAT"
+            continue
+
+        weight, scale = quantize_weight(tensor)
+        extra = {
+            'weight': weight,
+            'weight_scale': scale,
+            'weight_offset': torch.zeros_like(scale),
+        }
+
+        if quant_type == 'w8a8':
+            input_scale = torch.tensor(
+                [max(activation_amax[prefix], 1e-8) / 127.0], dtype=torch.float32
+            )
+            deq_scale = (scale.squeeze(1) * input_scale).float()
+            bias = state_dict.get(f"{prefix}.bias")
+            quant_bias = (
+                torch.round(bias.float() / deq_scale).to(torch.int32)
+                if bias is not None else torch.zeros(weight.shape[0], dtype=torch.int32)
+            )
+            extra.update({
+                'input_scale': input_scale,
+                'input_offset': torch.zeros(1, dtype=torch.float32),
+                'deq_scale': deq_scale,
+                'quant_bias': quant_bias,
+            })
+
+        for suffix, value in extra.items():
+            key = f"{prefix}.{suffix}"
+            quantized[key] = value.contiguous()
+            description[key] = tag
+
+    return quantized, description
+
+
+def verify_quantization(
+    original: Dict[str, Any],
+    quantized: Dict[str, Any],
+    description: Dict[str, str]
+) -> Dict[str, float]:
+    """
+    反量化并计算相对误差
+
+    Returns:
+        包含最大/平均相对误差（Frobenius范数）的字典
+    """
+    errors = []
+    for name, tag in description.items():
+        if tag == "FLOAT" or not name.endswith('.weight') or name not in original:
+            continue
+        prefix = name[:-len('.weight')]
+        restored = dequantize_weight(quantized[name], quantized[f"{prefix}.weight_scale"])
+        reference = original[name].float()
+        errors.append(((restored - reference).norm() / reference.norm().clamp(min=1e-12)).item())
+
+    if not errors:
+        return {"max_relative_error": 0.0, "mean_relative_error": 0.0, "tensors": 0}
+    return {
+        "max_relative_error": max(errors),
+        "mean_relative_error": sum(errors) / len(errors),
+        "tensors": len(errors),
+    }
+
+
+def _state_dict_bytes(state_dict: Dict[str, Any]) -> int:
+    return sum(t.numel() * t.element_size() for t in state_dict.values())
+
+
+def quantize_checkpoint(
+    model_path: str,
+    output_path: str,
+    quant_type: str = 'w8a8',
+    calib_prompts: Optional[List[str]] = None,
+    verify: bool = False
+) -> Dict[str, Any]:
+    """
+    生成量化模型目录
+
+    Args:
+        model_path: 原始模型路径
+        output_path: 输出路径
+        quant_type: 量化类型
+        calib_prompts: w8a8校准语料，默认使用内置语料
+        verify: 是否反量化验证误差
+
+    Returns:
+        量化结果摘要
+    """
+    from safetensors.torch import save_file
+
+    if not validate_model_path(model_path):
+        raise ValueError(f"Invalid model path: {model_path}")
+
+    if quant_type == 'w8a8':
+        check_calibration_support(model_path)
+
+    state_dict = load_state_dict(model_path)
+
+    activation_amax = None
+    if quant_type == 'w8a8':
+        activation_amax = calibrate_activation_scales(model_path, calib_prompts or DEFAULT_CALIB_PROMPTS)
+
+    quantized, description = quantize_state_dict(state_dict, quant_type, activation_amax)
+
+    output_dir = Path(output_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # 复制配置和tokenizer文件（不包括原始权重及其索引）
+    for file in Path(model_path).iterdir():
+        if file.is_file() and not file.name.endswith(WEIGHT_SUFFIXES) and not file.name.endswith('.index.json'):
+            shutil.copy2(file, output_dir / file.name)
+
+    save_file(quantized, str(output_dir / 'model.safetensors'), metadata={'format': 'pt'})
+    with open(output_dir / 'quant_model_description.json', 'w', encoding='utf-8') as f:
+        json.dump(description, f, indent=2)
+
+    summary = {
+        "quant_type": quant_type,
+        "quantized_tensors": sum(1 for k, v in description.items()
+                                 if k.endswith('.weight') and v != "FLOAT"),
+        "original_bytes": _state_dict_bytes(state_dict),
+        "quantized_bytes": _state_dict_bytes(quantized),
+    }
+    if verify:
+        summary.update(verify_quantization(state_dict, quantized, description))
+
+    logger.info(
+        f"Quantized {summary['quantized_tensors']} tensors to {quant_type}: "
+        f"{summary['original_bytes'] / 2**20:.1f}MB -> {summary['quantized_bytes'] / 2**20:.1f}MB"
+    )
+    return summary
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='vLLM-Ascend Offline Weight Quantization')
+
+    parser.add_argument(
+        '--model',
+        type=str,
+        required=True,
+        help='Source model directory (bf16/fp16 weights)'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        required=True,
+        help='Output directory for the quantized checkpoint'
+    )
+
+    parser.add_argument(
+        '--quant-type',
+        type=str,
+        default='w8a8',
+        choices=QUANT_TYPES,
+        help='Quantization type (default: w8a8)'
+    )
+
+    parser.add_argument(
+        '--calib-file',
+        type=str,
+        default=None,
+        help='Calibration prompts, one per line (w8a8 only, optional)'
+    )
+
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='Dequantize and report relative weight error'
+    )
+
+    args = parser.parse_args()
+
+    calib_prompts = None
+    if args.calib_file:
+        with open(args.calib_file, 'r', encoding='utf-8') as f:
+            calib_prompts = [line.strip() for line in f if line.strip()]
+
+    try:
+        summary = quantize_checkpoint(
+            args.model, args.output, args.quant_type, calib_prompts, verify=args.verify
+        )
+    except Exception as e:
+        logger.error(f"Quantization failed: {e}")
+        sys.exit(1)
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
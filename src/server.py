@@ -21,8 +21,15 @@ from utils import (
     check_npu_available,
     validate_model_path,
     parse_thinking_mode,
-    ConfigValidator
+    parse_device_list,
+    resolve_parallel_config,
+    check_model_parallelism,
+    build_parallel_env,
+    build_device_mounts,
+    ConfigValidator,
+    THINKING_MODES
 )
+from tracing import Tracer, new_request_id
 
 # 配置日志
 logging.basicConfig(
@@ -35,13 +42,23 @@ logger = logging.getLogger(__name__)
 class VLLMServer:
     """vLLM-Ascend服务器类"""
     
-    def __init__(self, mode: str = "fast", config_path: Optional[str] = None):
+    def __init__(
+        self,
+        mode: str = "fast",
+        config_path: Optional[str] = None,
+        devices: Optional[str] = None,
+        tensor_parallel_size: Optional[int] = None,
+        pipeline_parallel_size: Optional[int] = None
+    ):
         """
         初始化服务器
         
         Args:
-            mode: 运行模式 ("fast" 或 "slow")
+            mode: 运行模式 ("fast"、"slow" 或 "quant")
             config_path: 自定义配置文件路径
+            devices: 覆盖配置中的设备列表（逗号分隔，如 "0,1"）
+            tensor_parallel_size: 覆盖配置中的张量并行规模
+            pipeline_parallel_size: 覆盖配置中的流水线并行规模
         """
         self.mode = parse_thinking_mode(mode)
         
@@ -51,6 +68,14 @@ class VLLMServer:
         
         self.config = load_config(config_path)
         
+        # 命令行覆盖并行拓扑
+        if devices is not None:
+            self.config['inference']['devices'] = parse_device_list(devices)
+        if tensor_parallel_size is not None:
+            self.config['inference']['tensor_parallel_size'] = tensor_parallel_size
+        if pipeline_parallel_size is not None:
+            self.config['inference']['pipeline_parallel_size'] = pipeline_parallel_size
+        
         # 验证配置
         validator = ConfigValidator()
         if not validator.validate(self.config):
@@ -61,6 +86,11 @@ class VLLMServer:
         self.inference_config = self.config['inference']
         self.generation_config = self.config['generation']
         self.server_config = self.config['server']
+        self.parallel_config = resolve_parallel_config(self.inference_config)
+        self.speculative_config = self.config.get('speculative') or {}
+        
+        # 请求追踪
+        self.tracer = Tracer.from_config(self.config, service_name=f"vllm-launcher-{self.mode}")
         
         logger.info(f"VLLMServer initialized in {self.mode} mode")
     
@@ -75,15 +105,95 @@ class VLLMServer:
         if not check_npu_available():
             raise RuntimeError("NPU is not available")
         
-        # 设置设备ID
-        device_id = self.inference_config.get('device_id', 0)
-        os.environ['ASCEND_DEVICE_ID'] = str(device_id)
-        logger.info(f"Using NPU device: {device_id}")
+        # 设置设备可见性和HCCL通信环境
+        os.environ.update(self.build_env())
+        logger.info(
+            f"Using NPU devices: {self.parallel_config['devices']} "
+            f"(tensor_parallel={self.parallel_config['tensor_parallel_size']}, "
+            f"pipeline_parallel={self.parallel_config['pipeline_parallel_size']})"
+        )
         
         # 验证模型路径
         model_path = self.model_config['path']
         if not validate_model_path(model_path):
             raise ValueError(f"Invalid model path: {model_path}")
+        
+        # 验证模型能否按并行规模切分
+        if not check_model_parallelism(model_path, self.parallel_config):
+            raise ValueError("Model cannot be partitioned with the configured parallel sizes")
+    
+    def build_env(self, in_container: bool = False) -> dict:
+        """
+        构建设备可见性和HCCL环境变量
+        
+        Args:
+            in_container: 是否用于容器内（设备从0开始重新编号）
+        
+        Returns:
+            环境变量字典
+        """
+        return build_parallel_env(
+            self.parallel_config,
+            self.inference_config.get('hccl'),
+            in_container=in_container
+        )
+    
+    def build_docker_args(self) -> list:
+        """
+        构建docker run的设备挂载和环境变量参数
+        
+        Returns:
+            参数列表
+        """
+        env = self.build_env(in_container=True)
+        env['TENSOR_PARALLEL_SIZE'] = str(self.parallel_config['tensor_parallel_size'])
+        env['PIPELINE_PARALLEL_SIZE'] = str(self.parallel_config['pipeline_parallel_size'])
+        
+        args = build_device_mounts(self.parallel_config['devices'])
+        for key, value in env.items():
+            args.extend(['-e', f"{key}={value}"])
+        return args
+    
+    def build_parallel_args(self) -> list:
+        """
+        构建张量并行/流水线并行参数
+        
+        Returns:
+            参数列表
+        """
+        args = ['--tensor-parallel-size', str(self.parallel_config['tensor_parallel_size'])]
+        if self.parallel_config['pipeline_parallel_size'] > 1:
+            args.extend(['--pipeline-parallel-size', str(self.parallel_config['pipeline_parallel_size'])])
+        return args
+    
+    def build_speculative_args(self) -> list:
+        """
+        构建投机解码参数
+        
+        Returns:
+            参数列表，未启用时为空
+        """
+        spec = self.speculative_config
+        if not spec.get('enabled', False):
+            return []
+        
+        args = []
+        if spec['method'] == 'ngram':
+            # n-gram prompt lookup：从提示词中查找匹配片段作为草稿，无需额外模型
+            args.extend(['--speculative-model', '[ngram]'])
+            args.extend(['--ngram-prompt-lookup-max', str(spec.get('ngram_prompt_lookup_max', 4))])
+            args.extend(['--ngram-prompt-lookup-min', str(spec.get('ngram_prompt_lookup_min', 1))])
+        else:
+            args.extend(['--speculative-model', spec['draft_model']])
+            args.extend([
+                '--speculative-draft-tensor-parallel-size',
+                str(spec.get('draft_tensor_parallel_size', 1))
+            ])
+        args.extend(['--num-speculative-tokens', str(spec['num_speculative_tokens'])])
+        
+        # 投机解码依赖v2 block manager
+        args.append('--use-v2-block-manager')
+        return args
     
     def build_vllm_args(self) -> list:
         """
@@ -112,13 +222,19 @@ class VLLMServer:
         if 'dtype' in self.model_config:
             args.extend(['--dtype', self.model_config['dtype']])
         
+        # 量化（权重由 src/quantize.py 离线生成）
+        if self.model_config.get('quantization'):
+            args.extend(['--quantization', self.model_config['quantization']])
+        
         # 内存配置
         if 'gpu_memory_utilization' in self.inference_config:
             args.extend(['--gpu-memory-utilization', str(self.inference_config['gpu_memory_utilization'])])
         
-        # 张量并行
-        if 'tensor_parallel_size' in self.inference_config:
-            args.extend(['--tensor-parallel-size', str(self.inference_config['tensor_parallel_size'])])
+        # 张量并行/流水线并行
+        args.extend(self.build_parallel_args())
+        
+        if 'distributed_executor_backend' in self.inference_config:
+            args.extend(['--distributed-executor-backend', self.inference_config['distributed_executor_backend']])
         
         # KV Cache优化
         if self.inference_config.get('enable_prefix_caching', False):
@@ -128,6 +244,9 @@ class VLLMServer:
         if self.inference_config.get('disable_log_requests', False):
             args.append('--disable-log-requests')
         
+        # 投机解码
+        args.extend(self.build_speculative_args())
+        
         # 服务器配置
         args.extend(['--host', self.server_config['host']])
         args.extend(['--port', str(self.server_config['port'])])
@@ -135,14 +254,34 @@ class VLLMServer:
         logger.info(f"vLLM args: {' '.join(args)}")
         return args
     
+    def record_launch(self, vllm_args: list, start_ns: Optional[int] = None) -> None:
+        """
+        为不经过 start() 的启动路径（容器内的 entrypoint.sh）记录启动span
+        
+        Args:
+            vllm_args: 实际使用的vLLM参数
+            start_ns: 启动开始时间（纳秒），默认为当前时间
+        """
+        span = self.tracer.start_span("launcher.setup", new_request_id(), force=True, start_ns=start_ns)
+        span.set_attribute("launcher.mode", self.mode)
+        span.set_attribute("launcher.vllm_args", ' '.join(vllm_args))
+        span.set_attribute("launcher.entrypoint", "entrypoint.sh")
+        span.end()
+        self.tracer.flush()
+    
     def start(self) -> None:
         """启动服务器"""
         try:
-            # 设置环境
-            self.setup_environment()
-            
-            # 构建参数
-            vllm_args = self.build_vllm_args()
+            # 启动阶段记录为一条独立的trace
+            with self.tracer.span("launcher.setup", new_request_id(), force=True) as span:
+                # 设置环境
+                self.setup_environment()
+                
+                # 构建参数
+                vllm_args = self.build_vllm_args()
+                span.set_attribute("launcher.mode", self.mode)
+                span.set_attribute("launcher.vllm_args", ' '.join(vllm_args))
+            self.tracer.flush()
             
             logger.info(f"Starting vLLM server in {self.mode} mode...")
             logger.info(f"Model: {self.model_config['name']}")
@@ -168,8 +307,8 @@ def main():
         '--mode',
         type=str,
         default='fast',
-        choices=['fast', 'slow'],
-        help='Thinking mode: fast or slow (default: fast)'
+        choices=THINKING_MODES,
+        help='Thinking mode: fast, slow or quant (default: fast)'
     )
     
     parser.add_argument(
@@ -187,6 +326,59 @@ def main():
         help='Logging level (default: INFO)'
     )
     
+    parser.add_argument(
+        '--devices',
+        type=str,
+        default=None,
+        help='Comma-separated NPU device IDs, overrides inference.devices (e.g. 0,1)'
+    )
+    
+    parser.add_argument(
+        '--tensor-parallel-size',
+        type=int,
+        default=None,
+        help='Tensor parallel size, overrides inference.tensor_parallel_size'
+    )
+    
+    parser.add_argument(
+        '--pipeline-parallel-size',
+        type=int,
+        default=None,
+        help='Pipeline parallel size, overrides inference.pipeline_parallel_size'
+    )
+    
+    parser.add_argument(
+        '--docker-args',
+        action='store_true',
+        help='Print docker device mounts and environment for the configured topology, one per line, and exit'
+    )
+    
+    parser.add_argument(
+        '--parallel-args',
+        action='store_true',
+        help='Print the tensor/pipeline parallel engine args, one per line, and exit'
+    )
+    
+    parser.add_argument(
+        '--speculative-args',
+        action='store_true',
+        help='Print the speculative decoding engine args, one per line, and exit'
+    )
+    
+    parser.add_argument(
+        '--trace-launch',
+        type=str,
+        default=None,
+        help='Record a launcher.setup span for the given vLLM args (used by entrypoint.sh) and exit'
+    )
+    
+    parser.add_argument(
+        '--launch-start-ns',
+        type=int,
+        default=None,
+        help='Launch start time in nanoseconds for --trace-launch (default: now)'
+    )
+    
     args = parser.parse_args()
     
     # 设置日志级别
@@ -194,7 +386,27 @@ def main():
     
     # 创建并启动服务器
     try:
-        server = VLLMServer(mode=args.mode, config_path=args.config)
+        server = VLLMServer(
+            mode=args.mode,
+            config_path=args.config,
+            devices=args.devices,
+            tensor_parallel_size=args.tensor_parallel_size,
+            pipeline_parallel_size=args.pipeline_parallel_size
+        )
+        if args.docker_args:
+            print('\n'.join(server.build_docker_args()))
+            return
+        if args.trace_launch is not None:
+            server.record_launch(args.trace_launch.split(), start_ns=args.launch_start_ns)
+            return
+        if args.parallel_args:
+            print('\n'.join(server.build_parallel_args()))
+            return
+        if args.speculative_args:
+            speculative_args = server.build_speculative_args()
+            if speculative_args:
+                print('\n'.join(speculative_args))
+            return
         server.start()
     except Exception as e:
         logger.error(f"Server failed: {e}")
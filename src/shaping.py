@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token budget shaping for vLLM-Ascend gateway
+请求token预算整形模块
+
+在请求到达引擎之前，用本地tokenizer统计提示词token数：
+  - 提示词本身已超过 max_model_len 的请求直接拒绝
+  - max_tokens 截断到剩余预算，未指定时使用模式的 generation.max_tokens，
+    避免调度器按 max_model_len 预留过多KV Cache
+  - token数通过 X-Prompt-Tokens 头传给下游用于计量
+
+tokenizer实例全局缓存；并发到达的请求在短时间窗口内合并为一次批量编码，
+chat模板渲染和编码都在线程池中执行，不阻塞网关事件循环。
+"""
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 传递提示词token数的HTTP头
+PROMPT_TOKENS_HEADER = "X-Prompt-Tokens"
+
+# 需要整形的接口
+COMPLETIONS_PATH = "/v1/completions"
+CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+
+
+@lru_cache(maxsize=4)
+def get_tokenizer(tokenizer_path: str):
+    """
+    加载并缓存tokenizer
+
+    Args:
+        tokenizer_path: tokenizer所在路径（通常为模型路径）
+
+    Returns:
+        HuggingFace tokenizer实例
+    """
+    from transformers import AutoTokenizer
+
+    logger.info(f"Loading tokenizer from {tokenizer_path}")
+    return AutoTokenizer.from_pretrained(tokenizer_path)
+
+
+class TokenBudgetShaper:
+    """token预算整形器"""
+
+    def __init__(
+        self,
+        tokenizer: Any,
+        max_model_len: int,
+        default_max_tokens: int,
+        max_batch_size: int = 32,
+        batch_wait_ms: float = 2.0
+    ):
+        """
+        初始化整形器
+
+        Args:
+            tokenizer: HuggingFace兼容的tokenizer
+            max_model_len: 最大序列长度（提示词 + 生成）
+            default_max_tokens: 请求未指定max_tokens时使用的默认值
+            max_batch_size: 单次批量编码的最大文本数
+            batch_wait_ms: 合并并发请求的等待窗口（毫秒）
+        """
+        self.tokenizer = tokenizer
+        self.max_model_len = max_model_len
+        self.default_max_tokens = default_max_tokens
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait_ms / 1000
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], tokenizer: Any = None) -> "TokenBudgetShaper":
+        """
+        根据配置创建整形器
+
+        Args:
+            config: 完整配置字典
+            tokenizer: 已加载的tokenizer，默认按 shaping.tokenizer_path 或 model.path 加载
+
+        Returns:
+            TokenBudgetShaper实例
+        """
+        shaping_config = config.get('shaping') or {}
+        if tokenizer is None:
+            tokenizer = get_tokenizer(shaping_config.get('tokenizer_path') or config['model']['path'])
+
+        return cls(
+            tokenizer,
+            max_model_len=config['inference']['max_model_len'],
+            default_max_tokens=config['generation']['max_tokens'],
+            max_batch_size=shaping_config.get('max_batch_size', 32),
+            batch_wait_ms=shaping_config.get('batch_wait_ms', 2.0),
+        )
+
+    def render_prompts(self, payload: Dict[str, Any], chat: bool) -> Tuple[List[Any], List[int], bool]:
+        """
+        提取需要编码的提示词
+
+        chat请求返回消息列表本身，模板在 count_tokens 中与编码一起渲染。
+
+        Args:
+            payload: 请求体
+            chat: 是否为chat completions请求
+
+        Returns:
+            (待编码的文本或消息列表, 已是token ID的提示词长度列表, 是否添加特殊token)
+        """
+        if chat:
+            messages = payload.get('messages')
+            if not isinstance(messages, list):
+                return [], [], False
+            # chat模板渲染后的文本已包含特殊token
+            return [messages], [], False
+
+        prompt = payload.get('prompt')
+        if isinstance(prompt, str):
+            return [prompt], [], True
+        if isinstance(prompt, list) and prompt:
+            if all(isinstance(p, int) for p in prompt):
+                return [], [len(prompt)], True
+            texts = [p for p in prompt if isinstance(p, str)]
+            counted = [len(p) for p in prompt if isinstance(p, list)]
+            return texts, counted, True
+        return [], [], True
+
+    def count_tokens(self, texts: List[Any], add_special_tokens: bool = True) -> List[int]:
+        """批量编码并返回每条文本的token数（消息列表先按chat模板渲染）"""
+        if not texts:
+            return []
+        texts = [
+            text if isinstance(text, str)
+            else self.tokenizer.apply_chat_template(text, tokenize=False, add_generation_prompt=True)
+            for text in texts
+        ]
+        encoded = self.tokenizer(texts, add_special_tokens=add_special_tokens)
+        return [len(ids) for ids in encoded['input_ids']]
+
+    def apply_budget(self, payload: Dict[str, Any], prompt_tokens: List[int]) -> Dict[str, Any]:
+        """
+        根据提示词token数整形请求（原地修改payload的max_tokens）
+
+        Args:
+            payload: 请求体
+            prompt_tokens: 每条提示词的token数
+
+        Returns:
+            包含prompt_tokens、max_tokens、clamped（被截断）、defaulted（使用默认值）的字典
+
+        Raises:
+            ValueError: 提示词已超出 max_model_len 或 max_tokens 非法
+        """
+        longest = max(prompt_tokens)
+        remaining = self.max_model_len - longest
+        if remaining <= 0:
+            raise ValueError(
+                f"This model's maximum context length is {self.max_model_len} tokens, "
+                f"but the prompt has {longest} tokens"
+            )
+
+        requested = payload.get('max_tokens')
+        if requested is None:
+            requested = self.default_max_tokens
+        elif not isinstance(requested, int) or isinstance(requested, bool) or requested <= 0:
+            raise ValueError(f"max_tokens must be a positive integer, got {requested!r}")
+
+        original = payload.get('max_tokens')
+        max_tokens = min(requested, remaining)
+        payload['max_tokens'] = max_tokens
+
+        return {
+            "prompt_tokens": sum(prompt_tokens),
+            "max_tokens": max_tokens,
+            "clamped": original is not None and max_tokens < original,
+            "defaulted": original is None,
+        }
+
+    def shape(self, payload: Dict[str, Any], chat: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        同步整形单个请求
+
+        Returns:
+            整形结果，请求中没有可识别的提示词时返回None（交给引擎校验）
+        """
+        texts, counted, add_special_tokens = self.render_prompts(payload, chat)
+        prompt_tokens = counted + self.count_tokens(texts, add_special_tokens)
+        if not prompt_tokens:
+            return None
+        return self.apply_budget(payload, prompt_tokens)
+
+    async def shape_async(self, payload: Dict[str, Any], chat: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        异步整形单个请求，编码与并发请求合并批量执行
+
+        Returns:
+            整形结果，请求中没有可识别的提示词时返回None（交给引擎校验）
+        """
+        texts, counted, add_special_tokens = self.render_prompts(payload, chat)
+        if texts:
+            counted = counted + await self._count_batched(texts, add_special_tokens)
+        if not counted:
+            return None
+        return self.apply_budget(payload, counted)
+
+    async def _count_batched(self, texts: List[Any], add_special_tokens: bool) -> List[int]:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._batch_worker())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, add_special_tokens, future))
+        return await future
+
+    async def _batch_worker(self) -> None:
+        """合并等待窗口内的编码请求，按是否添加特殊token分组批量编码"""
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self._queue.get()]
+            size = len(jobs[0][0])
+            deadline = loop.time() + self.batch_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                jobs.append(job)
+                size += len(job[0])
+
+            for add_special_tokens in (True, False):
+                group = [job for job in jobs if job[1] == add_special_tokens]
+                if not group:
+                    continue
+                texts = [text for job in group for text in job[0]]
+                try:
+                    counts = await loop.run_in_executor(None, self.count_tokens, texts, add_special_tokens)
+                except Exception:
+                    # 批量编码失败时逐个重试，只让出错的请求失败（如chat消息格式错误）
+                    for job_texts, _, future in group:
+                        try:
+                            result = await loop.run_in_executor(
+                                None, self.count_tokens, job_texts, add_special_tokens
+                            )
+                        except Exception as e:
+                            if not future.done():
+                                future.set_exception(e)
+                        else:
+                            if not future.done():
+                                future.set_result(result)
+                    continue
+
+                offset = 0
+                for job_texts, _, future in group:
+                    if not future.done():
+                        future.set_result(counts[offset:offset + len(job_texts)])
+                    offset += len(job_texts)
+
+    async def close(self) -> None:
+        """停止批量编码任务"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -0,0 +1,728 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Engine simulator for vLLM-Ascend
+模拟vLLM引擎的OpenAI兼容服务
+
+在没有NPU的机器上提供与vLLM相同的接口（/health、/v1/models、
+/v1/completions、/v1/chat/completions、/metrics），按照vLLM的调度方式
+模拟请求时序：
+  - 连续批处理：每次迭代要么对新请求做prefill，要么对运行中的请求各解码一个token，
+    运行中的请求数不超过 max_num_seqs
+  - prefill耗时与本次迭代的提示词token数成线性关系，解码步耗时与批大小成线性关系
+  - KV Cache按 block_size 分块，块不足时抢占最晚到达的请求（释放KV后重新排队并重算）
+
+耗时参数可以从 tests/benchmark.py 的结果JSON校准，用于离线容量规划，
+以及在CPU机器上运行 benchmark.py 和 test_api.py。
+"""
+
+import sys
+import json
+import math
+import time
+import uuid
+import zlib
+import random
+import asyncio
+import argparse
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from aiohttp import web
+
+from utils import (
+    load_config,
+    get_config_path,
+    parse_thinking_mode,
+    THINKING_MODES,
+    QUEUE_METRIC,
+    RUNNING_METRIC,
+    KV_USAGE_METRIC,
+    TTFT_METRIC,
+    TTFT_BUCKETS,
+)
+from tracing import REQUEST_ID_HEADER
+
+# 配置日志
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# 未校准时的耗时参数（秒），量级对应单卡Qwen3-0.6B
+DEFAULT_PROFILE = {
+    "prefill_base": 0.020,  # 每次prefill迭代的固定开销
+    "prefill_per_token": 0.0002,  # 每个提示词token的prefill耗时
+    "decode_base": 0.025,  # 每个解码步的固定开销
+    "decode_per_seq": 0.0004,  # 批中每增加一个序列的解码步耗时
+}
+
+# vLLM的延迟直方图桶（秒）
+TPOT_BUCKETS = (0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 2.5)
+E2E_BUCKETS = (1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 40.0, 50.0, 60.0)
+
+# vLLM completions接口的max_tokens默认值
+DEFAULT_MAX_TOKENS = 16
+
+# 生成文本使用的词表
+VOCABULARY = (
+    "模拟", "推理", "结果", "昇腾", "模型", "计算", "数据", "服务", "请求", "批处理",
+    "的", "是", "在", "和", "，", "。", " the", " model", " token", " batch",
+)
+
+
+def estimate_prompt_tokens(text: str) -> int:
+    """
+    估计提示词token数：CJK字符按每字一个token，其余字符按每4个一个token
+
+    Args:
+        text: 提示词
+
+    Returns:
+        token数（至少为1）
+    """
+    cjk = sum(1 for ch in text if '一' <= ch <= '鿿' or '　' <= ch <= '〿' or '＀' <= ch <= '￯')
+    return max(1, cjk + math.ceil((len(text) - cjk) / 4))
+
+
+def fit_line(xs: List[float], ys: List[float]) -> Optional[Tuple[float, float]]:
+    """
+    最小二乘拟合 y = intercept + slope * x
+
+    Returns:
+        (intercept, slope)，x只有一个取值时返回None
+    """
+    if len(set(xs)) < 2:
+        return None
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    slope = (
+        sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+        / sum((x - mean_x) ** 2 for x in xs)
+    )
+    return mean_y - slope * mean_x, slope
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def calibrate(
+    results: Any,
+    max_num_seqs: int,
+    profile: Optional[Dict[str, float]] = None
+) -> Tuple[Dict[str, float], List[str]]:
+    """
+    根据benchmark结果校准耗时参数
+
+    每组结果（每个benchmark结果文件中的每个模式）贡献一个数据点：
+      - 解码：批大小取 min(concurrency, max_num_seqs)，对应逐token延迟的中位数
+      - prefill：提示词token数对应TTFT的10%分位数（近似无排队的prefill耗时），
+        需要流式结果和记录中的 prompt_tokens
+    数据点的取值范围足够大（最大值至少为最小值的1.5倍）时做线性拟合；
+    否则保持默认参数中斜率与截距的比例，只缩放整体大小。
+
+    Args:
+        results: benchmark.py --output 的内容（模式到统计结果）、单个统计结果，
+            或多个结果文件内容的列表（如不同并发度的多次运行）
+        max_num_seqs: 最大并发序列数（批大小上限）
+        profile: 初始参数，默认 DEFAULT_PROFILE
+
+    Returns:
+        (校准后的参数, 已校准的参数名列表)
+    """
+    profile = dict(profile or DEFAULT_PROFILE)
+    blocks = []
+    for source in (results if isinstance(results, list) else [results]):
+        if 'records' in source:
+            blocks.append(source)
+        else:
+            blocks.extend(v for v in source.values() if isinstance(v, dict))
+
+    decode_points: List[Tuple[float, float]] = []
+    prefill_points: List[Tuple[float, float]] = []
+    for stats in blocks:
+        records = [r for r in stats.get('records', []) if r.get('success')]
+        if not records:
+            continue
+
+        per_token = []
+        for r in records:
+            tokens = r.get('generated_tokens', 0)
+            if r.get('ttft') is not None and tokens > 1:
+                per_token.append((r['latency'] - r['ttft']) / (tokens - 1))
+        if per_token and stats.get('concurrency'):
+            decode_points.append((min(stats['concurrency'], max_num_seqs), _median(per_token)))
+
+        prefills = [(r['prompt_tokens'], r['ttft']) for r in records
+                    if r.get('ttft') is not None and r.get('prompt_tokens')]
+        if prefills:
+            ttfts = sorted(t for _, t in prefills)
+            prefill_points.append((_median([p for p, _ in prefills]), ttfts[len(ttfts) // 10]))
+
+    calibrated = []
+    for points, base_key, slope_key in (
+        (decode_points, 'decode_base', 'decode_per_seq'),
+        (prefill_points, 'prefill_base', 'prefill_per_token'),
+    ):
+        if not points:
+            continue
+        xs = [x for x, _ in points]
+        fit = fit_line(xs, [y for _, y in points]) if max(xs) >= 1.5 * min(xs) else None
+        if fit is not None and fit[0] > 0 and fit[1] >= 0:
+            profile[base_key], profile[slope_key] = fit
+        else:
+            x = _median([x for x, _ in points])
+            y = _median([y for _, y in points])
+            scale = y / (profile[base_key] + profile[slope_key] * x)
+            profile[base_key] *= scale
+            profile[slope_key] *= scale
+        calibrated.extend([base_key, slope_key])
+
+    return profile, calibrated
+
+
+class Histogram:
+    """Prometheus直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, le in enumerate(self.buckets) if value <= le), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+
+    def render(self, name: str, label: str) -> List[str]:
+        lines = [f"# TYPE {name} histogram"]
+        cumulative = 0
+        for le, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le_label = '+Inf' if le == float('inf') else le
+            lines.append(f'{name}_bucket{{{label},le="{le_label}"}} {cumulative}')
+        lines.append(f'{name}_count{{{label}}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}}} {self.sum}')
+        return lines
+
+
+class SimRequest:
+    """模拟请求"""
+
+    def __init__(self, request_id: str, prompt_tokens: int, max_tokens: int, rng: random.Random):
+        self.request_id = request_id
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.rng = rng
+        self.generated = 0
+        self.blocks = 0
+        self.arrival = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.aborted = False
+        self.tokens: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def context_len(self) -> int:
+        """当前上下文长度（提示词 + 已生成）"""
+        return self.prompt_tokens + self.generated
+
+    @property
+    def finished(self) -> bool:
+        return self.generated >= self.max_tokens
+
+
+class EngineSimulator:
+    """连续批处理调度与KV Cache模拟"""
+
+    def __init__(
+        self,
+        profile: Dict[str, float],
+        max_num_seqs: int,
+        max_model_len: int,
+        block_size: int = 16,
+        num_gpu_blocks: Optional[int] = None,
+        time_scale: float = 1.0
+    ):
+        """
+        初始化模拟引擎
+
+        Args:
+            profile: 耗时参数（见 DEFAULT_PROFILE）
+            max_num_seqs: 最大并发序列数
+            max_model_len: 最大序列长度
+            block_size: KV Cache块大小（token）
+            num_gpu_blocks: KV Cache总块数，默认可容纳 max_num_seqs 个 max_model_len/4 长度的序列
+            time_scale: 时间缩放系数，小于1时按比例加速（用于测试）
+        """
+        self.profile = profile
+        self.max_num_seqs = max_num_seqs
+        self.max_model_len = max_model_len
+        self.block_size = block_size
+        self.num_gpu_blocks = num_gpu_blocks or max_num_seqs * math.ceil(max_model_len / block_size) // 4
+        self.time_scale = time_scale
+
+        self.waiting: deque = deque()
+        self.running: List[SimRequest] = []
+        self.free_blocks = self.num_gpu_blocks
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.num_preemptions = 0
+        self.prompt_tokens_total = 0
+        self.generation_tokens_total = 0
+        self.success_total = 0
+        self.ttft = Histogram(TTFT_BUCKETS)
+        self.tpot = Histogram(TPOT_BUCKETS)
+        self.e2e = Histogram(E2E_BUCKETS)
+
+    def blocks_for(self, tokens: int) -> int:
+        return math.ceil(tokens / self.block_size)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def submit(self, request: SimRequest) -> None:
+        """加入等待队列"""
+        self.prompt_tokens_total += request.prompt_tokens
+        self.waiting.append(request)
+        self._wakeup.set()
+
+    def _free(self, request: SimRequest) -> None:
+        self.free_blocks += request.blocks
+        request.blocks = 0
+
+    def _emit(self, request: SimRequest, now: float) -> None:
+        """为请求生成一个token"""
+        request.generated += 1
+        self.generation_tokens_total += 1
+        if request.first_token_at is None:
+            request.first_token_at = now
+            self.ttft.observe(now - request.arrival)
+        else:
+            self.tpot.observe(now - request.last_token_at)
+        request.last_token_at = now
+        request.tokens.put_nowait(request.rng.choice(VOCABULARY))
+
+    def _finish(self, request: SimRequest, now: float) -> None:
+        self._free(request)
+        self.running.remove(request)
+        self.success_total += 1
+        self.e2e.observe(now - request.arrival)
+        request.tokens.put_nowait(None)
+
+    def _preempt(self, request: SimRequest) -> None:
+        """抢占请求：释放KV Cache，放回等待队列头部，重新调度时重算"""
+        self._free(request)
+        self.running.remove(request)
+        self.waiting.appendleft(request)
+        self.num_preemptions += 1
+        logger.debug(f"Preempted {request.request_id} at {request.context_len} tokens")
+
+    def _schedule_prefill(self) -> List[SimRequest]:
+        """按到达顺序接纳等待中的请求，直到达到并发上限或KV Cache不足"""
+        admitted = []
+        while self.waiting and len(self.running) + len(admitted) < self.max_num_seqs:
+            request = self.waiting[0]
+            if request.aborted:
+                self.waiting.popleft()
+                continue
+            needed = self.blocks_for(request.context_len + 1)
+            if needed > self.free_blocks:
+                break
+            self.waiting.popleft()
+            self.free_blocks -= needed
+            request.blocks = needed
+            admitted.append(request)
+        return admitted
+
+    def _reserve_decode_slots(self) -> None:
+        """为每个运行中的请求预留下一个token的KV位置，不足时抢占最晚到达的请求"""
+        for request in sorted(self.running, key=lambda r: r.arrival):
+            if request not in self.running:
+                continue
+            needed = self.blocks_for(request.context_len + 1) - request.blocks
+            while needed > self.free_blocks:
+                self._preempt(max(self.running, key=lambda r: r.arrival))
+                if request not in self.running:
+                    break
+            else:
+                self.free_blocks -= needed
+                request.blocks += needed
+
+    async def step(self) -> None:
+        """执行一次调度迭代"""
+        for request in [r for r in self.running if r.aborted]:
+            self._free(request)
+            self.running.remove(request)
+
+        admitted = self._schedule_prefill()
+        if admitted:
+            tokens = sum(r.context_len for r in admitted)
+            duration = self.profile['prefill_base'] + self.profile['prefill_per_token'] * tokens
+            batch = admitted
+            self.running.extend(admitted)
+        else:
+            self._reserve_decode_slots()
+            if not self.running:
+                return
+            duration = self.profile['decode_base'] + self.profile['decode_per_seq'] * len(self.running)
+            batch = list(self.running)
+
+        await asyncio.sleep(duration * self.time_scale)
+
+        now = time.perf_counter()
+        for request in batch:
+            if request in self.running:
+                self._emit(request, now)
+                if request.finished:
+                    self._finish(request, now)
+
+    async def run(self) -> None:
+        """调度循环"""
+        while True:
+            if not self.running and not self.waiting:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self.step()
+
+    def kv_usage(self) -> float:
+        return 1 - self.free_blocks / self.num_gpu_blocks
+
+    def metrics_text(self, model_name: str) -> str:
+        """渲染vLLM同名的Prometheus指标"""
+        label = f'model_name="{model_name}"'
+        lines = []
+        for name, kind, value in (
+            (RUNNING_METRIC, "gauge", len(self.running)),
+            (QUEUE_METRIC, "gauge", len(self.waiting)),
+            ("vllm:num_requests_swapped", "gauge", 0),
+            (KV_USAGE_METRIC, "gauge", self.kv_usage()),
+            ("vllm:num_preemptions_total", "counter", self.num_preemptions),
+            ("vllm:prompt_tokens_total", "counter", self.prompt_tokens_total),
+            ("vllm:generation_tokens_total", "counter", self.generation_tokens_total),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{{{label}}} {value}")
+        lines.append("# TYPE vllm:request_success_total counter")
+        lines.append(f'vllm:request_success_total{{finished_reason="length",{label}}} {self.success_total}')
+        lines.extend(self.ttft.render(TTFT_METRIC, label))
+        lines.extend(self.tpot.render("vllm:time_per_output_token_seconds", label))
+        lines.extend(self.e2e.render("vllm:e2e_request_latency_seconds", label))
+        return '\n'.join(lines) + '\n'
+
+
+def _error(message: str, error_type: str, status: int) -> web.Response:
+    return web.json_response(
+        {"object": "error", "message": message, "type": error_type, "param": None, "code": status},
+        status=status,
+    )
+
+
+class SimulatorServer:
+    """OpenAI兼容的HTTP接口"""
+
+    def __init__(self, engine: EngineSimulator, model_name: str):
+        """
+        Args:
+            engine: 模拟引擎
+            model_name: 服务的模型名称（与vLLM相同，为 --model 的路径）
+        """
+        self.engine = engine
+        self.model_name = model_name
+        self.created = int(time.time())
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self.engine.start()
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        await self.engine.stop()
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.Response(status=200)
+
+    async def models(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "object": "list",
+            "data": [{
+                "id": self.model_name,
+                "object": "model",
+                "created": self.created,
+                "owned_by": "vllm",
+                "root": self.model_name,
+                "max_model_len": self.engine.max_model_len,
+            }],
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.engine.metrics_text(self.model_name), content_type='text/plain')
+
+    def _prompt_tokens(self, payload: Dict[str, Any], chat: bool) -> int:
+        """
+        计算提示词token数
+
+        Raises:
+            ValueError: 缺少提示词或格式不支持
+        """
+        if chat:
+            messages = payload.get('messages')
+            if not isinstance(messages, list) or not messages:
+                raise ValueError("messages is required")
+            text = ''.join(str(m.get('content', '')) for m in messages if isinstance(m, dict))
+            # chat模板为每条消息增加角色标记
+            return estimate_prompt_tokens(text) + 4 * len(messages)
+
+        prompt = payload.get('prompt')
+        if isinstance(prompt, str) and prompt:
+            return estimate_prompt_tokens(prompt)
+        if isinstance(prompt, list) and prompt:
+            if all(isinstance(p, int) for p in prompt):
+                return len(prompt)
+            if len(prompt) == 1:
+                only = prompt[0]
+                if isinstance(only, str) and only:
+                    return estimate_prompt_tokens(only)
+                if isinstance(only, list) and only:
+                    return len(only)
+            raise ValueError("The simulator supports a single prompt per request")
+        raise ValueError("prompt is required")
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        chat = request.path.endswith('/chat/completions')
+        try:
+            payload = await request.json()
+        except ValueError:
+            return _error("Invalid JSON body", "BadRequestError", 400)
+        if not isinstance(payload, dict):
+            return _error("Request body must be a JSON object", "BadRequestError", 400)
+
+        model = payload.get('model')
+        if model is None:
+            return _error("model is required", "BadRequestError", 400)
+        if model != self.model_name:
+            return _error(f"The model `{model}` does not exist.", "NotFoundError", 404)
+
+        try:
+            prompt_tokens = self._prompt_tokens(payload, chat)
+        except ValueError as e:
+            return _error(str(e), "BadRequestError", 400)
+
+        max_tokens = payload.get('max_tokens')
+        if max_tokens is None:
+            max_tokens = self.engine.max_model_len - prompt_tokens if chat else DEFAULT_MAX_TOKENS
+        if not isinstance(max_tokens, int) or isinstance(max_tokens, bool) or max_tokens < 1:
+            return _error(f"max_tokens must be at least 1, got {max_tokens!r}", "BadRequestError", 400)
+        if prompt_tokens + max_tokens > self.engine.max_model_len:
+            return _error(
+                f"This model's maximum context length is {self.engine.max_model_len} tokens. "
+                f"However, you requested {prompt_tokens + max_tokens} tokens "
+                f"({prompt_tokens} in the messages, {max_tokens} in the completion). "
+                f"Please reduce the length of the messages or completion.",
+                "BadRequestError", 400,
+            )
+        if self.engine.blocks_for(prompt_tokens + max_tokens) > self.engine.num_gpu_blocks:
+            return _error(
+                f"Request needs {prompt_tokens + max_tokens} tokens of KV cache, "
+                f"but only {self.engine.num_gpu_blocks * self.engine.block_size} are available",
+                "BadRequestError", 400,
+            )
+
+        # temperature为0时按提示词确定性生成，便于比较输出
+        temperature = payload.get('temperature', 1.0)
+        seed = payload.get('seed')
+        if seed is None and temperature == 0:
+            seed = zlib.crc32(json.dumps(payload.get('messages' if chat else 'prompt'),
+                                         ensure_ascii=False).encode('utf-8'))
+        request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        sim_request = SimRequest(request_id, prompt_tokens, max_tokens, random.Random(seed))
+        self.engine.submit(sim_request)
+
+        completion_id = f"{'chatcmpl' if chat else 'cmpl'}-{request_id}"
+        try:
+            if payload.get('stream', False):
+                include_usage = bool((payload.get('stream_options') or {}).get('include_usage', False))
+                return await self._stream(request, sim_request, completion_id, chat, include_usage)
+            return await self._complete(sim_request, completion_id, chat)
+        finally:
+            if not sim_request.finished:
+                sim_request.aborted = True
+
+    def _usage(self, sim_request: SimRequest) -> Dict[str, int]:
+        return {
+            "prompt_tokens": sim_request.prompt_tokens,
+            "completion_tokens": sim_request.generated,
+            "total_tokens": sim_request.prompt_tokens + sim_request.generated,
+        }
+
+    async def _complete(self, sim_request: SimRequest, completion_id: str, chat: bool) -> web.Response:
+        pieces = []
+        while True:
+            piece = await sim_request.tokens.get()
+            if piece is None:
+                break
+            pieces.append(piece)
+        text = ''.join(pieces)
+
+        if chat:
+            choice = {"index": 0, "message": {"role": "assistant", "content": text},
+                      "logprobs": None, "finish_reason": "length", "stop_reason": None}
+        else:
+            choice = {"index": 0, "text": text, "logprobs": None,
+                      "finish_reason": "length", "stop_reason": None}
+        return web.json_response(
+            {
+                "id": completion_id,
+                "object": "chat.completion" if chat else "text_completion",
+                "created": int(time.time()),
+                "model": self.model_name,
+                "choices": [choice],
+                "usage": self._usage(sim_request),
+            },
+            headers={REQUEST_ID_HEADER: sim_request.request_id},
+        )
+
+    async def _stream(
+        self,
+        request: web.Request,
+        sim_request: SimRequest,
+        completion_id: str,
+        chat: bool,
+        include_usage: bool
+    ) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            REQUEST_ID_HEADER: sim_request.request_id,
+        })
+        await response.prepare(request)
+
+        created = int(time.time())
+        base = {
+            "id": completion_id,
+            "object": "chat.completion.chunk" if chat else "text_completion",
+            "created": created,
+            "model": self.model_name,
+        }
+
+        async def send(chunk: Dict[str, Any]) -> None:
+            await response.write(f"data: {json.dumps(dict(base, **chunk), ensure_ascii=False)}\n\n".encode('utf-8'))
+
+        sent = 0
+        while True:
+            piece = await sim_request.tokens.get()
+            if piece is None:
+                break
+            sent += 1
+            finish_reason = "length" if sent == sim_request.max_tokens else None
+            if chat:
+                delta = {"role": "assistant", "content": piece} if sent == 1 else {"content": piece}
+                choice = {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}
+            else:
+                choice = {"index": 0, "text": piece, "logprobs": None, "finish_reason": finish_reason}
+            await send({"choices": [choice]})
+
+        if include_usage:
+            await send({"choices": [], "usage": self._usage(sim_request)})
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def build_app(self) -> web.Application:
+        """构建aiohttp应用"""
+        app = web.Application()
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/v1/models', self.models)
+        app.router.add_get('/metrics', self.metrics)
+        app.router.add_post('/v1/completions', self.completions)
+        app.router.add_post('/v1/chat/completions', self.completions)
+        return app
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='vLLM-Ascend Engine Simulator')
+
+    parser.add_argument('--mode', type=str, default='fast', choices=THINKING_MODES,
+                        help='Thinking mode whose inference config is simulated (default: fast)')
+    parser.add_argument('--config', type=str, default=None,
+                        help='Path to custom configuration file')
+    parser.add_argument('--calibrate', type=str, nargs='+', default=None,
+                        help='Benchmark results JSON files (tests/benchmark.py --output) to calibrate timings from, '
+                             'e.g. runs at different concurrency levels')
+    parser.add_argument('--num-gpu-blocks', type=int, default=None,
+                        help='KV cache capacity in blocks (default: max_num_seqs sequences of max_model_len/4)')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='Multiply all simulated durations, e.g. 0.1 runs 10x faster (default: 1.0)')
+    parser.add_argument('--host', type=str, default='0.0.0.0',
+                        help='Listen host (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Listen port (default: server.port in config)')
+
+    args = parser.parse_args()
+
+    mode = parse_thinking_mode(args.mode)
+    config = load_config(args.config or get_config_path(mode))
+    inference_config = config['inference']
+
+    profile = dict(DEFAULT_PROFILE)
+    if args.calibrate:
+        results = []
+        for path in args.calibrate:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    results.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load calibration results from {path}: {e}")
+                sys.exit(1)
+        profile, calibrated = calibrate(results, inference_config['max_num_seqs'])
+        sources = ', '.join(args.calibrate)
+        if calibrated:
+            logger.info(f"Calibrated {', '.join(calibrated)} from {sources}")
+        else:
+            logger.warning(f"No usable records in {sources}, using default timings")
+    logger.info("Timing profile: " + ", ".join(f"{k}={v * 1000:.3f}ms" for k, v in profile.items()))
+
+    engine = EngineSimulator(
+        profile,
+        max_num_seqs=inference_config['max_num_seqs'],
+        max_model_len=inference_config['max_model_len'],
+        block_size=inference_config.get('block_size', 16),
+        num_gpu_blocks=args.num_gpu_blocks,
+        time_scale=args.time_scale,
+    )
+    server = SimulatorServer(engine, config['model']['path'])
+    port = args.port or config['server']['port']
+
+    logger.info(
+        f"Simulating {config['model']['name']} ({mode} mode) on {args.host}:{port}: "
+        f"max_num_seqs={engine.max_num_seqs}, max_model_len={engine.max_model_len}, "
+        f"{engine.num_gpu_blocks} KV blocks of {engine.block_size} tokens"
+    )
+    try:
+        web.run_app(server.build_app(), host=args.host, port=port, print=None)
+    except Exception as e:
+        logger.error(f"Simulator failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
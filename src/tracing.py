@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request tracing for vLLM-Ascend deployment
+请求级链路追踪模块
+
+每个请求通过 X-Request-ID 头传递请求ID，启动器、网关和压测客户端
+根据同一个请求ID推导出相同的 trace_id，因此各组件记录的span可以在
+查看器中拼接成一条完整链路。span缓存在内存中，批量追加写入本地
+OTLP兼容的JSON Lines文件（每行一个 ExportTraceServiceRequest）；
+自动写盘在后台线程中执行，不阻塞网关的事件循环。
+"""
+
+import os
+import json
+import time
+import uuid
+import zlib
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 请求ID传递使用的HTTP头
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# OTLP span类型
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+def new_request_id() -> str:
+    """生成新的请求ID"""
+    return uuid.uuid4().hex
+
+
+def trace_id_for(request_id: str) -> str:
+    """
+    根据请求ID推导trace_id
+
+    Args:
+        request_id: 请求ID
+
+    Returns:
+        32位十六进制trace_id，相同请求ID在所有组件中结果一致
+    """
+    return hashlib.md5(request_id.encode('utf-8')).hexdigest()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """将Python值转换为OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """单个span，结束时提交给所属的Tracer"""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_span_id',
+                 'kind', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        """结束span（重复调用无效）"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        self.tracer._submit(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """转换为OTLP JSON格式的span"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+class _NoopSpan:
+    """未采样请求使用的空span，所有操作均为空操作"""
+
+    span_id = None
+    trace_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    请求追踪器
+
+    采样按请求ID哈希决定，同一请求在所有组件中采样结果一致。
+    未采样或未启用时只返回空span，开销可以忽略。
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        output_path: Optional[str] = None,
+        sample_rate: float = 1.0,
+        enabled: bool = True,
+        flush_every: int = 256
+    ):
+        """
+        初始化追踪器
+
+        Args:
+            service_name: 服务名称（写入resource的service.name）
+            output_path: 导出文件路径（JSON Lines）
+            sample_rate: 采样率，0.0-1.0
+            enabled: 是否启用
+            flush_every: 缓存span数量达到该值时在后台线程自动写盘
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Invalid sample_rate: {sample_rate}")
+
+        self.service_name = service_name
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.enabled = enabled and output_path is not None and sample_rate > 0
+        self.flush_every = flush_every
+
+        self._threshold = int(sample_rate * 0xFFFFFFFF)
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+        if self.enabled:
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            logger.info(
+                f"Tracing enabled for {service_name}: sample_rate={sample_rate}, output={output_path}"
+            )
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], service_name: str) -> "Tracer":
+        """
+        根据配置中的tracing段创建追踪器
+
+        Args:
+            config: 完整配置字典
+            service_name: 服务名称
+
+        Returns:
+            Tracer实例（未配置时返回禁用的追踪器）
+        """
+        tracing_config = config.get('tracing') or {}
+        return cls(
+            service_name=service_name,
+            output_path=tracing_config.get('output_path'),
+            sample_rate=float(tracing_config.get('sample_rate', 1.0)),
+            enabled=bool(tracing_config.get('enabled', False)),
+            flush_every=int(tracing_config.get('flush_every', 256)),
+        )
+
+    def is_sampled(self, request_id: str) -> bool:
+        """判断请求是否被采样"""
+        if not self.enabled:
+            return False
+        return zlib.crc32(request_id.encode('utf-8')) <= self._threshold
+
+    def start_span(
+        self,
+        name: str,
+        request_id: str,
+        parent: Optional[Any] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None,
+        force: bool = False
+    ):
+        """
+        开始一个span，需要调用方显式调用 end()
+
+        Args:
+            name: span名称
+            request_id: 请求ID
+            parent: 父span
+            kind: span类型
+            attributes: 属性
+            start_ns: 开始时间（纳秒），默认为当前时间
+            force: 忽略采样率强制记录（追踪器启用时）
+
+        Returns:
+            Span，或未采样时的空span
+        """
+        if not (self.enabled and force) and not self.is_sampled(request_id):
+            return NOOP_SPAN
+
+        attrs = {"request.id": request_id}
+        if attributes:
+            attrs.update(attributes)
+        return Span(
+            self,
+            name,
+            trace_id_for(request_id),
+            parent_span_id=getattr(parent, 'span_id', None),
+            kind=kind,
+            attributes=attrs,
+            start_ns=start_ns,
+        )
+
+    @contextmanager
+    def span(self, name: str, request_id: str, parent: Optional[Any] = None,
+             kind: int = SPAN_KIND_INTERNAL,
+             attributes: Optional[Dict[str, Any]] = None,
+             force: bool = False) -> Iterator[Any]:
+        """以上下文管理器方式记录span，异常会记录到span状态中"""
+        span = self.start_span(name, request_id, parent=parent, kind=kind,
+                               attributes=attributes, force=force)
+        try:
+            yield span
+        except Exception as e:
+            span.set_error(str(e))
+            raise
+        finally:
+            span.end()
+
+    def _submit(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self.flush_every:
+                return
+            spans, self._buffer = self._buffer, []
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracer")
+            writer = self._writer
+        writer.submit(self._write, spans)
+
+    def flush(self) -> int:
+        """
+        将缓存的span同步追加写入导出文件
+
+        Returns:
+            写入的span数量
+        """
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        return self._write(spans)
+
+    def _write(self, spans: List[Span]) -> int:
+        if not spans or not self.enabled:
+            return 0
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": self.service_name}}
+                    ]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "vllm-ascend-deployment"},
+                    "spans": [s.to_otlp() for s in spans],
+                }],
+            }]
+        }
+        line = json.dumps(payload, ensure_ascii=False) + "\n"
+        try:
+            with self._write_lock, open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to export {len(spans)} spans to {self.output_path}: {e}")
+            return 0
+
+        logger.debug(f"Exported {len(spans)} spans to {self.output_path}")
+        return len(spans)
+
+    def close(self) -> None:
+        """等待后台写盘完成并写出剩余的span"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+        self.flush()
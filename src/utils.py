@@ -6,9 +6,11 @@ Utility functions for vLLM-Ascend deployment
 """
 
 import os
+import re
+import json
 import yaml
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 from pathlib import Path
 
 # 配置日志
@@ -18,6 +20,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 支持的运行模式
+THINKING_MODES = ['fast', 'slow', 'quant']
+
+# 支持的量化类型（权重/激活位宽）
+QUANT_TYPES = ['w8a8', 'w8a16']
+
+# 支持的投机解码方式
+SPECULATIVE_METHODS = ['ngram', 'draft_model']
+
+# Prometheus文本格式的样本行：name{labels} value
+_METRIC_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+_METRIC_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+# 扩缩容控制器读取、引擎模拟器输出的vLLM指标
+QUEUE_METRIC = "vllm:num_requests_waiting"
+RUNNING_METRIC = "vllm:num_requests_running"
+KV_USAGE_METRIC = "vllm:gpu_cache_usage_perc"
+TTFT_METRIC = "vllm:time_to_first_token_seconds"
+
+# vLLM的TTFT直方图桶（秒）
+TTFT_BUCKETS = (0.001, 0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.1, 0.25, 0.5,
+                0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """
@@ -44,7 +69,7 @@ def get_config_path(mode: str = "fast") -> str:
     获取配置文件路径
     
     Args:
-        mode: 运行模式 ("fast" 或 "slow")
+        mode: 运行模式 ("fast"、"slow" 或 "quant")
         
     Returns:
         配置文件的绝对路径
@@ -136,6 +161,351 @@ def validate_model_path(model_path: str) -> bool:
     return True
 
 
+def parse_device_list(devices: Union[str, int, List[int], None]) -> List[int]:
+    """
+    解析设备列表
+
+    Args:
+        devices: 设备列表、单个设备ID或逗号分隔的字符串（如 "0,1"）
+
+    Returns:
+        设备ID列表
+    """
+    if devices is None:
+        return []
+    if isinstance(devices, int):
+        return [devices]
+    if isinstance(devices, str):
+        return [int(d) for d in devices.split(',') if d.strip()]
+    return [int(d) for d in devices]
+
+
+def resolve_parallel_config(inference_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    解析多卡并行配置
+
+    未配置 devices 时兼容旧的单卡 device_id 配置。
+
+    Args:
+        inference_config: 推理配置
+
+    Returns:
+        包含devices、tensor_parallel_size、pipeline_parallel_size的字典
+    """
+    devices = inference_config.get('devices')
+    if devices is None:
+        devices = inference_config.get('device_id', 0)
+
+    return {
+        'devices': parse_device_list(devices),
+        'tensor_parallel_size': int(inference_config.get('tensor_parallel_size', 1)),
+        'pipeline_parallel_size': int(inference_config.get('pipeline_parallel_size', 1)),
+    }
+
+
+def validate_parallel_topology(parallel_config: Dict[str, Any]) -> bool:
+    """
+    验证设备列表与并行规模是否匹配
+
+    Args:
+        parallel_config: resolve_parallel_config 的返回值
+
+    Returns:
+        True if valid, False otherwise
+    """
+    devices = parallel_config['devices']
+    tp = parallel_config['tensor_parallel_size']
+    pp = parallel_config['pipeline_parallel_size']
+
+    if tp < 1 or pp < 1:
+        logger.error(f"Invalid parallel sizes: tensor={tp}, pipeline={pp}")
+        return False
+
+    if not devices:
+        logger.error("No NPU devices configured")
+        return False
+
+    if any(d < 0 for d in devices):
+        logger.error(f"Invalid device IDs: {devices}")
+        return False
+
+    if len(set(devices)) != len(devices):
+        logger.error(f"Duplicate device IDs: {devices}")
+        return False
+
+    if len(devices) != tp * pp:
+        logger.error(
+            f"Device count {len(devices)} does not match "
+            f"tensor_parallel_size * pipeline_parallel_size = {tp} * {pp}"
+        )
+        return False
+
+    return True
+
+
+def check_model_parallelism(model_path: str, parallel_config: Dict[str, Any]) -> bool:
+    """
+    根据模型config.json检查模型结构能否按并行规模切分
+
+    Args:
+        model_path: 模型路径
+        parallel_config: resolve_parallel_config 的返回值
+
+    Returns:
+        True if the model can be partitioned, False otherwise
+    """
+    config_file = Path(model_path) / 'config.json'
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            model_config = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot read {config_file}, skipping parallelism check: {e}")
+        return True
+
+    tp = parallel_config['tensor_parallel_size']
+    pp = parallel_config['pipeline_parallel_size']
+
+    num_heads = model_config.get('num_attention_heads')
+    if num_heads and num_heads % tp != 0:
+        logger.error(f"num_attention_heads ({num_heads}) is not divisible by tensor_parallel_size ({tp})")
+        return False
+
+    # KV头数少于TP规模时会被复制，大于时必须整除
+    num_kv_heads = model_config.get('num_key_value_heads', num_heads)
+    if num_kv_heads and num_kv_heads >= tp and num_kv_heads % tp != 0:
+        logger.error(f"num_key_value_heads ({num_kv_heads}) is not divisible by tensor_parallel_size ({tp})")
+        return False
+
+    num_layers = model_config.get('num_hidden_layers')
+    if num_layers and num_layers < pp:
+        logger.error(f"num_hidden_layers ({num_layers}) is smaller than pipeline_parallel_size ({pp})")
+        return False
+
+    return True
+
+
+def build_parallel_env(
+    parallel_config: Dict[str, Any],
+    hccl_config: Optional[Dict[str, Any]] = None,
+    in_container: bool = False
+) -> Dict[str, str]:
+    """
+    生成多卡运行所需的设备可见性和HCCL通信环境变量
+
+    Args:
+        parallel_config: resolve_parallel_config 的返回值
+        hccl_config: HCCL配置（connect_timeout、exec_timeout、buffsize及额外的环境变量）
+        in_container: 是否用于容器内。容器只挂载所选设备，运行时从0开始重新编号
+
+    Returns:
+        环境变量字典
+    """
+    devices = parallel_config['devices']
+    visible = list(range(len(devices))) if in_container else devices
+
+    env = {
+        'ASCEND_RT_VISIBLE_DEVICES': ','.join(str(d) for d in visible),
+        'ASCEND_DEVICE_ID': '0',
+    }
+
+    world_size = parallel_config['tensor_parallel_size'] * parallel_config['pipeline_parallel_size']
+    if world_size > 1:
+        hccl_config = dict(hccl_config or {})
+        env.update({
+            'HCCL_CONNECT_TIMEOUT': str(hccl_config.pop('connect_timeout', 1200)),
+            'HCCL_EXEC_TIMEOUT': str(hccl_config.pop('exec_timeout', 1200)),
+            'HCCL_BUFFSIZE': str(hccl_config.pop('buffsize', 200)),
+            # Atlas 300I Duo卡间无HCCS，走PCIe通信
+            'HCCL_INTRA_PCIE_ENABLE': '1',
+            'HCCL_INTRA_ROCE_ENABLE': '0',
+        })
+        # 其余键按原样作为HCCL环境变量
+        for key, value in hccl_config.items():
+            env[key.upper()] = str(value)
+
+    return env
+
+
+def build_device_mounts(devices: List[int]) -> List[str]:
+    """
+    生成docker run的NPU设备挂载参数
+
+    Args:
+        devices: 设备ID列表
+
+    Returns:
+        docker参数列表
+    """
+    mounts = [f"--device=/dev/davinci{d}" for d in devices]
+    mounts.extend([
+        "--device=/dev/davinci_manager",
+        "--device=/dev/devmm_svm",
+        "--device=/dev/hisi_hdc",
+    ])
+    return mounts
+
+
+def validate_speculative_config(spec_config: Optional[Dict[str, Any]]) -> bool:
+    """
+    验证投机解码配置
+
+    Args:
+        spec_config: 配置中的speculative段
+
+    Returns:
+        True if valid (or disabled), False otherwise
+    """
+    if not spec_config or not spec_config.get('enabled', False):
+        return True
+
+    method = spec_config.get('method')
+    if method not in SPECULATIVE_METHODS:
+        logger.error(f"Invalid speculative method: {method}, must be one of {SPECULATIVE_METHODS}")
+        return False
+
+    if spec_config.get('num_speculative_tokens', 0) <= 0:
+        logger.error("Invalid num_speculative_tokens")
+        return False
+
+    if method == 'ngram':
+        lookup_min = spec_config.get('ngram_prompt_lookup_min', 1)
+        lookup_max = spec_config.get('ngram_prompt_lookup_max', 4)
+        if lookup_min < 1 or lookup_min > lookup_max:
+            logger.error(f"Invalid n-gram lookup range: [{lookup_min}, {lookup_max}]")
+            return False
+
+    if method == 'draft_model' and not spec_config.get('draft_model'):
+        logger.error("Missing draft_model path for speculative method 'draft_model'")
+        return False
+
+    return True
+
+
+def parse_prometheus_metrics(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """
+    解析Prometheus文本格式的指标（vLLM的 /metrics 端点）
+
+    Args:
+        text: 指标文本
+
+    Returns:
+        指标名到 (标签字典, 值) 列表的映射
+    """
+    metrics: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = _METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        label_dict = dict(_METRIC_LABEL.findall(labels)) if labels else {}
+        metrics.setdefault(name, []).append((label_dict, value))
+    return metrics
+
+
+def metric_total(metrics: Dict[str, List[Tuple[Dict[str, str], float]]], name: str) -> Optional[float]:
+    """
+    对指标的所有标签组合求和
+
+    Returns:
+        合计值，指标不存在时返回None
+    """
+    if name not in metrics:
+        return None
+    return sum(value for _, value in metrics[name])
+
+
+def histogram_buckets(
+    metrics: Dict[str, List[Tuple[Dict[str, str], float]]],
+    name: str
+) -> List[Tuple[float, float]]:
+    """
+    汇总直方图指标所有标签组合的累计桶计数
+
+    Args:
+        metrics: parse_prometheus_metrics 的返回值
+        name: 直方图名称（不含 _bucket 后缀）
+
+    Returns:
+        按上界排序的 (le, 累计计数) 列表，指标不存在时为空
+    """
+    buckets: Dict[float, float] = {}
+    for labels, value in metrics.get(f"{name}_bucket", []):
+        if 'le' not in labels:
+            continue
+        le = float(labels['le'])
+        buckets[le] = buckets.get(le, 0.0) + value
+    return sorted(buckets.items())
+
+
+def histogram_quantile(buckets: List[Tuple[float, float]], quantile: float) -> Optional[float]:
+    """
+    按Prometheus histogram_quantile的方式在桶内线性插值估计分位数
+
+    Args:
+        buckets: histogram_buckets 的返回值（或两次采样的差值）
+        quantile: 分位数（0-1）
+
+    Returns:
+        分位数估计，没有观测值时返回None；落在 +Inf 桶时返回最大的有限上界
+    """
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+
+    rank = quantile * buckets[-1][1]
+    prev_le, prev_count = 0.0, 0.0
+    for le, count in buckets:
+        if count >= rank:
+            if le == float('inf'):
+                return prev_le
+            if count == prev_count:
+                return le
+            return prev_le + (le - prev_le) * (rank - prev_count) / (count - prev_count)
+        prev_le, prev_count = le, count
+    return prev_le
+
+
+def validate_autoscaler_config(autoscaler_config: Optional[Dict[str, Any]]) -> bool:
+    """
+    验证自动扩缩容配置
+
+    Args:
+        autoscaler_config: autoscaler配置段，未配置或未启用时视为合法
+
+    Returns:
+        True if valid, False otherwise
+    """
+    if not autoscaler_config or not autoscaler_config.get('enabled', False):
+        return True
+
+    min_replicas = autoscaler_config.get('min_replicas', 1)
+    max_replicas = autoscaler_config.get('max_replicas', 1)
+    if min_replicas < 1 or max_replicas < min_replicas:
+        logger.error(f"Invalid replica bounds: min={min_replicas}, max={max_replicas}")
+        return False
+
+    # 缩容阈值必须低于扩容阈值，留出滞回区间
+    if autoscaler_config.get('queue_low', 0) >= autoscaler_config.get('queue_high', 1):
+        logger.error("autoscaler.queue_low must be lower than queue_high")
+        return False
+    if autoscaler_config.get('kv_low', 0) >= autoscaler_config.get('kv_high', 1):
+        logger.error("autoscaler.kv_low must be lower than kv_high")
+        return False
+    if not 0 < autoscaler_config.get('ttft_low_ratio', 0.5) < 1:
+        logger.error("autoscaler.ttft_low_ratio must be between 0 and 1")
+        return False
+    if autoscaler_config.get('ttft_p95_slo', 1.0) <= 0:
+        logger.error("autoscaler.ttft_p95_slo must be positive")
+        return False
+
+    return True
+
+
 def parse_thinking_mode(mode: Optional[str]) -> str:
     """
     解析思考模式参数
@@ -144,14 +514,14 @@ def parse_thinking_mode(mode: Optional[str]) -> str:
         mode: 模式字符串
         
     Returns:
-        标准化的模式字符串 ("fast" 或 "slow")
+        标准化的模式字符串 ("fast"、"slow" 或 "quant")
     """
     if mode is None:
         mode = os.environ.get('THINKING_MODE', 'fast')
     
     mode = mode.lower().strip()
     
-    if mode not in ['fast', 'slow']:
+    if mode not in THINKING_MODES:
         logger.warning(f"Invalid thinking mode: {mode}, defaulting to 'fast'")
         return 'fast'
     
@@ -186,6 +556,10 @@ class ConfigValidator:
                 logger.error("Missing model path in config")
                 return False
             
+            if model_config.get('quantization') and model_config.get('quant_type') not in QUANT_TYPES:
+                logger.error(f"Invalid quant_type: {model_config.get('quant_type')}, must be one of {QUANT_TYPES}")
+                return False
+            
             # 验证推理配置
             inference_config = config['inference']
             if inference_config.get('max_model_len', 0) <= 0:
@@ -196,6 +570,18 @@ class ConfigValidator:
                 logger.error("Invalid max_num_seqs")
                 return False
             
+            # 验证多卡并行拓扑
+            if not validate_parallel_topology(resolve_parallel_config(inference_config)):
+                return False
+            
+            # 验证投机解码配置
+            if not validate_speculative_config(config.get('speculative')):
+                return False
+            
+            # 验证自动扩缩容配置
+            if not validate_autoscaler_config(config.get('autoscaler')):
+                return False
+            
             # 验证服务器配置
             server_config = config['server']
             if server_config.get('port', 0) <= 0 or server_config.get('port', 0) > 65535:
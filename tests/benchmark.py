@@ -5,69 +5,287 @@ Performance Benchmark for vLLM-Ascend
 性能基准测试
 """
 
+import os
+import sys
 import argparse
 import time
 import statistics
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 
+# 添加src路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from tracing import Tracer, REQUEST_ID_HEADER, SPAN_KIND_CLIENT, new_request_id
+from utils import parse_prometheus_metrics, metric_total, load_config, get_config_path
+from shaping import PROMPT_TOKENS_HEADER
+
 # 配置
-BASE_URL = "http://localhost:8000"
+BASE_URL = os.environ.get("VLLM_API_URL", "http://localhost:8000")
+MODEL_NAME = "/models/qwen3-0.6b"
 TIMEOUT = 60
 
+# vLLM投机解码计数器
+SPEC_ACCEPTED = "vllm:spec_decode_num_accepted_tokens_total"
+SPEC_DRAFT = "vllm:spec_decode_num_draft_tokens_total"
+SPEC_EMITTED = "vllm:spec_decode_num_emitted_tokens_total"
+
+# 测试场景配置
+SCENARIOS = {
+    'fast': {
+        'prompt': '什么是人工智能？请简要回答。',
+        'max_tokens': 50,
+        'temperature': 0.7
+    },
+    'slow': {
+        'prompt': '详细解释深度学习的工作原理，包括神经网络、反向传播和梯度下降等核心概念：',
+        'max_tokens': 500,
+        'temperature': 0.3
+    }
+}
+
+
+def per_token_latency(record: Dict[str, Any]) -> Optional[float]:
+    """
+    计算单个请求的每token延迟
+    
+    流式请求使用首token之后的解码间隔（TPOT），非流式请求使用总延迟均摊。
+    """
+    tokens = record.get("generated_tokens", 0)
+    if not record.get("success") or tokens <= 0:
+        return None
+    if record.get("ttft") is not None and tokens > 1:
+        return (record["latency"] - record["ttft"]) / (tokens - 1)
+    return record["latency"] / tokens
+
+
+def speculative_stats(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    num_speculative_tokens: Optional[int]
+) -> Optional[Dict[str, float]]:
+    """
+    根据测试前后的投机解码计数器增量计算接受率
+    
+    每个解码步对每条序列提出 num_speculative_tokens 个草稿token，
+    因此 步数 = 草稿token数 / num_speculative_tokens。接受token计数器
+    也包含第一个被拒绝位置之后被接受（但不输出）的草稿token，不能用
+    输出token数与它的差值推算步数。
+    
+    Args:
+        before: 测试前的指标
+        after: 测试后的指标
+        num_speculative_tokens: 每步草稿token数（服务端的 --num-speculative-tokens）
+    
+    Returns:
+        投机解码统计，服务端未启用投机解码或未知草稿token数时返回None
+    """
+    deltas = {}
+    for name in (SPEC_ACCEPTED, SPEC_DRAFT, SPEC_EMITTED):
+        start, end = metric_total(before, name), metric_total(after, name)
+        if start is None or end is None:
+            return None
+        deltas[name] = end - start
+    
+    accepted, draft, emitted = deltas[SPEC_ACCEPTED], deltas[SPEC_DRAFT], deltas[SPEC_EMITTED]
+    if draft <= 0 or not num_speculative_tokens:
+        return None
+    steps = draft / num_speculative_tokens
+    
+    return {
+        "draft_tokens": draft,
+        "accepted_tokens": accepted,
+        "emitted_tokens": emitted,
+        "acceptance_rate": accepted / draft,
+        "mean_accepted_per_step": accepted / steps,
+        "mean_tokens_per_step": emitted / steps,
+    }
+
+
+def compare_to_baseline(stats: Dict[str, Any], baseline: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    与同一工作负载的基线结果（如未启用投机解码的运行）对比
+    
+    Returns:
+        每token延迟与生成吞吐的加速比，缺少数据时返回None
+    """
+    try:
+        base_latency = baseline["per_token_latency"]["mean"]
+        latency = stats["per_token_latency"]["mean"]
+        base_tps = baseline["tokens"]["total"] / baseline["total_time"]
+        tps = stats["tokens"]["total"] / stats["total_time"]
+    except (KeyError, TypeError, ZeroDivisionError):
+        return None
+    
+    return {
+        "baseline_per_token_latency": base_latency,
+        "per_token_speedup": base_latency / latency if latency else 0.0,
+        "throughput_speedup": tps / base_tps if base_tps else 0.0,
+    }
+
 
 class BenchmarkRunner:
     """性能测试运行器"""
     
-    def __init__(self, api_url: str = BASE_URL):
+    def __init__(
+        self,
+        api_url: str = BASE_URL,
+        tracer: Optional[Tracer] = None,
+        model: str = MODEL_NAME
+    ):
         self.api_url = api_url
+        self.model = model
         self.completion_url = f"{api_url}/v1/completions"
+        self.tracer = tracer or Tracer("vllm-benchmark", enabled=False)
     
-    def single_request(self, prompt: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    @staticmethod
+    def _read_stream(response: requests.Response, start_time: float):
+        """
+        读取SSE流式响应
+        
+        请求带 stream_options.include_usage 时，最后一个chunk只包含usage。
+        投机解码时一个chunk可能包含多个token，因此token数以usage为准。
+        
+        Returns:
+            (生成文本, 首token延迟, 生成token数, 提示词token数)，
+            服务端未返回usage时token数为chunk数、提示词token数为None
+        """
+        texts = []
+        ttft = None
+        chunks = 0
+        usage = None
+        for line in response.iter_lines():
+            if not line or not line.startswith(b"data: "):
+                continue
+            data = line[len(b"data: "):]
+            if data.strip() == b"[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            if ttft is None:
+                ttft = time.time() - start_time
+            chunks += 1
+            texts.append(choices[0].get("text", ""))
+        usage = usage or {}
+        return "".join(texts), ttft, usage.get("completion_tokens", chunks), usage.get("prompt_tokens")
+    
+    def fetch_metrics(self) -> Dict[str, Any]:
+        """获取服务端Prometheus指标，失败时返回空字典"""
+        try:
+            response = requests.get(f"{self.api_url}/metrics", timeout=10)
+            if response.status_code == 200:
+                return parse_prometheus_metrics(response.text)
+        except requests.RequestException:
+            pass
+        return {}
+    
+    def single_request(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+        submitted_at: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         发送单个请求并测量性能
         
+        Args:
+            stream: 是否使用流式响应（用于测量首token延迟）
+            submitted_at: 请求进入线程池队列的时间，用于记录客户端排队span
+        
         Returns:
-            包含延迟、tokens等信息的字典
+            包含请求ID、延迟、tokens等信息的字典
         """
+        request_id = new_request_id()
         payload = {
-            "model": "/models/qwen3-0.6b",
+            "model": self.model,
             "prompt": prompt,
             "max_tokens": max_tokens,
             "temperature": temperature
         }
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        headers = {REQUEST_ID_HEADER: request_id}
         
         start_time = time.time()
+        root = self.tracer.start_span(
+            "client.request", request_id, kind=SPAN_KIND_CLIENT,
+            attributes={"request.max_tokens": max_tokens, "request.stream": stream},
+            start_ns=int(submitted_at * 1e9) if submitted_at else None
+        )
+        if submitted_at is not None:
+            queue_span = self.tracer.start_span(
+                "client.queue", request_id, parent=root, start_ns=int(submitted_at * 1e9)
+            )
+            queue_span.end(int(start_time * 1e9))
+        
         try:
-            response = requests.post(self.completion_url, json=payload, timeout=TIMEOUT)
-            latency = time.time() - start_time
+            response = requests.post(
+                self.completion_url, json=payload, headers=headers, timeout=TIMEOUT, stream=stream
+            )
             
             if response.status_code == 200:
-                data = response.json()
-                generated_text = data["choices"][0]["text"]
+                ttft = None
+                # 经过网关整形时由 X-Prompt-Tokens 头返回提示词token数
+                prompt_tokens = response.headers.get(PROMPT_TOKENS_HEADER)
+                prompt_tokens = int(prompt_tokens) if prompt_tokens else None
+                if stream:
+                    generated_text, ttft, generated_tokens, usage_prompt_tokens = self._read_stream(
+                        response, start_time
+                    )
+                    prompt_tokens = usage_prompt_tokens or prompt_tokens
+                else:
+                    data = response.json()
+                    generated_text = data["choices"][0]["text"]
+                    usage = data.get("usage") or {}
+                    generated_tokens = usage.get("completion_tokens", len(generated_text.split()))
+                    prompt_tokens = usage.get("prompt_tokens", prompt_tokens)
+                latency = time.time() - start_time
+                
+                if ttft is not None:
+                    ttft_span = self.tracer.start_span(
+                        "client.ttft", request_id, parent=root, start_ns=int(start_time * 1e9)
+                    )
+                    ttft_span.end(int((start_time + ttft) * 1e9))
+                root.set_attribute("response.tokens", generated_tokens)
                 
                 return {
+                    "request_id": request_id,
                     "success": True,
                     "latency": latency,
-                    "generated_tokens": len(generated_text.split()),
+                    "ttft": ttft,
+                    "prompt_tokens": prompt_tokens,
+                    "generated_tokens": generated_tokens,
                     "status_code": response.status_code
                 }
             else:
+                root.set_error(f"HTTP {response.status_code}")
                 return {
+                    "request_id": request_id,
                     "success": False,
-                    "latency": latency,
+                    "latency": time.time() - start_time,
                     "error": f"HTTP {response.status_code}",
                     "status_code": response.status_code
                 }
         except Exception as e:
+            root.set_error(str(e))
             return {
+                "request_id": request_id,
                 "success": False,
                 "latency": time.time() - start_time,
                 "error": str(e),
                 "status_code": None
             }
+        finally:
+            root.end()
     
     def benchmark_throughput(
         self,
@@ -75,10 +293,14 @@ class BenchmarkRunner:
         max_tokens: int,
         temperature: float,
         num_requests: int,
-        concurrency: int
+        concurrency: int,
+        stream: bool = False,
+        num_speculative_tokens: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         吞吐量基准测试
+        
+        num_speculative_tokens 为服务端每步的草稿token数，用于计算投机解码统计。
         """
         print(f"\n{'='*60}")
         print(f"Running throughput benchmark...")
@@ -88,6 +310,7 @@ class BenchmarkRunner:
         print(f"{'='*60}\n")
         
         results = []
+        metrics_before = self.fetch_metrics()
         
         with ThreadPoolExecutor(max_workers=concurrency) as executor:
             futures = []
@@ -96,7 +319,9 @@ class BenchmarkRunner:
                     self.single_request,
                     prompt,
                     max_tokens,
-                    temperature
+                    temperature,
+                    stream,
+                    time.time()
                 )
                 futures.append(future)
             
@@ -122,6 +347,7 @@ class BenchmarkRunner:
         
         stats = {
             "total_requests": num_requests,
+            "concurrency": concurrency,
             "successful_requests": len(successful_results),
             "failed_requests": len(failed_results),
             "success_rate": len(successful_results) / num_requests * 100,
@@ -140,9 +366,33 @@ class BenchmarkRunner:
             "tokens": {
                 "total": total_tokens,
                 "per_request": total_tokens / len(successful_results) if successful_results else 0
-            }
+            },
+            # 逐请求记录，可通过request_id与trace文件关联
+            "records": results
         }
         
+        per_token = sorted(v for v in (per_token_latency(r) for r in successful_results) if v is not None)
+        if per_token:
+            stats["per_token_latency"] = {
+                "mean": statistics.mean(per_token),
+                "p50": statistics.median(per_token),
+                "p95": statistics.quantiles(per_token, n=20)[18] if len(per_token) >= 20 else max(per_token),
+            }
+        
+        spec = speculative_stats(metrics_before, self.fetch_metrics(), num_speculative_tokens)
+        if spec is not None:
+            stats["speculative"] = spec
+        
+        ttfts = [r["ttft"] for r in successful_results if r.get("ttft") is not None]
+        if ttfts:
+            stats["ttft"] = {
+                "mean": statistics.mean(ttfts),
+                "p50": statistics.median(ttfts),
+                "p95": statistics.quantiles(ttfts, n=20)[18] if len(ttfts) >= 20 else max(ttfts),
+                "p99": statistics.quantiles(ttfts, n=100)[98] if len(ttfts) >= 100 else max(ttfts),
+            }
+        
+        self.tracer.flush()
         return stats
     
     def print_results(self, stats: Dict[str, Any]) -> None:
@@ -173,6 +423,30 @@ class BenchmarkRunner:
         print(f"  P95:                 {stats['latency']['p95']:.3f}s")
         print(f"  P99:                 {stats['latency']['p99']:.3f}s")
         
+        if "ttft" in stats:
+            print(f"\n🚦 Time To First Token (seconds):")
+            print(f"  Mean:                {stats['ttft']['mean']:.3f}s")
+            print(f"  P50:                 {stats['ttft']['p50']:.3f}s")
+            print(f"  P95:                 {stats['ttft']['p95']:.3f}s")
+            print(f"  P99:                 {stats['ttft']['p99']:.3f}s")
+        
+        if "per_token_latency" in stats:
+            print(f"\n⏩ Per-Token Latency (ms):")
+            print(f"  Mean:                {stats['per_token_latency']['mean'] * 1000:.2f}ms")
+            print(f"  P50:                 {stats['per_token_latency']['p50'] * 1000:.2f}ms")
+            print(f"  P95:                 {stats['per_token_latency']['p95'] * 1000:.2f}ms")
+        
+        if "speculative" in stats:
+            print(f"\n🔮 Speculative Decoding:")
+            print(f"  Acceptance rate:     {stats['speculative']['acceptance_rate']:.1%}")
+            print(f"  Accepted per step:   {stats['speculative']['mean_accepted_per_step']:.2f}")
+            print(f"  Tokens per step:     {stats['speculative']['mean_tokens_per_step']:.2f}")
+        
+        if "comparison" in stats:
+            print(f"\n📈 Versus Baseline:")
+            print(f"  Per-token speedup:   {stats['comparison']['per_token_speedup']:.2f}x")
+            print(f"  Throughput speedup:  {stats['comparison']['throughput_speedup']:.2f}x")
+        
         print(f"\n🎯 Token Statistics:")
         print(f"  Total tokens:        {stats['tokens']['total']}")
         print(f"  Tokens per request:  {stats['tokens']['per_request']:.1f}")
@@ -187,7 +461,14 @@ def main():
         '--url',
         type=str,
         default=BASE_URL,
-        help='API base URL (default: http://localhost:8000)'
+        help=f'API base URL (default: {BASE_URL}, or $VLLM_API_URL)'
+    )
+    
+    parser.add_argument(
+        '--model',
+        type=str,
+        default=MODEL_NAME,
+        help=f'Served model name (default: {MODEL_NAME})'
     )
     
     parser.add_argument(
@@ -219,23 +500,54 @@ def main():
         help='Output JSON file path (optional)'
     )
     
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Use streaming responses and measure time to first token'
+    )
+    
+    parser.add_argument(
+        '--trace-output',
+        type=str,
+        default=None,
+        help='Export client-side request spans to this OTLP JSON Lines file (optional)'
+    )
+    
+    parser.add_argument(
+        '--trace-sample-rate',
+        type=float,
+        default=1.0,
+        help='Trace sampling rate, 0.0-1.0 (default: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--num-speculative-tokens',
+        type=int,
+        default=None,
+        help='Draft tokens per step on the server (default: speculative.num_speculative_tokens from the mode config)'
+    )
+    
+    parser.add_argument(
+        '--compare-to',
+        type=str,
+        default=None,
+        help='Baseline results JSON from a previous run on the same workload, e.g. without speculative decoding (optional)'
+    )
+    
     args = parser.parse_args()
     
-    runner = BenchmarkRunner(api_url=args.url)
-    
-    # 测试场景配置
-    scenarios = {
-        'fast': {
-            'prompt': '什么是人工智能？请简要回答。',
-            'max_tokens': 50,
-            'temperature': 0.7
-        },
-        'slow': {
-            'prompt': '详细解释深度学习的工作原理，包括神经网络、反向传播和梯度下降等核心概念：',
-            'max_tokens': 500,
-            'temperature': 0.3
-        }
-    }
+    baseline_results = {}
+    if args.compare_to:
+        with open(args.compare_to, 'r', encoding='utf-8') as f:
+            baseline_results = json.load(f)
+    
+    tracer = Tracer(
+        "vllm-benchmark",
+        output_path=args.trace_output,
+        sample_rate=args.trace_sample_rate,
+        enabled=args.trace_output is not None
+    )
+    runner = BenchmarkRunner(api_url=args.url, tracer=tracer, model=args.model)
     
     all_results = {}
     
@@ -245,15 +557,26 @@ def main():
     for mode in modes_to_test:
         print(f"\n🚀 Testing {mode.upper()} mode...")
         
-        scenario = scenarios[mode]
+        scenario = SCENARIOS[mode]
+        num_speculative_tokens = args.num_speculative_tokens
+        if num_speculative_tokens is None:
+            spec_config = load_config(get_config_path(mode)).get('speculative') or {}
+            num_speculative_tokens = spec_config.get('num_speculative_tokens')
         stats = runner.benchmark_throughput(
             prompt=scenario['prompt'],
             max_tokens=scenario['max_tokens'],
             temperature=scenario['temperature'],
             num_requests=args.requests,
-            concurrency=args.concurrency
+            concurrency=args.concurrency,
+            stream=args.stream,
+            num_speculative_tokens=num_speculative_tokens
         )
         
+        if mode in baseline_results:
+            comparison = compare_to_baseline(stats, baseline_results[mode])
+            if comparison is not None:
+                stats["comparison"] = comparison
+        
         runner.print_results(stats)
         all_results[mode] = stats
     
@@ -262,6 +585,10 @@ def main():
         with open(args.output, 'w', encoding='utf-8') as f:
             json.dump(all_results, f, indent=2, ensure_ascii=False)
         print(f"\n💾 Results saved to {args.output}")
+    
+    if args.trace_output:
+        tracer.close()
+        print(f"🔍 Traces saved to {args.trace_output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+pytest配置：将src目录加入模块搜索路径
+
+使用 --simulate 时在本地启动引擎模拟服务（src/simulator.py），
+API测试通过 VLLM_API_URL 指向它，无需NPU。
+"""
+
+import os
+import sys
+import time
+import socket
+import subprocess
+
+import requests
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--simulate',
+        action='store_true',
+        default=False,
+        help='Run API tests against the engine simulator instead of a live NPU server'
+    )
+    parser.addoption(
+        '--simulate-calibration',
+        action='append',
+        default=None,
+        help='Benchmark results JSON used to calibrate the simulator timings (repeatable)'
+    )
+    parser.addoption(
+        '--simulate-time-scale',
+        default='0.1',
+        help='Time scale for the simulator (default: 0.1, i.e. 10x faster)'
+    )
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def pytest_configure(config):
+    if not config.getoption('--simulate'):
+        return
+
+    port = _free_port()
+    command = [
+        sys.executable, os.path.join(SRC_DIR, 'simulator.py'),
+        '--host', '127.0.0.1',
+        '--port', str(port),
+        '--time-scale', config.getoption('--simulate-time-scale'),
+    ]
+    if config.getoption('--simulate-calibration'):
+        command.extend(['--calibrate', *config.getoption('--simulate-calibration')])
+
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Simulator exited with code {process.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                break
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    else:
+        process.terminate()
+        raise RuntimeError("Simulator did not become healthy within 30s")
+
+    os.environ['VLLM_API_URL'] = url
+    config._simulator_process = process
+
+
+def pytest_unconfigure(config):
+    process = getattr(config, '_simulator_process', None)
+    if process is not None:
+        process.terminate()
+        process.wait(timeout=10)
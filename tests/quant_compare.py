@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quantization Comparison for vLLM-Ascend
+量化模式与bf16基线的对比测试：显存节省、并发余量、吞吐和输出偏差
+"""
+
+import json
+import argparse
+import difflib
+from pathlib import Path
+from typing import List, Dict, Any
+
+import requests
+
+from benchmark import BenchmarkRunner, SCENARIOS, MODEL_NAME, TIMEOUT
+
+# 用于比较输出偏差的固定语料（贪心解码）
+DIVERGENCE_PROMPTS = [
+    "什么是人工智能？请简要回答。",
+    "详细解释深度学习的工作原理：",
+    "中国的首都是哪里？",
+    "请列出三种常见的排序算法。",
+    "Explain what a hash table is.",
+    "def quick_sort(arr):",
+    "将'机器学习'翻译成英文：",
+    "1 + 1 等于几？请解释。",
+]
+
+WEIGHT_PATTERNS = ('*.safetensors', '*.bin')
+
+
+def weight_bytes(model_dir: str) -> int:
+    """统计模型目录下权重文件的总字节数"""
+    path = Path(model_dir)
+    return sum(f.stat().st_size for pattern in WEIGHT_PATTERNS for f in path.glob(pattern))
+
+
+def kv_cache_bytes_per_token(model_dir: str, kv_dtype_bytes: int = 2) -> int:
+    """
+    根据config.json计算每个token的KV Cache字节数
+
+    Args:
+        model_dir: 模型路径
+        kv_dtype_bytes: KV Cache元素字节数（bf16为2）
+
+    Returns:
+        每token字节数（K和V、全部层）
+    """
+    with open(Path(model_dir) / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    num_heads = config['num_attention_heads']
+    num_kv_heads = config.get('num_key_value_heads', num_heads)
+    head_dim = config.get('head_dim') or config['hidden_size'] // num_heads
+    return 2 * config['num_hidden_layers'] * num_kv_heads * head_dim * kv_dtype_bytes
+
+
+def memory_headroom(baseline_dir: str, quant_dir: str, max_model_len: int) -> Dict[str, Any]:
+    """
+    计算量化节省的权重显存，以及按满长度序列折算的额外并发数
+
+    Args:
+        baseline_dir: bf16模型路径
+        quant_dir: 量化模型路径
+        max_model_len: 最大序列长度
+
+    Returns:
+        显存对比字典
+    """
+    baseline = weight_bytes(baseline_dir)
+    quantized = weight_bytes(quant_dir)
+    saved = baseline - quantized
+    kv_per_seq = kv_cache_bytes_per_token(baseline_dir) * max_model_len
+
+    return {
+        "baseline_weight_mb": baseline / 2 ** 20,
+        "quant_weight_mb": quantized / 2 ** 20,
+        "saved_mb": saved / 2 ** 20,
+        "saved_pct": saved / baseline * 100 if baseline else 0.0,
+        "kv_cache_mb_per_seq": kv_per_seq / 2 ** 20,
+        "extra_max_num_seqs": max(saved, 0) // kv_per_seq if kv_per_seq else 0,
+    }
+
+
+def greedy_outputs(api_url: str, model: str, prompts: List[str], max_tokens: int = 64) -> List[str]:
+    """使用贪心解码获取每条语料的输出"""
+    outputs = []
+    for prompt in prompts:
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": 0.0
+        }
+        response = requests.post(f"{api_url}/v1/completions", json=payload, timeout=TIMEOUT)
+        response.raise_for_status()
+        outputs.append(response.json()["choices"][0]["text"])
+    return outputs
+
+
+def output_divergence(baseline: List[str], quantized: List[str]) -> Dict[str, float]:
+    """
+    比较两组贪心输出的偏差
+
+    Returns:
+        exact_match_rate: 完全一致的比例
+        mean_similarity: 平均字符级相似度（difflib ratio）
+        mean_prefix_agreement: 平均公共前缀占基线输出长度的比例，
+                               反映量化误差在生成多远后开始改变输出
+    """
+    if not baseline:
+        return {"exact_match_rate": 0.0, "mean_similarity": 0.0, "mean_prefix_agreement": 0.0}
+
+    exact = 0
+    similarities = []
+    prefixes = []
+    for a, b in zip(baseline, quantized):
+        exact += a == b
+        similarities.append(difflib.SequenceMatcher(None, a, b).ratio())
+        common = 0
+        for x, y in zip(a, b):
+            if x != y:
+                break
+            common += 1
+        prefixes.append(common / len(a) if a else float(not b))
+
+    n = len(similarities)
+    return {
+        "exact_match_rate": exact / n,
+        "mean_similarity": sum(similarities) / n,
+        "mean_prefix_agreement": sum(prefixes) / n,
+    }
+
+
+def tokens_per_second(stats: Dict[str, Any]) -> float:
+    """根据基准测试结果计算生成吞吐"""
+    if "error" in stats or not stats.get("total_time"):
+        return 0.0
+    return stats["tokens"]["total"] / stats["total_time"]
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='vLLM-Ascend Quantization Comparison')
+
+    parser.add_argument('--baseline-url', type=str, default='http://localhost:8000',
+                        help='bf16 server URL (default: http://localhost:8000)')
+    parser.add_argument('--quant-url', type=str, default='http://localhost:8001',
+                        help='Quantized server URL (default: http://localhost:8001)')
+    parser.add_argument('--baseline-model', type=str, default=MODEL_NAME,
+                        help=f'Served name of the bf16 model (default: {MODEL_NAME})')
+    parser.add_argument('--quant-model', type=str, default='/models/qwen3-0.6b-w8a8',
+                        help='Served name of the quantized model (default: /models/qwen3-0.6b-w8a8)')
+    parser.add_argument('--baseline-dir', type=str, default=None,
+                        help='Local bf16 model directory, for memory comparison (optional)')
+    parser.add_argument('--quant-dir', type=str, default=None,
+                        help='Local quantized model directory, for memory comparison (optional)')
+    parser.add_argument('--max-model-len', type=int, default=4096,
+                        help='max_model_len used to size KV cache per sequence (default: 4096)')
+    parser.add_argument('--mode', type=str, default='fast', choices=['fast', 'slow'],
+                        help='Benchmark scenario (default: fast)')
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Number of requests per server (default: 100)')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Concurrency level (default: 10)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output JSON file path (optional)')
+
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+
+    # 显存与并发余量
+    if args.baseline_dir and args.quant_dir:
+        results["memory"] = memory_headroom(args.baseline_dir, args.quant_dir, args.max_model_len)
+
+    # 吞吐
+    scenario = SCENARIOS[args.mode]
+    throughput = {}
+    for name, url, model in (
+        ("baseline", args.baseline_url, args.baseline_model),
+        ("quant", args.quant_url, args.quant_model),
+    ):
+        print(f"\n🚀 Benchmarking {name} ({url})...")
+        stats = BenchmarkRunner(api_url=url, model=model).benchmark_throughput(
+            prompt=scenario['prompt'],
+            max_tokens=scenario['max_tokens'],
+            temperature=scenario['temperature'],
+            num_requests=args.requests,
+            concurrency=args.concurrency
+        )
+        throughput[name] = {
+            "tokens_per_s": tokens_per_second(stats),
+            "p50_latency": stats.get("latency", {}).get("p50"),
+            "p99_latency": stats.get("latency", {}).get("p99"),
+        }
+    base_tps = throughput["baseline"]["tokens_per_s"]
+    throughput["speedup"] = throughput["quant"]["tokens_per_s"] / base_tps if base_tps else 0.0
+    results["throughput"] = throughput
+
+    # 输出偏差
+    print("\n🔍 Comparing greedy outputs...")
+    baseline_texts = greedy_outputs(args.baseline_url, args.baseline_model, DIVERGENCE_PROMPTS)
+    quant_texts = greedy_outputs(args.quant_url, args.quant_model, DIVERGENCE_PROMPTS)
+    results["divergence"] = output_divergence(baseline_texts, quant_texts)
+
+    print(f"\n{'='*60}")
+    print(f"Quantization Comparison")
+    print(f"{'='*60}")
+    if "memory" in results:
+        memory = results["memory"]
+        print(f"\n💾 Memory:")
+        print(f"  Weights:             {memory['baseline_weight_mb']:.0f}MB -> {memory['quant_weight_mb']:.0f}MB "
+              f"(-{memory['saved_pct']:.1f}%)")
+        print(f"  KV cache per seq:    {memory['kv_cache_mb_per_seq']:.1f}MB @ {args.max_model_len} tokens")
+        print(f"  Extra max_num_seqs:  +{memory['extra_max_num_seqs']}")
+    print(f"\n⚡ Throughput:")
+    print(f"  Baseline:            {throughput['baseline']['tokens_per_s']:.1f} tokens/s")
+    print(f"  Quantized:           {throughput['quant']['tokens_per_s']:.1f} tokens/s")
+    print(f"  Speedup:             {throughput['speedup']:.2f}x")
+    divergence = results["divergence"]
+    print(f"\n🎯 Output Divergence (greedy, {len(DIVERGENCE_PROMPTS)} prompts):")
+    print(f"  Exact match rate:    {divergence['exact_match_rate']:.1%}")
+    print(f"  Mean similarity:     {divergence['mean_similarity']:.3f}")
+    print(f"  Prefix agreement:    {divergence['mean_prefix_agreement']:.1%}")
+    print(f"{'='*60}\n")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
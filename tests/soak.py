@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Soak Test for vLLM-Ascend
+长时间稳定性测试：检测延迟漂移、内存增长和吞吐衰减
+"""
+
+import os
+import sys
+import re
+import math
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from benchmark import BenchmarkRunner, SCENARIOS, BASE_URL
+
+# 漂移检测的指标及其"变差"方向：+1 表示上升为变差，-1 表示下降为变差
+DRIFT_METRICS = {
+    'latency_p50': 1,
+    'latency_p99': 1,
+    'tokens_per_s': -1,
+    'rss_mb': 1,
+    'device_mem_pct': 1,
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """对已排序列表按线性插值计算分位数（q取0-100）"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def _t_sf_two_sided(t: float, df: int) -> float:
+    """t分布双侧p值，无scipy时使用正态近似"""
+    try:
+        from scipy import stats
+        return float(2 * stats.t.sf(abs(t), df))
+    except ImportError:
+        return math.erfc(abs(t) / math.sqrt(2))
+
+
+def fit_trend(xs: List[float], ys: List[float]) -> Dict[str, float]:
+    """
+    最小二乘线性拟合并对斜率做显著性检验
+
+    Args:
+        xs: 自变量（如运行时长，小时）
+        ys: 因变量
+
+    Returns:
+        包含slope、intercept、r2、p_value、n的字典
+    """
+    n = len(xs)
+    if n < 3:
+        return {"slope": 0.0, "intercept": ys[0] if ys else 0.0, "r2": 0.0, "p_value": 1.0, "n": n}
+
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    syy = sum((y - mean_y) ** 2 for y in ys)
+    if sxx == 0:
+        return {"slope": 0.0, "intercept": mean_y, "r2": 0.0, "p_value": 1.0, "n": n}
+
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    sse = max(syy - slope * sxy, 0.0)
+    r2 = 1 - sse / syy if syy > 0 else 0.0
+
+    if sse == 0:
+        p_value = 0.0 if slope != 0 else 1.0
+    else:
+        stderr = math.sqrt(sse / (n - 2) / sxx)
+        p_value = _t_sf_two_sided(slope / stderr, n - 2)
+
+    return {"slope": slope, "intercept": intercept, "r2": r2, "p_value": p_value, "n": n}
+
+
+def detect_drift(
+    windows: List[Dict[str, Any]],
+    alpha: float = 0.01,
+    min_windows: int = 6,
+    min_change: float = 0.1
+) -> List[Dict[str, Any]]:
+    """
+    对窗口序列的各项指标拟合趋势，标记显著的漂移
+
+    同时要求统计显著（p < alpha）和实际幅度足够大（拟合值在整个
+    运行期间的相对变化超过 min_change），避免长时间运行中微小但
+    显著的斜率被误报。
+
+    Args:
+        windows: 窗口统计列表（需包含elapsed_hours字段）
+        alpha: 显著性水平
+        min_windows: 拟合所需的最少窗口数
+        min_change: 最小相对变化
+
+    Returns:
+        各指标的趋势报告，drift为True表示检测到漂移
+    """
+    report = []
+    for metric, direction in DRIFT_METRICS.items():
+        points = [(w['elapsed_hours'], w[metric]) for w in windows if w.get(metric) is not None]
+        if len(points) < min_windows:
+            continue
+
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        trend = fit_trend(xs, ys)
+
+        start_value = trend['intercept'] + trend['slope'] * xs[0]
+        end_value = trend['intercept'] + trend['slope'] * xs[-1]
+        relative_change = (end_value - start_value) / abs(start_value) if start_value else 0.0
+
+        drift = (
+            trend['p_value'] < alpha
+            and relative_change * direction > min_change
+        )
+        report.append({
+            "metric": metric,
+            "slope_per_hour": trend['slope'],
+            "r2": trend['r2'],
+            "p_value": trend['p_value'],
+            "relative_change": relative_change,
+            "windows": trend['n'],
+            "drift": drift,
+        })
+    return report
+
+
+class RollingWindow:
+    """
+    单个时间窗口内的请求统计
+
+    延迟样本使用水塘抽样，窗口内请求再多也只保留 max_samples 个，
+    保证长时间运行时内存有界。
+    """
+
+    def __init__(self, start: float, max_samples: int = 2048, rng: Optional[random.Random] = None):
+        self.start = start
+        self.max_samples = max_samples
+        self.rng = rng or random.Random()
+        self.latencies: List[float] = []
+        self.seen = 0
+        self.requests = 0
+        self.errors = 0
+        self.tokens = 0
+
+    def add(self, result: Dict[str, Any]) -> None:
+        """记录一个请求结果"""
+        self.requests += 1
+        if not result.get("success"):
+            self.errors += 1
+            return
+
+        self.tokens += result.get("generated_tokens", 0)
+        self.seen += 1
+        if len(self.latencies) < self.max_samples:
+            self.latencies.append(result["latency"])
+        else:
+            index = self.rng.randrange(self.seen)
+            if index < self.max_samples:
+                self.latencies[index] = result["latency"]
+
+    def summarize(self, end: float) -> Dict[str, Any]:
+        """
+        汇总窗口统计
+
+        Args:
+            end: 窗口结束时间
+
+        Returns:
+            窗口统计字典
+        """
+        duration = max(end - self.start, 1e-9)
+        latencies = sorted(self.latencies)
+        return {
+            "start": self.start,
+            "duration": duration,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_p50": percentile(latencies, 50) if latencies else None,
+            "latency_p95": percentile(latencies, 95) if latencies else None,
+            "latency_p99": percentile(latencies, 99) if latencies else None,
+            "tokens_per_s": self.tokens / duration,
+        }
+
+
+def _parse_size_mb(text: str) -> Optional[float]:
+    """解析docker stats中的内存大小（如 1.5GiB）为MB"""
+    match = re.match(r"\s*([\d.]+)\s*([KMGT]?i?B)", text)
+    if not match:
+        return None
+    units = {"B": 1 / 2 ** 20, "KiB": 1 / 1024, "KB": 1 / 1024, "MiB": 1, "MB": 1,
+             "GiB": 1024, "GB": 1024, "TiB": 2 ** 20, "TB": 2 ** 20}
+    return float(match.group(1)) * units.get(match.group(2), 1)
+
+
+class ResourceSampler:
+    """服务端资源采样：进程RSS和NPU设备内存"""
+
+    def __init__(
+        self,
+        server_pid: Optional[int] = None,
+        container: Optional[str] = None,
+        npu_id: Optional[int] = None
+    ):
+        """
+        Args:
+            server_pid: 本地vLLM进程PID（统计包含子进程）
+            container: Docker容器名称（使用docker stats采样）
+            npu_id: NPU设备ID（使用npu-smi采样）
+        """
+        self.server_pid = server_pid
+        self.container = container
+        self.npu_id = npu_id
+
+    def sample_rss_mb(self) -> Optional[float]:
+        """采样服务端内存占用（MB）"""
+        if self.server_pid is not None:
+            try:
+                import psutil
+                proc = psutil.Process(self.server_pid)
+                rss = proc.memory_info().rss
+                for child in proc.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                return rss / 2 ** 20
+            except ImportError:
+                return None
+            except Exception:
+                return None
+
+        if self.container is not None:
+            try:
+                output = subprocess.run(
+                    ["docker", "stats", "--no-stream", "--format", "{{.MemUsage}}", self.container],
+                    capture_output=True, text=True, timeout=30
+                ).stdout
+                return _parse_size_mb(output.split('/')[0])
+            except (OSError, subprocess.SubprocessError):
+                return None
+
+        return None
+
+    def sample_device_mem_pct(self) -> Optional[float]:
+        """采样NPU设备内存使用率（%）"""
+        if self.npu_id is None:
+            return None
+        try:
+            output = subprocess.run(
+                ["npu-smi", "info", "-t", "usages", "-i", str(self.npu_id)],
+                capture_output=True, text=True, timeout=30
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+        # Atlas 300I Duo报告DDR/Memory使用率，带HBM的设备报告HBM使用率
+        for key in ("HBM Usage Rate", "Memory Usage Rate", "DDR Usage Rate"):
+            match = re.search(rf"{key}\(%\)\s*:\s*([\d.]+)", output)
+            if match and float(match.group(1)) > 0:
+                return float(match.group(1))
+        return None
+
+    def sample(self) -> Dict[str, Optional[float]]:
+        return {
+            "rss_mb": self.sample_rss_mb(),
+            "device_mem_pct": self.sample_device_mem_pct(),
+        }
+
+
+class SoakRunner:
+    """长时间稳定性测试运行器"""
+
+    def __init__(
+        self,
+        runner: BenchmarkRunner,
+        rate: float,
+        fast_ratio: float = 0.8,
+        max_in_flight: int = 64,
+        window_seconds: float = 60,
+        max_windows: int = 10080,
+        sampler: Optional[ResourceSampler] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: float = 600,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            runner: 基准测试运行器
+            rate: 目标请求速率（req/s，泊松到达）
+            fast_ratio: 快思考请求占比
+            max_in_flight: 最大在途请求数，超过时丢弃到达的请求并计数
+            window_seconds: 统计窗口时长（秒）
+            max_windows: 保留的窗口数上限（默认按1分钟窗口保留7天）
+            sampler: 资源采样器
+            checkpoint_path: 检查点文件路径
+            checkpoint_interval: 检查点写入间隔（秒）
+            seed: 随机种子
+        """
+        if rate <= 0:
+            raise ValueError(f"Invalid rate: {rate}")
+        if not 0.0 <= fast_ratio <= 1.0:
+            raise ValueError(f"Invalid fast_ratio: {fast_ratio}")
+
+        self.runner = runner
+        self.rate = rate
+        self.fast_ratio = fast_ratio
+        self.max_in_flight = max_in_flight
+        self.window_seconds = window_seconds
+        self.sampler = sampler or ResourceSampler()
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.rng = random.Random(seed)
+
+        self.windows: deque = deque(maxlen=max_windows)
+        self.started_at: Optional[float] = None
+        self.dropped = 0
+        self._in_flight = 0
+        self._window: Optional[RollingWindow] = None
+        self._lock = threading.Lock()
+
+    def _on_done(self, future) -> None:
+        result = future.result()
+        with self._lock:
+            self._in_flight -= 1
+            self._window.add(result)
+
+    def _rotate_window(self, now: float) -> Dict[str, Any]:
+        """关闭当前窗口并开启新窗口"""
+        with self._lock:
+            window, self._window = self._window, RollingWindow(now, rng=self.rng)
+            in_flight = self._in_flight
+            dropped, self.dropped = self.dropped, 0
+
+        summary = window.summarize(now)
+        summary.update(self.sampler.sample())
+        summary["elapsed_hours"] = (now - self.started_at) / 3600
+        summary["in_flight"] = in_flight
+        summary["dropped"] = dropped
+        self.windows.append(summary)
+        return summary
+
+    def report(self) -> Dict[str, Any]:
+        """生成当前的漂移报告"""
+        windows = list(self.windows)
+        return {
+            "windows": len(windows),
+            "elapsed_hours": windows[-1]["elapsed_hours"] if windows else 0.0,
+            "trends": detect_drift(windows),
+        }
+
+    def checkpoint(self) -> None:
+        """原子地写入检查点文件"""
+        if not self.checkpoint_path:
+            return
+
+        data = {
+            "config": {
+                "rate": self.rate,
+                "fast_ratio": self.fast_ratio,
+                "max_in_flight": self.max_in_flight,
+                "window_seconds": self.window_seconds,
+            },
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "report": self.report(),
+            "windows": list(self.windows),
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _submit(self, executor: ThreadPoolExecutor) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.dropped += 1
+                return
+            self._in_flight += 1
+
+        mode = 'fast' if self.rng.random() < self.fast_ratio else 'slow'
+        scenario = SCENARIOS[mode]
+        future = executor.submit(
+            self.runner.single_request,
+            scenario['prompt'],
+            scenario['max_tokens'],
+            scenario['temperature'],
+        )
+        future.add_done_callback(self._on_done)
+
+    def run(self, duration_seconds: float) -> Dict[str, Any]:
+        """
+        运行稳定性测试
+
+        Args:
+            duration_seconds: 运行时长（秒）
+
+        Returns:
+            最终的漂移报告
+        """
+        print(f"\n{'='*60}")
+        print(f"Running soak test...")
+        print(f"  Duration: {duration_seconds / 3600:.2f}h")
+        print(f"  Target rate: {self.rate} req/s (fast ratio {self.fast_ratio:.0%})")
+        print(f"  Window: {self.window_seconds}s")
+        print(f"{'='*60}\n")
+
+        self.started_at = time.time()
+        self._window = RollingWindow(self.started_at, rng=self.rng)
+        deadline = self.started_at + duration_seconds
+        next_arrival = self.started_at
+        next_window = self.started_at + self.window_seconds
+        next_checkpoint = self.started_at + self.checkpoint_interval
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            try:
+                while True:
+                    now = time.time()
+                    if now >= deadline:
+                        break
+
+                    # 开环泊松到达：按计划时间发送，不受响应速度影响
+                    while next_arrival <= now:
+                        self._submit(executor)
+                        next_arrival += self.rng.expovariate(self.rate)
+
+                    if now >= next_window:
+                        summary = self._rotate_window(now)
+                        next_window += self.window_seconds
+                        self._print_window(summary)
+
+                    if now >= next_checkpoint:
+                        self.checkpoint()
+                        next_checkpoint += self.checkpoint_interval
+
+                    time.sleep(max(0.0, min(next_arrival, next_window, deadline) - time.time()))
+            except KeyboardInterrupt:
+                print("\nInterrupted, writing final checkpoint...")
+
+        self._rotate_window(time.time())
+        self.checkpoint()
+        return self.report()
+
+    @staticmethod
+    def _print_window(summary: Dict[str, Any]) -> None:
+        p99 = summary['latency_p99']
+        rss = summary['rss_mb']
+        print(
+            f"[{summary['elapsed_hours']:.2f}h] "
+            f"req={summary['requests']} err={summary['errors']} dropped={summary['dropped']} "
+            f"p99={'%.3fs' % p99 if p99 is not None else '-'} "
+            f"tok/s={summary['tokens_per_s']:.1f} "
+            f"rss={'%.0fMB' % rss if rss is not None else '-'}"
+        )
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """打印漂移报告"""
+    print(f"\n{'='*60}")
+    print(f"Soak Test Report ({report['elapsed_hours']:.2f}h, {report['windows']} windows)")
+    print(f"{'='*60}")
+    if not report['trends']:
+        print("  Not enough windows to fit trends")
+    for trend in report['trends']:
+        flag = "⚠️  DRIFT" if trend['drift'] else "✓"
+        print(
+            f"  {trend['metric']:<16} slope={trend['slope_per_hour']:+.4g}/h "
+            f"change={trend['relative_change']:+.1%} p={trend['p_value']:.2g}  {flag}"
+        )
+    print(f"{'='*60}\n")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='vLLM-Ascend Soak Test')
+
+    parser.add_argument(
+        '--url',
+        type=str,
+        default=BASE_URL,
+        help='API base URL (default: http://localhost:8000)'
+    )
+
+    parser.add_argument(
+        '--hours',
+        type=float,
+        default=24,
+        help='Run duration in hours (default: 24)'
+    )
+
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=2.0,
+        help='Target request rate in req/s (default: 2.0)'
+    )
+
+    parser.add_argument(
+        '--fast-ratio',
+        type=float,
+        default=0.8,
+        help='Fraction of fast-mode requests in the mix (default: 0.8)'
+    )
+
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=64,
+        help='Maximum in-flight requests (default: 64)'
+    )
+
+    parser.add_argument(
+        '--window',
+        type=float,
+        default=60,
+        help='Statistics window in seconds (default: 60)'
+    )
+
+    parser.add_argument(
+        '--checkpoint',
+        type=str,
+        default='soak_checkpoint.json',
+        help='Checkpoint JSON file path (default: soak_checkpoint.json)'
+    )
+
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        default=600,
+        help='Checkpoint interval in seconds (default: 600)'
+    )
+
+    parser.add_argument(
+        '--server-pid',
+        type=int,
+        default=None,
+        help='PID of a local vLLM server to sample RSS from (optional)'
+    )
+
+    parser.add_argument(
+        '--container',
+        type=str,
+        default=None,
+        help='Docker container name to sample memory from (optional)'
+    )
+
+    parser.add_argument(
+        '--npu-id',
+        type=int,
+        default=None,
+        help='NPU device ID to sample device memory from (optional)'
+    )
+
+    args = parser.parse_args()
+
+    soak = SoakRunner(
+        BenchmarkRunner(api_url=args.url),
+        rate=args.rate,
+        fast_ratio=args.fast_ratio,
+        max_in_flight=args.max_in_flight,
+        window_seconds=args.window,
+        sampler=ResourceSampler(args.server_pid, args.container, args.npu_id),
+        checkpoint_path=args.checkpoint,
+        checkpoint_interval=args.checkpoint_interval,
+    )
+    report = soak.run(args.hours * 3600)
+    print_report(report)
+    print(f"💾 Checkpoint saved to {args.checkpoint}")
+
+    # 检测到漂移时返回非零退出码，便于在CI中使用
+    if any(t['drift'] for t in report['trends']):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,14 @@ API Tests for vLLM-Ascend
 API接口测试
 """
 
+import os
 import pytest
 import requests
 import time
 from typing import Dict, Any
 
-# 测试配置
-BASE_URL = "http://localhost:8000"
+# 测试配置（pytest --simulate 时指向模拟服务）
+BASE_URL = os.environ.get("VLLM_API_URL", "http://localhost:8000")
 TIMEOUT = 30
 
 
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Autoscaler Tests for vLLM-Ascend
+扩缩容策略与控制器测试（模拟后端，无需NPU）
+"""
+
+import asyncio
+
+import pytest
+
+from utils import (
+    parse_prometheus_metrics,
+    histogram_buckets,
+    histogram_quantile,
+    validate_autoscaler_config,
+    load_config,
+    get_config_path,
+)
+from autoscaler import (
+    ScalingPolicy,
+    Autoscaler,
+    SimulatedBackend,
+    DockerBackend,
+    Replica,
+    VirtualClock,
+    parse_load_profile,
+    simulate,
+    REPLICA_READY,
+    REPLICA_STARTING,
+    REPLICA_DRAINING,
+)
+
+HOT = {'queue_depth': 20.0, 'ttft_p95': 2.5, 'kv_usage': 0.95}
+IDLE = {'queue_depth': 0.0, 'ttft_p95': 0.1, 'kv_usage': 0.1}
+BAND = {'queue_depth': 4.0, 'ttft_p95': 0.7, 'kv_usage': 0.7}
+
+
+def _policy(**kwargs):
+    defaults = dict(min_replicas=1, max_replicas=3, scale_up_windows=2, scale_down_windows=3,
+                    scale_up_cooldown=60, scale_down_cooldown=300)
+    defaults.update(kwargs)
+    return ScalingPolicy(**defaults)
+
+
+def _controller(load, clock, devices=(1, 2), startup_time=30, **policy_kwargs):
+    backend = SimulatedBackend(load, clock=clock, capacity_rps=8, startup_time=startup_time)
+    autoscaler = Autoscaler(backend, _policy(**policy_kwargs), device_pool=list(devices),
+                            interval=5, clock=clock)
+    autoscaler.add_static_replica("http://127.0.0.1:8000", [0])
+    return autoscaler
+
+
+class TestHistogram:
+    """直方图分位数测试类"""
+
+    def test_quantile_interpolation(self):
+        """测试桶内线性插值"""
+        buckets = [(0.1, 50.0), (0.5, 90.0), (1.0, 100.0), (float('inf'), 100.0)]
+        assert histogram_quantile(buckets, 0.5) == pytest.approx(0.1)
+        assert histogram_quantile(buckets, 0.95) == pytest.approx(0.75)
+
+    def test_quantile_in_inf_bucket(self):
+        """测试落在+Inf桶时返回最大有限上界"""
+        assert histogram_quantile([(1.0, 1.0), (float('inf'), 10.0)], 0.95) == 1.0
+
+    def test_quantile_empty(self):
+        """测试没有观测值"""
+        assert histogram_quantile([], 0.95) is None
+        assert histogram_quantile([(1.0, 0.0), (float('inf'), 0.0)], 0.95) is None
+
+    def test_buckets_from_metrics(self):
+        """测试从Prometheus文本汇总多个标签组合的桶"""
+        metrics = parse_prometheus_metrics(
+            'vllm:time_to_first_token_seconds_bucket{model_name="a",le="0.5"} 3\n'
+            'vllm:time_to_first_token_seconds_bucket{model_name="a",le="+Inf"} 4\n'
+            'vllm:time_to_first_token_seconds_bucket{model_name="b",le="0.5"} 1\n'
+            'vllm:time_to_first_token_seconds_bucket{model_name="b",le="+Inf"} 2\n'
+            'vllm:time_to_first_token_seconds_count{model_name="a"} 4\n'
+        )
+        assert histogram_buckets(metrics, 'vllm:time_to_first_token_seconds') == [
+            (0.5, 4.0), (float('inf'), 6.0)
+        ]
+
+
+class TestScalingPolicy:
+    """扩缩容策略测试类"""
+
+    def test_scale_up_after_consecutive_windows(self):
+        """测试连续超阈值才扩容"""
+        policy = _policy()
+        assert policy.evaluate(HOT, 1, now=0)['delta'] == 0
+        decision = policy.evaluate(HOT, 1, now=5)
+        assert decision['delta'] == 1
+        assert 'ttft_p95 2.500s > slo 1.0s' in decision['reason']
+
+    def test_single_breach_is_enough(self):
+        """测试任一指标超阈值即触发"""
+        policy = _policy(scale_up_windows=1)
+        assert policy.evaluate(dict(BAND, kv_usage=0.95), 1, now=0)['delta'] == 1
+
+    def test_hysteresis_band_resets_streaks(self):
+        """测试滞回区间内不扩缩容并重置计数"""
+        policy = _policy()
+        policy.evaluate(HOT, 1, now=0)
+        assert policy.evaluate(BAND, 1, now=5)['delta'] == 0
+        assert policy.evaluate(HOT, 1, now=10)['delta'] == 0
+
+        for t in range(20):
+            assert policy.evaluate(BAND, 2, now=1000 + t)['delta'] == 0
+
+    def test_scale_up_cooldown(self):
+        """测试扩容冷却时间"""
+        policy = _policy(scale_up_windows=1)
+        assert policy.evaluate(HOT, 1, now=0)['delta'] == 1
+        decision = policy.evaluate(HOT, 2, now=30)
+        assert decision['delta'] == 0 and 'cooldown' in decision['reason']
+        assert policy.evaluate(HOT, 2, now=61)['delta'] == 1
+
+    def test_scale_down_after_cooldown(self):
+        """测试缩容需要连续空闲且距上次扩缩容超过冷却时间"""
+        policy = _policy(scale_up_windows=1)
+        policy.evaluate(HOT, 1, now=0)
+        for t in (100, 105, 110):
+            assert policy.evaluate(IDLE, 2, now=t)['delta'] == 0
+        assert policy.evaluate(IDLE, 2, now=301)['delta'] == -1
+
+    def test_bounds(self):
+        """测试副本数上下限、设备余量和预热中的副本"""
+        policy = _policy(scale_up_windows=1, scale_down_windows=1, scale_down_cooldown=0)
+        assert policy.evaluate(IDLE, 1, now=0)['delta'] == 0
+        assert policy.evaluate(HOT, 3, now=0)['delta'] == 0
+        assert policy.evaluate(HOT, 2, now=0, headroom=0)['delta'] == 0
+        assert policy.evaluate(HOT, 2, now=0, pending=1)['delta'] == 0
+        assert policy.evaluate(IDLE, 0, now=0)['delta'] == 1
+
+    def test_missing_signals_hold(self):
+        """测试没有指标时保持现状"""
+        policy = _policy(scale_down_windows=1, scale_down_cooldown=0)
+        empty = {'queue_depth': None, 'ttft_p95': None, 'kv_usage': None}
+        assert policy.evaluate(empty, 2, now=0)['delta'] == 0
+
+    @pytest.mark.parametrize("config, valid", [
+        (None, True),
+        ({'enabled': False, 'min_replicas': 0}, True),
+        ({'enabled': True, 'min_replicas': 1, 'max_replicas': 2, 'queue_high': 8, 'queue_low': 1}, True),
+        ({'enabled': True, 'min_replicas': 2, 'max_replicas': 1}, False),
+        ({'enabled': True, 'queue_high': 2, 'queue_low': 2}, False),
+        ({'enabled': True, 'kv_high': 0.5, 'kv_low': 0.8}, False),
+        ({'enabled': True, 'ttft_low_ratio': 1.5}, False),
+    ])
+    def test_validate(self, config, valid):
+        """测试配置验证"""
+        assert validate_autoscaler_config(config) is valid
+
+    @pytest.mark.parametrize("mode", ["fast", "slow", "quant"])
+    def test_mode_configs(self, mode):
+        """测试各模式的默认配置可以构建策略"""
+        config = load_config(get_config_path(mode))
+        section = dict(config['autoscaler'], enabled=True)
+        assert validate_autoscaler_config(section)
+        assert ScalingPolicy.from_config(section).max_replicas >= section['min_replicas']
+
+
+class TestController:
+    """控制器测试类（模拟后端 + 虚拟时钟）"""
+
+    def test_warm_before_routing(self):
+        """测试新副本在健康并预热后才加入路由"""
+        clock = VirtualClock()
+        autoscaler = _controller(lambda t: 20.0, clock, startup_time=30)
+
+        async def run():
+            for _ in range(3):
+                clock.advance(5)
+                await autoscaler.step()
+            starting = [r for r in autoscaler.replicas if r.state == REPLICA_STARTING]
+            assert len(starting) == 1
+            assert starting[0].url not in autoscaler.ready_urls()
+            assert starting[0].devices == [1]
+
+            for _ in range(7):
+                clock.advance(5)
+                await autoscaler.step()
+
+        asyncio.run(run())
+        assert len(autoscaler.ready_urls()) >= 2
+        assert autoscaler.decisions[0]['delta'] == 1
+        assert autoscaler.decisions[0]['signals']['queue_depth'] > 0
+
+    def test_scale_down_drains_managed_replica(self):
+        """测试缩容只移除受管副本，并在排空后释放设备"""
+        clock = VirtualClock()
+        load = parse_load_profile("0:20,200:1")
+        autoscaler = _controller(load, clock, devices=[1], startup_time=10,
+                                 scale_down_windows=2, scale_down_cooldown=60)
+
+        timeline = asyncio.run(simulate(autoscaler, clock, 1500))
+
+        assert max(row['ready'] for row in timeline) == 2
+        assert [d['delta'] for d in autoscaler.decisions] == [1, -1]
+        assert [r.managed for r in autoscaler.replicas] == [False]
+        assert autoscaler.free_device_groups() == [[1]]
+
+    def test_draining_replica_not_routed(self):
+        """测试摘除中的副本不再接收请求"""
+        clock = VirtualClock()
+        autoscaler = _controller(lambda t: 0.0, clock)
+        replica = Replica("r1", "http://127.0.0.1:8101", [1])
+        replica.set_state(REPLICA_READY, 0)
+        autoscaler.replicas.append(replica)
+
+        asyncio.run(autoscaler.scale_down(clock()))
+        assert replica.state == REPLICA_DRAINING
+        assert autoscaler.ready_urls() == ["http://127.0.0.1:8000"]
+
+    def test_device_groups_follow_parallel_size(self):
+        """测试按每副本设备数分配"""
+        clock = VirtualClock()
+        backend = SimulatedBackend(lambda t: 0.0, clock=clock)
+        autoscaler = Autoscaler(backend, _policy(), device_pool=[0, 1, 2, 3, 4],
+                                devices_per_replica=2, clock=clock)
+        autoscaler.add_static_replica("http://127.0.0.1:8000", [0, 1])
+        assert autoscaler.free_device_groups() == [[2, 3]]
+
+
+class TestDockerBackend:
+    """Docker后端测试类"""
+
+    def test_run_args(self):
+        """测试副本容器复用run.sh的挂载和并行环境变量"""
+        config = load_config(get_config_path('fast'))
+        config['inference'].update({'devices': [0, 1], 'tensor_parallel_size': 2})
+        backend = DockerBackend(config, 'fast', image='vllm-ascend:test', model_dir='/data/models')
+        replica = Replica('vllm-fast-r1', 'http://127.0.0.1:8101', [2, 3])
+
+        args = backend.build_run_args(replica, 8101)
+
+        assert args[:5] == ['docker', 'run', '-d', '--name', 'vllm-fast-r1']
+        assert '--device=/dev/davinci2' in args and '--device=/dev/davinci3' in args
+        assert '--device=/dev/davinci0' not in args
+        assert 'ASCEND_RT_VISIBLE_DEVICES=0,1' in args
+        assert 'TENSOR_PARALLEL_SIZE=2' in args
+        assert '/data/models:/models:ro' in args
+        assert args[args.index('-p') + 1] == '8101:8000'
+        assert args[-2:] == ['vllm-ascend:test', 'fast']
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gateway Tests for vLLM-Ascend
+网关请求ID透传、链路追踪和token预算整形测试（上游为引擎模拟服务，无需NPU）
+"""
+
+import json
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestServer, TestClient
+
+from tracing import Tracer, REQUEST_ID_HEADER, trace_id_for
+from shaping import TokenBudgetShaper, PROMPT_TOKENS_HEADER
+from gateway import Gateway
+from simulator import EngineSimulator, SimulatorServer, DEFAULT_PROFILE
+from test_shaping import WordTokenizer
+
+MODEL = "/models/qwen3-0.6b"
+
+
+def _run(scenario, tracer, **gateway_kwargs):
+    """在模拟引擎前启动网关并执行测试场景"""
+    async def run():
+        engine = EngineSimulator(dict(DEFAULT_PROFILE), max_num_seqs=4, max_model_len=256, time_scale=0.01)
+        upstream = TestServer(SimulatorServer(engine, MODEL).build_app())
+        await upstream.start_server()
+        gateway = Gateway(str(upstream.make_url('')), tracer, **gateway_kwargs)
+        client = TestClient(TestServer(gateway.build_app()))
+        await client.start_server()
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await upstream.close()
+    return asyncio.run(run())
+
+
+def _exported_spans(path):
+    spans = []
+    for line in path.read_text(encoding='utf-8').splitlines():
+        for resource_spans in json.loads(line)["resourceSpans"]:
+            for scope_spans in resource_spans["scopeSpans"]:
+                spans.extend(scope_spans["spans"])
+    return spans
+
+
+class TestRequestTracing:
+    """请求ID与span测试类"""
+
+    def test_request_id_round_trip(self, tmp_path):
+        """测试客户端提供的请求ID透传到引擎并在响应中返回"""
+        tracer = Tracer("gateway", output_path=str(tmp_path / "traces.jsonl"))
+
+        async def scenario(client):
+            response = await client.post(
+                "/v1/completions",
+                json={"model": MODEL, "prompt": "hello", "max_tokens": 4},
+                headers={REQUEST_ID_HEADER: "req-123"},
+            )
+            await response.read()
+            generated = await client.get("/health")
+            return response.headers.get(REQUEST_ID_HEADER), generated.headers.get(REQUEST_ID_HEADER)
+
+        echoed, generated = _run(scenario, tracer)
+        assert echoed == "req-123"
+        assert generated and generated != "req-123"
+
+    def test_span_tree(self, tmp_path):
+        """测试导出的span构成以gateway.request为根的父子关系"""
+        output = tmp_path / "traces.jsonl"
+        tracer = Tracer("gateway", output_path=str(output))
+
+        async def scenario(client):
+            response = await client.post(
+                "/v1/completions",
+                json={"model": MODEL, "prompt": "hello", "max_tokens": 4, "stream": True},
+                headers={REQUEST_ID_HEADER: "req-stream"},
+            )
+            await response.read()
+
+        _run(scenario, tracer)
+        spans = {s["name"]: s for s in _exported_spans(output)}
+
+        assert set(spans) == {
+            "gateway.request", "gateway.admission", "gateway.upstream_connect",
+            "gateway.ttft", "gateway.completion",
+        }
+        root = spans.pop("gateway.request")
+        assert "parentSpanId" not in root
+        assert all(s["parentSpanId"] == root["spanId"] for s in spans.values())
+        assert {s["traceId"] for s in spans.values()} == {trace_id_for("req-stream")}
+        assert int(spans["gateway.ttft"]["endTimeUnixNano"]) <= int(spans["gateway.completion"]["startTimeUnixNano"])
+        assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+
+class TestShapingThroughGateway:
+    """经过网关的token预算整形测试类"""
+
+    @pytest.mark.parametrize("extra, status, completion_tokens", [
+        ({"max_tokens": None}, 200, 8),
+        ({}, 200, 8),
+        ({"max_tokens": 5}, 200, 5),
+        ({"max_tokens": 1000}, 200, 252),
+        ({"max_tokens": "many"}, 400, None),
+    ])
+    def test_max_tokens(self, extra, status, completion_tokens):
+        """测试max_tokens为null、缺省、合法、超出预算和非法类型时的整形"""
+        shaper = TokenBudgetShaper(WordTokenizer(), max_model_len=256, default_max_tokens=8)
+
+        async def scenario(client):
+            response = await client.post(
+                "/v1/completions", json=dict({"model": MODEL, "prompt": "one two three"}, **extra)
+            )
+            return response.status, response.headers.get(PROMPT_TOKENS_HEADER), await response.json()
+
+        code, prompt_tokens, data = _run(scenario, Tracer("gateway", enabled=False), shaper=shaper)
+        assert code == status
+        if status == 200:
+            assert prompt_tokens == "4"
+            assert data["usage"]["completion_tokens"] == completion_tokens
+        else:
+            assert data["object"] == "error"
+
+    def test_prompt_too_long_rejected_before_engine(self):
+        """测试提示词超过max_model_len时由网关返回400"""
+        shaper = TokenBudgetShaper(WordTokenizer(), max_model_len=256, default_max_tokens=8)
+
+        async def scenario(client):
+            response = await client.post("/v1/completions", json={
+                "model": MODEL, "prompt": " ".join(["word"] * 300), "max_tokens": None
+            })
+            return response.status, await response.json()
+
+        code, data = _run(scenario, Tracer("gateway", enabled=False), shaper=shaper)
+        assert code == 400
+        assert "maximum context length is 256" in data["message"]
+
+    def test_malformed_chat_rejected_without_failing_batch(self, tmp_path):
+        """测试并发的合法与格式错误chat请求分别返回200和400，span均已结束"""
+        output = tmp_path / "traces.jsonl"
+        tracer = Tracer("gateway", output_path=str(output))
+        shaper = TokenBudgetShaper(WordTokenizer(), max_model_len=256, default_max_tokens=8, batch_wait_ms=50)
+
+        async def scenario(client):
+            async def post(messages, request_id):
+                response = await client.post(
+                    "/v1/chat/completions", json={"model": MODEL, "messages": messages},
+                    headers={REQUEST_ID_HEADER: request_id},
+                )
+                return response.status, await response.json()
+            return await asyncio.gather(
+                post([{"role": "user", "content": "hi there"}], "req-good"), post(["oops"], "req-bad")
+            )
+
+        (good_status, _), (bad_status, bad_data) = _run(scenario, tracer, shaper=shaper)
+        tracer.close()
+        assert (good_status, bad_status) == (200, 400)
+        assert bad_data["type"] == "BadRequestError"
+
+        bad_spans = {s["name"]: s for s in _exported_spans(output) if s["traceId"] == trace_id_for("req-bad")}
+        assert set(bad_spans) == {"gateway.request", "gateway.admission"}
+        assert bad_spans["gateway.admission"]["status"]["code"] == 2
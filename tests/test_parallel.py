@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel Launch Tests for vLLM-Ascend
+多卡并行启动参数与环境变量生成测试（无需NPU）
+"""
+
+import json
+
+import pytest
+
+from utils import (
+    parse_device_list,
+    resolve_parallel_config,
+    validate_parallel_topology,
+    check_model_parallelism,
+    build_parallel_env,
+    build_device_mounts,
+)
+from server import VLLMServer
+
+
+def _parallel(devices, tp=1, pp=1):
+    return {'devices': devices, 'tensor_parallel_size': tp, 'pipeline_parallel_size': pp}
+
+
+class TestTopology:
+    """并行拓扑测试类"""
+
+    def test_parse_device_list(self):
+        """测试设备列表的多种写法"""
+        assert parse_device_list("0, 1,2") == [0, 1, 2]
+        assert parse_device_list(3) == [3]
+        assert parse_device_list([4, 5]) == [4, 5]
+
+    def test_legacy_device_id(self):
+        """测试兼容旧的单卡device_id配置"""
+        config = resolve_parallel_config({'device_id': 1, 'tensor_parallel_size': 1})
+        assert config == _parallel([1])
+
+    @pytest.mark.parametrize("parallel, valid", [
+        (_parallel([0]), True),
+        (_parallel([0, 1], tp=2), True),
+        (_parallel([0, 1, 2, 3], tp=2, pp=2), True),
+        (_parallel([0, 1]), False),
+        (_parallel([0, 0], tp=2), False),
+        (_parallel([-1]), False),
+        (_parallel([], tp=1), False),
+        (_parallel([0], tp=0), False),
+    ])
+    def test_validate_topology(self, parallel, valid):
+        """测试设备数量与并行规模的匹配"""
+        assert validate_parallel_topology(parallel) is valid
+
+    def test_model_parallelism(self, tmp_path):
+        """测试模型头数与层数的切分检查"""
+        (tmp_path / 'config.json').write_text(json.dumps({
+            'num_attention_heads': 16,
+            'num_key_value_heads': 8,
+            'num_hidden_layers': 28,
+        }))
+        assert check_model_parallelism(str(tmp_path), _parallel([0, 1], tp=2))
+        assert not check_model_parallelism(str(tmp_path), _parallel([0, 1, 2], tp=3))
+        assert not check_model_parallelism(str(tmp_path), _parallel(list(range(32)), pp=32))
+
+
+class TestLaunchArgs:
+    """启动参数与环境变量测试类"""
+
+    def test_single_device_env_has_no_hccl(self):
+        """测试单卡时不设置HCCL变量"""
+        env = build_parallel_env(_parallel([3]))
+        assert env['ASCEND_RT_VISIBLE_DEVICES'] == '3'
+        assert not any(k.startswith('HCCL_') for k in env)
+
+    def test_multi_device_env(self):
+        """测试多卡时的设备可见性与HCCL配置"""
+        parallel = _parallel([2, 3], tp=2)
+        env = build_parallel_env(parallel, {'connect_timeout': 600, 'hccl_if_ip': '10.0.0.1'})
+
+        assert env['ASCEND_RT_VISIBLE_DEVICES'] == '2,3'
+        assert env['HCCL_CONNECT_TIMEOUT'] == '600'
+        assert env['HCCL_EXEC_TIMEOUT'] == '1200'
+        assert env['HCCL_IF_IP'] == '10.0.0.1'
+        # 容器内设备从0开始重新编号
+        assert build_parallel_env(parallel, in_container=True)['ASCEND_RT_VISIBLE_DEVICES'] == '0,1'
+
+    def test_device_mounts(self):
+        """测试docker设备挂载参数"""
+        mounts = build_device_mounts([2, 3])
+        assert mounts[:2] == ['--device=/dev/davinci2', '--device=/dev/davinci3']
+        assert '--device=/dev/davinci_manager' in mounts
+
+    def test_server_args_and_docker_args(self):
+        """测试VLLMServer根据覆盖的拓扑生成引擎参数和docker参数"""
+        server = VLLMServer(mode='slow', devices='4,5,6,7', tensor_parallel_size=2, pipeline_parallel_size=2)
+
+        args = server.build_vllm_args()
+        assert args[args.index('--tensor-parallel-size') + 1] == '2'
+        assert args[args.index('--pipeline-parallel-size') + 1] == '2'
+
+        docker_args = server.build_docker_args()
+        assert '--device=/dev/davinci7' in docker_args
+        assert 'ASCEND_RT_VISIBLE_DEVICES=0,1,2,3' in docker_args
+        assert 'PIPELINE_PARALLEL_SIZE=2' in docker_args
+
+    def test_invalid_topology_is_rejected_up_front(self):
+        """测试拓扑不匹配时在启动前报错"""
+        with pytest.raises(ValueError):
+            VLLMServer(mode='fast', devices='0,1')
+
+    def test_default_config_is_single_device(self):
+        """测试默认配置仍为单卡"""
+        args = VLLMServer(mode='fast').build_vllm_args()
+        assert args[args.index('--tensor-parallel-size') + 1] == '1'
+        assert '--pipeline-parallel-size' not in args
+
+    def test_parallel_args_for_entrypoint(self):
+        """测试entrypoint.sh未收到环境变量时使用的并行参数"""
+        server = VLLMServer(mode='slow', devices='4,5,6,7', tensor_parallel_size=2, pipeline_parallel_size=2)
+        assert server.build_parallel_args() == [
+            '--tensor-parallel-size', '2', '--pipeline-parallel-size', '2'
+        ]
+        assert VLLMServer(mode='fast').build_parallel_args() == ['--tensor-parallel-size', '1']
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quantization Tests for vLLM-Ascend
+量化模式、离线量化工具与对比指标测试（CPU即可运行）
+"""
+
+import json
+
+import pytest
+
+from server import VLLMServer
+from quant_compare import memory_headroom, output_divergence
+
+
+def _write_tiny_model(path, state_dict=None):
+    """写出一个小模型目录"""
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'config.json').write_text(json.dumps({
+        'hidden_size': 64,
+        'num_attention_heads': 4,
+        'num_key_value_heads': 2,
+        'num_hidden_layers': 2,
+    }))
+    (path / 'tokenizer_config.json').write_text('{}')
+    if state_dict is not None:
+        from safetensors.torch import save_file
+        save_file(state_dict, str(path / 'model.safetensors'))
+
+
+def _tiny_state_dict():
+    import torch
+    torch.manual_seed(0)
+    return {
+        'model.embed_tokens.weight': torch.randn(128, 64, dtype=torch.bfloat16),
+        'model.layers.0.self_attn.q_proj.weight': torch.randn(64, 64, dtype=torch.bfloat16),
+        'model.layers.0.mlp.up_proj.weight': torch.randn(96, 64, dtype=torch.bfloat16),
+        'model.layers.0.input_layernorm.weight': torch.ones(64, dtype=torch.bfloat16),
+    }
+
+
+class TestQuantMode:
+    """量化模式配置测试类"""
+
+    def test_quant_mode_args(self):
+        """测试量化模式生成--quantization参数"""
+        server = VLLMServer(mode='quant')
+        args = server.build_vllm_args()
+
+        assert args[args.index('--quantization') + 1] == 'ascend'
+        assert args[args.index('--dtype') + 1] == 'bfloat16'
+        # Qwen3-0.6B权重节省的显存只够多容纳约一个满长度序列
+        assert int(args[args.index('--max-num-seqs') + 1]) == 65
+
+    def test_bf16_modes_are_not_quantized(self):
+        """测试快/慢思考模式不受影响"""
+        assert '--quantization' not in VLLMServer(mode='fast').build_vllm_args()
+        assert '--quantization' not in VLLMServer(mode='slow').build_vllm_args()
+
+
+class TestOfflineQuantization:
+    """离线量化工具测试类"""
+
+    def test_w8a16_checkpoint(self, tmp_path):
+        """测试w8a16量化输出目录结构与误差"""
+        torch = pytest.importorskip('torch')
+        pytest.importorskip('safetensors')
+        from safetensors.torch import load_file
+        from quantize import quantize_checkpoint
+
+        state_dict = _tiny_state_dict()
+        _write_tiny_model(tmp_path / 'bf16', state_dict)
+        summary = quantize_checkpoint(
+            str(tmp_path / 'bf16'), str(tmp_path / 'w8a16'), 'w8a16', verify=True
+        )
+
+        assert summary['quantized_tensors'] == 2
+        assert summary['quantized_bytes'] < summary['original_bytes']
+        assert summary['max_relative_error'] < 0.02
+
+        output = load_file(str(tmp_path / 'w8a16' / 'model.safetensors'))
+        assert output['model.layers.0.self_attn.q_proj.weight'].dtype == torch.int8
+        assert output['model.layers.0.mlp.up_proj.weight_scale'].shape == (96, 1)
+        assert output['model.embed_tokens.weight'].dtype == torch.bfloat16
+
+        description = json.loads((tmp_path / 'w8a16' / 'quant_model_description.json').read_text())
+        assert description['model_quant_type'] == 'W8A16'
+        assert description['model.layers.0.input_layernorm.weight'] == 'FLOAT'
+        assert (tmp_path / 'w8a16' / 'tokenizer_config.json').exists()
+
+    def test_w8a8_checkpoint(self, tmp_path):
+        """测试w8a8激活校准、输出的scale形状、配置和重新加载后的误差"""
+        torch = pytest.importorskip('torch')
+        pytest.importorskip('safetensors')
+        transformers = pytest.importorskip('transformers')
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        from safetensors.torch import load_file
+        from quantize import quantize_checkpoint, dequantize_weight
+
+        # 随机权重的单层Llama小模型和词级tokenizer
+        torch.manual_seed(0)
+        config = transformers.LlamaConfig(
+            vocab_size=32, hidden_size=64, intermediate_size=96, num_hidden_layers=1,
+            num_attention_heads=4, num_key_value_heads=2,
+        )
+        model = transformers.LlamaForCausalLM(config).to(torch.bfloat16)
+        model.save_pretrained(str(tmp_path / 'bf16'))
+        words = ["[UNK]", "hello", "world", "npu", "int8"]
+        backend = Tokenizer(models.WordLevel({w: i for i, w in enumerate(words)}, unk_token="[UNK]"))
+        backend.pre_tokenizer = pre_tokenizers.Whitespace()
+        transformers.PreTrainedTokenizerFast(tokenizer_object=backend, unk_token="[UNK]").save_pretrained(
+            str(tmp_path / 'bf16')
+        )
+
+        summary = quantize_checkpoint(
+            str(tmp_path / 'bf16'), str(tmp_path / 'w8a8'), 'w8a8',
+            calib_prompts=["hello world", "npu int8 hello"], verify=True
+        )
+        assert summary['quantized_tensors'] == 7
+
+        original = load_file(str(tmp_path / 'bf16' / 'model.safetensors'))
+        output = load_file(str(tmp_path / 'w8a8' / 'model.safetensors'))
+        prefix = 'model.layers.0.mlp.down_proj'
+        assert output[f'{prefix}.weight'].dtype == torch.int8
+        assert output[f'{prefix}.weight_scale'].shape == (64, 1)
+        assert output[f'{prefix}.deq_scale'].shape == (64,)
+        assert output[f'{prefix}.quant_bias'].dtype == torch.int32
+        assert output[f'{prefix}.input_scale'].shape == (1,)
+        assert output[f'{prefix}.input_scale'].item() > 0
+        assert 'model.layers.0.self_attn.q_proj.input_offset' in output
+        assert output['lm_head.weight'].dtype == torch.bfloat16
+
+        description = json.loads((tmp_path / 'w8a8' / 'quant_model_description.json').read_text())
+        assert description['model_quant_type'] == 'W8A8'
+        assert description[f'{prefix}.input_scale'] == 'W8A8'
+        saved_config = json.loads((tmp_path / 'w8a8' / 'config.json').read_text())
+        assert saved_config['hidden_size'] == 64
+
+        # 从输出目录重新加载并反量化，误差与量化时的验证一致
+        restored = dequantize_weight(output[f'{prefix}.weight'], output[f'{prefix}.weight_scale'])
+        reference = original[f'{prefix}.weight'].float()
+        error = ((restored - reference).norm() / reference.norm()).item()
+        assert error < 0.02
+        assert error <= summary['max_relative_error'] + 1e-6
+
+    def test_w8a8_transformers_version_check(self, tmp_path, monkeypatch):
+        """测试w8a8校准在transformers不支持模型架构时给出明确错误"""
+        transformers = pytest.importorskip('transformers')
+        from quantize import check_calibration_support
+
+        _write_tiny_model(tmp_path / 'qwen3')
+        config = json.loads((tmp_path / 'qwen3' / 'config.json').read_text())
+        (tmp_path / 'qwen3' / 'config.json').write_text(json.dumps(dict(config, model_type='qwen3')))
+
+        monkeypatch.setattr(transformers, '__version__', '4.37.2')
+        with pytest.raises(RuntimeError, match=r'transformers>=4\.51\.0.*--quant-type w8a16'):
+            check_calibration_support(str(tmp_path / 'qwen3'))
+
+        (tmp_path / 'qwen3' / 'config.json').write_text(json.dumps(dict(config, model_type='no_such_arch')))
+        with pytest.raises(RuntimeError, match='no_such_arch'):
+            check_calibration_support(str(tmp_path / 'qwen3'))
+
+        (tmp_path / 'qwen3' / 'config.json').write_text(json.dumps(dict(config, model_type='llama')))
+        check_calibration_support(str(tmp_path / 'qwen3'))
+
+    def test_w8a8_requires_calibration(self):
+        """测试w8a8量化需要激活校准结果"""
+        pytest.importorskip('torch')
+        from quantize import quantize_state_dict
+
+        state_dict = _tiny_state_dict()
+        with pytest.raises(ValueError):
+            quantize_state_dict(state_dict, 'w8a8')
+
+        amax = {'model.layers.0.self_attn.q_proj': 4.0, 'model.layers.0.mlp.up_proj': 2.0}
+        quantized, description = quantize_state_dict(state_dict, 'w8a8', amax)
+        assert quantized['model.layers.0.self_attn.q_proj.input_scale'].item() == pytest.approx(4.0 / 127)
+        assert quantized['model.layers.0.mlp.up_proj.deq_scale'].shape == (96,)
+        assert description['model.layers.0.mlp.up_proj.quant_bias'] == 'W8A8'
+
+
+class TestComparisonMetrics:
+    """对比指标测试类"""
+
+    def test_memory_headroom(self, tmp_path):
+        """测试权重节省折算的额外并发数"""
+        _write_tiny_model(tmp_path / 'bf16')
+        _write_tiny_model(tmp_path / 'w8a8')
+        (tmp_path / 'bf16' / 'model.safetensors').write_bytes(b'\0' * 4 * 2 ** 20)
+        (tmp_path / 'w8a8' / 'model.safetensors').write_bytes(b'\0' * 2 * 2 ** 20)
+
+        # 每token KV = 2 * 2层 * 2 KV头 * 16维 * 2字节 = 256B，1024 token = 256KB/序列
+        headroom = memory_headroom(str(tmp_path / 'bf16'), str(tmp_path / 'w8a8'), max_model_len=1024)
+        assert headroom['saved_pct'] == pytest.approx(50.0)
+        assert headroom['kv_cache_mb_per_seq'] == pytest.approx(0.25)
+        assert headroom['extra_max_num_seqs'] == 8
+
+    def test_output_divergence(self):
+        """测试输出偏差指标"""
+        result = output_divergence(["abcd", "same"], ["abxy", "same"])
+        assert result['exact_match_rate'] == 0.5
+        assert result['mean_prefix_agreement'] == pytest.approx(0.75)
+        assert 0.5 < result['mean_similarity'] < 1.0
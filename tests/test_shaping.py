@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token Budget Shaping Tests for vLLM-Ascend
+网关token预算整形测试（无需NPU）
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from shaping import TokenBudgetShaper
+
+
+class WordTokenizer:
+    """按空格切分的简易tokenizer，记录每次批量编码的大小"""
+
+    def __init__(self):
+        self.batches = []
+        self.render_threads = []
+
+    def __call__(self, texts, add_special_tokens=True):
+        self.batches.append(len(texts))
+        extra = [0] if add_special_tokens else []
+        return {'input_ids': [extra + list(range(len(t.split()))) for t in texts]}
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        self.render_threads.append(threading.current_thread())
+        return ' '.join(f"<{m['role']}> {m['content']}" for m in messages) + ' <assistant>'
+
+
+def _shaper(**kwargs):
+    return TokenBudgetShaper(WordTokenizer(), max_model_len=16, default_max_tokens=8, **kwargs)
+
+
+class TestTokenBudget:
+    """token预算测试类"""
+
+    def test_clamp_to_remaining_budget(self):
+        """测试max_tokens截断到剩余上下文"""
+        payload = {'prompt': 'a b c d e f g h i', 'max_tokens': 100}
+        result = _shaper().shape(payload)
+
+        assert result['prompt_tokens'] == 10
+        assert payload['max_tokens'] == 6
+        assert result['clamped'] and not result['defaulted']
+
+    def test_default_max_tokens(self):
+        """测试未指定max_tokens时使用模式默认值"""
+        payload = {'prompt': 'hello'}
+        result = _shaper().shape(payload)
+
+        assert payload['max_tokens'] == 8
+        assert result['defaulted'] and not result['clamped']
+
+    def test_within_budget_unchanged(self):
+        """测试预算内的请求保持不变"""
+        payload = {'prompt': 'hello', 'max_tokens': 4}
+        result = _shaper().shape(payload)
+        assert payload['max_tokens'] == 4
+        assert not result['clamped']
+
+    @pytest.mark.parametrize("payload", [
+        {'prompt': ' '.join(['x'] * 16)},
+        {'prompt': 'hello', 'max_tokens': 0},
+        {'prompt': 'hello', 'max_tokens': '10'},
+    ])
+    def test_reject(self, payload):
+        """测试超长提示词和非法max_tokens被拒绝"""
+        with pytest.raises(ValueError):
+            _shaper().shape(payload)
+
+    def test_token_id_prompts(self):
+        """测试token ID形式的提示词不经过tokenizer"""
+        shaper = _shaper()
+        payload = {'prompt': [[1, 2, 3], [4, 5, 6, 7, 8, 9, 10, 11, 12, 13]], 'max_tokens': 10}
+        result = shaper.shape(payload)
+
+        assert shaper.tokenizer.batches == []
+        assert result['prompt_tokens'] == 13
+        assert payload['max_tokens'] == 6
+
+    def test_chat_messages(self):
+        """测试chat请求按模板渲染后计数"""
+        payload = {'messages': [{'role': 'user', 'content': 'hi there'}], 'max_tokens': 100}
+        result = _shaper().shape(payload, chat=True)
+
+        assert result['prompt_tokens'] == 4
+        assert payload['max_tokens'] == 12
+
+    def test_no_prompt(self):
+        """测试无法识别提示词时交给引擎处理"""
+        assert _shaper().shape({'max_tokens': 10}) is None
+
+
+class TestBatchedShaping:
+    """批量编码测试类"""
+
+    def test_concurrent_requests_batched(self):
+        """测试并发请求合并为一次编码"""
+        shaper = _shaper(batch_wait_ms=50)
+        payloads = [{'prompt': ' '.join(['w'] * i), 'max_tokens': 100} for i in range(1, 6)]
+
+        async def run():
+            try:
+                return await asyncio.gather(*(shaper.shape_async(p) for p in payloads))
+            finally:
+                await shaper.close()
+
+        results = asyncio.run(run())
+
+        assert shaper.tokenizer.batches == [5]
+        assert [r['prompt_tokens'] for r in results] == [2, 3, 4, 5, 6]
+        assert [p['max_tokens'] for p in payloads] == [14, 13, 12, 11, 10]
+
+    def test_batch_size_limit(self):
+        """测试单批数量不超过max_batch_size"""
+        shaper = _shaper(batch_wait_ms=50, max_batch_size=2)
+
+        async def run():
+            try:
+                await asyncio.gather(*(shaper.shape_async({'prompt': 'a'}) for _ in range(5)))
+            finally:
+                await shaper.close()
+
+        asyncio.run(run())
+        assert sum(shaper.tokenizer.batches) == 5
+        assert max(shaper.tokenizer.batches) <= 2
+
+    def test_chat_template_rendered_off_loop(self):
+        """测试chat模板与编码一起在线程池中渲染"""
+        shaper = _shaper(batch_wait_ms=50)
+        payloads = [
+            {'messages': [{'role': 'user', 'content': 'hi there'}]},
+            {'prompt': 'a b c'},
+        ]
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    shaper.shape_async(payloads[0], chat=True), shaper.shape_async(payloads[1])
+                )
+            finally:
+                await shaper.close()
+
+        results = asyncio.run(run())
+        assert [r['prompt_tokens'] for r in results] == [4, 4]
+        assert shaper.tokenizer.render_threads
+        assert threading.current_thread() not in shaper.tokenizer.render_threads
+
+    def test_bad_request_does_not_fail_batch(self):
+        """测试同一批中格式错误的请求只让自己失败"""
+        shaper = _shaper(batch_wait_ms=50)
+        good = {'messages': [{'role': 'user', 'content': 'hi there'}]}
+        bad = {'messages': ['oops']}
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    shaper.shape_async(good, chat=True), shaper.shape_async(bad, chat=True),
+                    return_exceptions=True,
+                )
+            finally:
+                await shaper.close()
+
+        good_result, bad_result = asyncio.run(run())
+        assert good_result['prompt_tokens'] == 4
+        assert isinstance(bad_result, TypeError)
+
+    def test_rejection_propagates(self):
+        """测试异步路径同样拒绝超长请求"""
+        shaper = _shaper()
+
+        async def run():
+            try:
+                await shaper.shape_async({'prompt': ' '.join(['x'] * 20)})
+            finally:
+                await shaper.close()
+
+        with pytest.raises(ValueError):
+            asyncio.run(run())
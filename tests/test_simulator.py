@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Engine Simulator Tests for vLLM-Ascend
+引擎模拟器的调度、KV Cache、校准和接口测试（无需NPU）
+"""
+
+import json
+import random
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestServer, TestClient
+
+import simulator
+from utils import parse_prometheus_metrics, metric_total
+from simulator import (
+    EngineSimulator,
+    SimulatorServer,
+    SimRequest,
+    DEFAULT_PROFILE,
+    calibrate,
+    estimate_prompt_tokens,
+)
+
+MODEL = "/models/qwen3-0.6b"
+
+
+def _engine(**kwargs):
+    defaults = dict(max_num_seqs=4, max_model_len=256, block_size=16, time_scale=0.01)
+    defaults.update(kwargs)
+    return EngineSimulator(dict(DEFAULT_PROFILE), **defaults)
+
+
+async def _drain(request):
+    pieces = []
+    while True:
+        piece = await request.tokens.get()
+        if piece is None:
+            return pieces
+        pieces.append(piece)
+
+
+def _records(per_token, ttft, tokens=50, prompt_tokens=None, n=20):
+    return [{
+        "success": True,
+        "ttft": ttft,
+        "latency": ttft + per_token * (tokens - 1),
+        "generated_tokens": tokens,
+        "prompt_tokens": prompt_tokens,
+    } for _ in range(n)]
+
+
+class TestEngine:
+    """调度与KV Cache测试类"""
+
+    def test_continuous_batching_limit(self):
+        """测试运行中的请求数不超过max_num_seqs，且全部完成"""
+        engine = _engine()
+        peak = []
+
+        async def run():
+            engine.start()
+            requests = [SimRequest(str(i), 10, 8, random.Random(i)) for i in range(10)]
+            for request in requests:
+                engine.submit(request)
+            original_step = engine.step
+
+            async def step():
+                peak.append(len(engine.running))
+                await original_step()
+            engine.step = step
+            outputs = await asyncio.gather(*(_drain(r) for r in requests))
+            await engine.stop()
+            return outputs
+
+        outputs = asyncio.run(run())
+        assert max(peak) <= 4
+        assert [len(o) for o in outputs] == [8] * 10
+        assert engine.success_total == 10
+        assert engine.free_blocks == engine.num_gpu_blocks
+
+    def test_preemption_when_kv_exhausted(self):
+        """测试KV Cache不足时抢占并在之后完成"""
+        # 4个块（64 token），两个请求各需要 3 个块
+        engine = _engine(num_gpu_blocks=4)
+
+        async def run():
+            engine.start()
+            requests = [SimRequest(str(i), 14, 30, random.Random(i)) for i in range(2)]
+            for request in requests:
+                engine.submit(request)
+            outputs = await asyncio.gather(*(_drain(r) for r in requests))
+            await engine.stop()
+            return outputs
+
+        outputs = asyncio.run(run())
+        assert engine.num_preemptions > 0
+        assert [len(o) for o in outputs] == [30, 30]
+        assert engine.free_blocks == 4
+
+    def test_step_durations(self, monkeypatch):
+        """测试prefill按token数、解码步按批大小计时"""
+        durations = []
+        real_sleep = asyncio.sleep
+
+        async def record(seconds):
+            durations.append(seconds)
+            await real_sleep(0)
+        monkeypatch.setattr(simulator.asyncio, 'sleep', record)
+
+        engine = _engine(time_scale=1.0)
+
+        async def run():
+            engine.start()
+            requests = [SimRequest(str(i), 10, 3, random.Random(i)) for i in range(3)]
+            for request in requests:
+                engine.submit(request)
+            await asyncio.gather(*(_drain(r) for r in requests))
+            await engine.stop()
+
+        asyncio.run(run())
+        profile = DEFAULT_PROFILE
+        # 一次prefill（3个请求共30个token），之后两个解码步（批大小3）
+        assert durations == pytest.approx([
+            profile['prefill_base'] + 30 * profile['prefill_per_token'],
+            profile['decode_base'] + 3 * profile['decode_per_seq'],
+            profile['decode_base'] + 3 * profile['decode_per_seq'],
+        ])
+
+    def test_prompt_token_estimate(self):
+        """测试提示词token估计"""
+        assert estimate_prompt_tokens("什么是人工智能？") == 8
+        assert estimate_prompt_tokens("abcdefgh") == 2
+        assert estimate_prompt_tokens("") == 1
+
+
+class TestCalibration:
+    """校准测试类"""
+
+    def test_fit_from_two_concurrency_levels(self):
+        """测试两个并发度的结果拟合解码参数"""
+        results = {
+            "c2": {"concurrency": 2, "records": _records(0.021, 0.05)},
+            "c32": {"concurrency": 32, "records": _records(0.036, 0.05)},
+        }
+        profile, calibrated = calibrate(results, max_num_seqs=64)
+
+        assert calibrated == ['decode_base', 'decode_per_seq']
+        assert profile['decode_base'] == pytest.approx(0.020)
+        assert profile['decode_per_seq'] == pytest.approx(0.0005)
+        assert profile['prefill_base'] == DEFAULT_PROFILE['prefill_base']
+
+    def test_fit_from_several_result_files(self):
+        """测试多个benchmark结果文件（各自只有fast/slow两组）合并拟合"""
+        results = [
+            {"fast": {"concurrency": 2, "records": _records(0.021, 0.03, prompt_tokens=50)},
+             "slow": {"concurrency": 2, "records": _records(0.021, 0.13, prompt_tokens=1050)}},
+            {"fast": {"concurrency": 32, "records": _records(0.036, 0.03, prompt_tokens=50)},
+             "slow": {"concurrency": 32, "records": _records(0.036, 0.13, prompt_tokens=1050)}},
+        ]
+        profile, calibrated = calibrate(results, max_num_seqs=64)
+
+        assert calibrated == ['decode_base', 'decode_per_seq', 'prefill_base', 'prefill_per_token']
+        assert profile['decode_base'] == pytest.approx(0.020)
+        assert profile['decode_per_seq'] == pytest.approx(0.0005)
+        assert profile['prefill_per_token'] == pytest.approx(0.0001)
+
+    def test_single_point_scales_defaults(self):
+        """测试单个数据点时按默认比例缩放"""
+        stats = {"concurrency": 10, "records": _records(0.058, 0.05)}
+        profile, _ = calibrate(stats, max_num_seqs=64)
+
+        assert profile['decode_base'] + 10 * profile['decode_per_seq'] == pytest.approx(0.058)
+        ratio = DEFAULT_PROFILE['decode_per_seq'] / DEFAULT_PROFILE['decode_base']
+        assert profile['decode_per_seq'] / profile['decode_base'] == pytest.approx(ratio)
+
+    def test_prefill_from_prompt_tokens(self):
+        """测试流式结果中的prompt_tokens用于拟合prefill"""
+        results = {
+            "short": {"concurrency": 1, "records": _records(0.03, 0.03, prompt_tokens=50)},
+            "long": {"concurrency": 1, "records": _records(0.03, 0.13, prompt_tokens=1050)},
+        }
+        profile, calibrated = calibrate(results, max_num_seqs=64)
+
+        assert 'prefill_per_token' in calibrated
+        assert profile['prefill_per_token'] == pytest.approx(0.0001)
+        assert profile['prefill_base'] == pytest.approx(0.025)
+
+    def test_non_streaming_results_keep_defaults(self):
+        """测试没有TTFT的结果不改变参数"""
+        records = [dict(r, ttft=None) for r in _records(0.03, 0.05)]
+        profile, calibrated = calibrate({"fast": {"concurrency": 4, "records": records}}, 64)
+        assert calibrated == []
+        assert profile == DEFAULT_PROFILE
+
+
+class TestSimulatorAPI:
+    """OpenAI兼容接口测试类"""
+
+    def _run(self, scenario, **engine_kwargs):
+        async def run():
+            server = SimulatorServer(_engine(**engine_kwargs), MODEL)
+            client = TestClient(TestServer(server.build_app()))
+            await client.start_server()
+            try:
+                return await scenario(client)
+            finally:
+                await client.close()
+        return asyncio.run(run())
+
+    def test_completion_usage(self):
+        """测试非流式响应和usage"""
+        async def scenario(client):
+            response = await client.post("/v1/completions", json={
+                "model": MODEL, "prompt": "什么是人工智能？", "max_tokens": 12
+            })
+            return response.status, await response.json()
+
+        status, data = self._run(scenario)
+        assert status == 200
+        assert data["choices"][0]["text"]
+        assert data["choices"][0]["finish_reason"] == "length"
+        assert data["usage"] == {"prompt_tokens": 8, "completion_tokens": 12, "total_tokens": 20}
+
+    def test_streaming_sse(self):
+        """测试SSE流式响应"""
+        async def scenario(client):
+            response = await client.post("/v1/completions", json={
+                "model": MODEL, "prompt": "hello", "max_tokens": 5, "stream": True,
+                "stream_options": {"include_usage": True},
+            })
+            body = await response.text()
+            return response.headers["Content-Type"], body
+
+        content_type, body = self._run(scenario)
+        events = [line[len("data: "):] for line in body.splitlines() if line.startswith("data: ")]
+        chunks = [json.loads(e) for e in events[:-1]]
+
+        assert content_type.startswith("text/event-stream")
+        assert events[-1] == "[DONE]"
+        assert len([c for c in chunks if c["choices"]]) == 5
+        assert chunks[4]["choices"][0]["finish_reason"] == "length"
+        assert chunks[-1]["usage"]["completion_tokens"] == 5
+
+    def test_greedy_is_deterministic(self):
+        """测试temperature为0时输出确定"""
+        async def scenario(client):
+            texts = []
+            for _ in range(2):
+                response = await client.post("/v1/completions", json={
+                    "model": MODEL, "prompt": "1 + 1 等于几？", "max_tokens": 10, "temperature": 0
+                })
+                texts.append((await response.json())["choices"][0]["text"])
+            return texts
+
+        first, second = self._run(scenario)
+        assert first == second
+
+    @pytest.mark.parametrize("payload, status", [
+        ({"model": "/invalid/model/path", "prompt": "测试"}, 404),
+        ({"model": MODEL, "max_tokens": 10}, 400),
+        ({"model": MODEL, "prompt": "hi", "max_tokens": 1000}, 400),
+        ({"model": MODEL, "prompt": "hi", "max_tokens": 0}, 400),
+    ])
+    def test_errors(self, payload, status):
+        """测试无效模型、缺少提示词和超长请求"""
+        async def scenario(client):
+            response = await client.post("/v1/completions", json=payload)
+            return response.status, await response.json()
+
+        code, data = self._run(scenario)
+        assert code == status
+        assert data["object"] == "error"
+
+    def test_metrics(self):
+        """测试vLLM同名指标"""
+        async def scenario(client):
+            await client.post("/v1/completions", json={"model": MODEL, "prompt": "hi", "max_tokens": 4})
+            response = await client.get("/metrics")
+            return parse_prometheus_metrics(await response.text())
+
+        metrics = self._run(scenario)
+        assert metric_total(metrics, "vllm:generation_tokens_total") == 4
+        assert metric_total(metrics, "vllm:num_requests_running") == 0
+        assert metric_total(metrics, "vllm:gpu_cache_usage_perc") == 0
+        assert metric_total(metrics, "vllm:time_to_first_token_seconds_count") == 1
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Soak Analysis Tests for vLLM-Ascend
+稳定性测试分析逻辑的单元测试（无需NPU）
+"""
+
+import random
+
+from soak import RollingWindow, fit_trend, detect_drift, percentile
+
+
+def _windows(values, metric, noise=0.0, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"elapsed_hours": i * 0.5, metric: v + rng.gauss(0, noise)}
+        for i, v in enumerate(values)
+    ]
+
+
+class TestTrendAnalysis:
+    """趋势拟合与漂移检测测试类"""
+
+    def test_fit_trend_recovers_slope(self):
+        """测试线性拟合结果"""
+        xs = [float(i) for i in range(10)]
+        ys = [2.0 * x + 1.0 for x in xs]
+        trend = fit_trend(xs, ys)
+
+        assert abs(trend["slope"] - 2.0) < 1e-9
+        assert abs(trend["intercept"] - 1.0) < 1e-9
+        assert trend["p_value"] == 0.0
+
+    def test_detects_p99_creep(self):
+        """测试p99持续上升被标记为漂移"""
+        windows = _windows([1.0 + 0.05 * i for i in range(48)], "latency_p99", noise=0.02)
+        report = {t["metric"]: t for t in detect_drift(windows)}
+
+        assert report["latency_p99"]["drift"]
+        assert report["latency_p99"]["relative_change"] > 0.1
+
+    def test_detects_throughput_decay(self):
+        """测试吞吐下降被标记为漂移，而吞吐上升不会"""
+        decay = _windows([100.0 - i for i in range(48)], "tokens_per_s", noise=1.0)
+        growth = _windows([100.0 + i for i in range(48)], "tokens_per_s", noise=1.0)
+
+        assert detect_drift(decay)[0]["drift"]
+        assert not detect_drift(growth)[0]["drift"]
+
+    def test_stable_metric_is_not_flagged(self):
+        """测试平稳的噪声序列不会误报"""
+        windows = _windows([2048.0] * 48, "rss_mb", noise=20.0, seed=1)
+        assert not detect_drift(windows)[0]["drift"]
+
+    def test_too_few_windows_are_skipped(self):
+        """测试窗口数不足时不做判断"""
+        assert detect_drift(_windows([1.0, 2.0, 3.0], "rss_mb")) == []
+
+
+class TestRollingWindow:
+    """统计窗口测试类"""
+
+    def test_memory_is_bounded(self):
+        """测试延迟样本数量有上限"""
+        window = RollingWindow(0.0, max_samples=100, rng=random.Random(0))
+        for i in range(10000):
+            window.add({"success": True, "latency": i / 10000, "generated_tokens": 2})
+        window.add({"success": False, "latency": 30.0})
+
+        summary = window.summarize(10.0)
+        assert len(window.latencies) == 100
+        assert summary["requests"] == 10001
+        assert summary["errors"] == 1
+        assert summary["tokens_per_s"] == 2000.0
+        assert 0.3 < summary["latency_p50"] < 0.7
+
+    def test_percentile_interpolation(self):
+        """测试分位数插值"""
+        assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+        assert percentile([5.0], 99) == 5.0
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Speculative Decoding Tests for vLLM-Ascend
+投机解码参数生成与接受率统计测试（无需NPU）
+"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import validate_speculative_config, parse_prometheus_metrics
+from server import VLLMServer
+from benchmark import BenchmarkRunner, speculative_stats, per_token_latency, compare_to_baseline
+
+
+def _metrics(accepted, draft, emitted):
+    return parse_prometheus_metrics(
+        f'vllm:spec_decode_num_accepted_tokens_total{{model_name="m"}} {accepted}\n'
+        f'vllm:spec_decode_num_draft_tokens_total{{model_name="m"}} {draft}\n'
+        f'vllm:spec_decode_num_emitted_tokens_total{{model_name="m"}} {emitted}\n'
+    )
+
+
+class TestSpeculativeConfig:
+    """投机解码配置测试类"""
+
+    @pytest.mark.parametrize("spec, valid", [
+        (None, True),
+        ({'enabled': False, 'method': 'unknown'}, True),
+        ({'enabled': True, 'method': 'ngram', 'num_speculative_tokens': 4}, True),
+        ({'enabled': True, 'method': 'ngram', 'num_speculative_tokens': 0}, False),
+        ({'enabled': True, 'method': 'ngram', 'num_speculative_tokens': 4,
+          'ngram_prompt_lookup_min': 5, 'ngram_prompt_lookup_max': 4}, False),
+        ({'enabled': True, 'method': 'draft_model', 'num_speculative_tokens': 4}, False),
+        ({'enabled': True, 'method': 'draft_model', 'num_speculative_tokens': 4,
+          'draft_model': '/models/draft'}, True),
+        ({'enabled': True, 'method': 'medusa', 'num_speculative_tokens': 4}, False),
+    ])
+    def test_validate(self, spec, valid):
+        """测试配置验证"""
+        assert validate_speculative_config(spec) is valid
+
+    def test_disabled_by_default(self):
+        """测试默认配置不启用投机解码"""
+        server = VLLMServer(mode='slow')
+        assert server.build_speculative_args() == []
+        assert '--speculative-model' not in server.build_vllm_args()
+
+    def test_ngram_args(self):
+        """测试n-gram prompt lookup参数"""
+        server = VLLMServer(mode='slow')
+        server.speculative_config.update({'enabled': True, 'method': 'ngram', 'num_speculative_tokens': 5})
+        args = server.build_vllm_args()
+
+        assert args[args.index('--speculative-model') + 1] == '[ngram]'
+        assert args[args.index('--num-speculative-tokens') + 1] == '5'
+        assert '--ngram-prompt-lookup-max' in args
+
+    def test_draft_model_args(self):
+        """测试草稿模型参数"""
+        server = VLLMServer(mode='slow')
+        server.speculative_config.update({
+            'enabled': True, 'method': 'draft_model', 'num_speculative_tokens': 3,
+            'draft_model': '/models/draft',
+        })
+        args = server.build_speculative_args()
+
+        assert args[args.index('--speculative-model') + 1] == '/models/draft'
+        assert '--ngram-prompt-lookup-max' not in args
+
+
+class TestSpeculativeStats:
+    """接受率统计测试类"""
+
+    def test_counter_deltas(self):
+        """测试根据计数器增量计算接受率和每步接受token数"""
+        # 10步 * 4个草稿token，共接受24个，输出24 + 10个token
+        stats = speculative_stats(_metrics(100, 200, 150), _metrics(124, 240, 184), 4)
+
+        assert stats['acceptance_rate'] == pytest.approx(0.6)
+        assert stats['mean_accepted_per_step'] == pytest.approx(2.4)
+        assert stats['mean_tokens_per_step'] == pytest.approx(3.4)
+
+    def test_accepted_after_rejection_not_emitted(self):
+        """测试第一个拒绝位置之后被接受的草稿token不影响步数"""
+        # 10步 * 4个草稿token：接受24个，其中6个位于被拒绝位置之后未输出，输出18 + 10个token
+        stats = speculative_stats(_metrics(0, 0, 0), _metrics(24, 40, 28), 4)
+
+        assert stats['mean_accepted_per_step'] == pytest.approx(2.4)
+        assert stats['mean_tokens_per_step'] == pytest.approx(2.8)
+
+    def test_missing_counters(self):
+        """测试服务端未启用投机解码时不输出统计"""
+        assert speculative_stats({}, {}, 4) is None
+        assert speculative_stats(_metrics(0, 0, 0), _metrics(0, 0, 0), 4) is None
+        assert speculative_stats(_metrics(0, 0, 0), _metrics(24, 40, 28), None) is None
+
+    def test_stream_token_count_from_usage(self):
+        """测试流式响应以usage计数，一个chunk可以包含多个token"""
+        events = [
+            {"choices": [{"text": "投机解码"}], "usage": None},
+            {"choices": [{"text": "一次多个token"}], "usage": None},
+            {"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 9}},
+        ]
+        lines = [b"data: " + json.dumps(e).encode() for e in events] + [b"data: [DONE]"]
+        response = SimpleNamespace(iter_lines=lambda: iter(lines))
+
+        text, ttft, tokens, prompt_tokens = BenchmarkRunner._read_stream(response, time.time())
+        assert text == "投机解码一次多个token"
+        assert ttft is not None
+        assert (tokens, prompt_tokens) == (9, 7)
+
+        # 服务端不返回usage时按chunk计数
+        response = SimpleNamespace(iter_lines=lambda: iter(lines[:2]))
+        assert BenchmarkRunner._read_stream(response, time.time())[2:] == (2, None)
+
+    def test_per_token_latency(self):
+        """测试流式与非流式请求的每token延迟"""
+        assert per_token_latency({"success": True, "latency": 1.1, "ttft": 0.1,
+                                  "generated_tokens": 11}) == pytest.approx(0.1)
+        assert per_token_latency({"success": True, "latency": 1.0, "generated_tokens": 4}) == 0.25
+        assert per_token_latency({"success": False, "latency": 1.0}) is None
+
+    def test_compare_to_baseline(self):
+        """测试与基线运行的加速比"""
+        baseline = {"per_token_latency": {"mean": 0.02}, "tokens": {"total": 1000}, "total_time": 10.0}
+        stats = {"per_token_latency": {"mean": 0.01}, "tokens": {"total": 1000}, "total_time": 5.0}
+
+        comparison = compare_to_baseline(stats, baseline)
+        assert comparison['per_token_speedup'] == pytest.approx(2.0)
+        assert comparison['throughput_speedup'] == pytest.approx(2.0)
+        assert compare_to_baseline(stats, {}) is None
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tracing Tests for vLLM-Ascend
+请求追踪单元测试（无需NPU）
+"""
+
+import json
+import threading
+
+import pytest
+
+from tracing import Tracer, trace_id_for, new_request_id, NOOP_SPAN
+
+
+class TestTracer:
+    """追踪器测试类"""
+
+    def test_trace_id_is_derived_from_request_id(self):
+        """测试同一请求ID在不同组件中得到相同的trace_id"""
+        request_id = new_request_id()
+        assert trace_id_for(request_id) == trace_id_for(request_id)
+        assert len(trace_id_for(request_id)) == 32
+
+    def test_sampling_is_deterministic(self, tmp_path):
+        """测试采样结果只取决于请求ID"""
+        a = Tracer("a", output_path=str(tmp_path / "a.jsonl"), sample_rate=0.5)
+        b = Tracer("b", output_path=str(tmp_path / "b.jsonl"), sample_rate=0.5)
+        ids = [new_request_id() for _ in range(200)]
+
+        assert [a.is_sampled(i) for i in ids] == [b.is_sampled(i) for i in ids]
+        assert 0 < sum(a.is_sampled(i) for i in ids) < 200
+
+    def test_disabled_tracer_returns_noop_span(self):
+        """测试未启用时不记录span"""
+        tracer = Tracer("noop", enabled=False)
+        assert tracer.start_span("x", new_request_id()) is NOOP_SPAN
+        assert tracer.flush() == 0
+
+    def test_export_otlp_json(self, tmp_path):
+        """测试导出的文件符合OTLP JSON结构"""
+        output = tmp_path / "traces.jsonl"
+        tracer = Tracer("gateway", output_path=str(output), sample_rate=1.0)
+        request_id = new_request_id()
+
+        with tracer.span("root", request_id) as root:
+            with tracer.span("child", request_id, parent=root, attributes={"tokens": 3}):
+                pass
+        with pytest.raises(RuntimeError):
+            with tracer.span("failed", request_id):
+                raise RuntimeError("boom")
+        assert tracer.flush() == 3
+
+        payload = json.loads(output.read_text(encoding='utf-8').strip())
+        resource_spans = payload["resourceSpans"][0]
+        assert resource_spans["resource"]["attributes"][0]["value"]["stringValue"] == "gateway"
+
+        spans = {s["name"]: s for s in resource_spans["scopeSpans"][0]["spans"]}
+        assert spans["child"]["parentSpanId"] == spans["root"]["spanId"]
+        assert spans["child"]["traceId"] == trace_id_for(request_id)
+        assert {"key": "tokens", "value": {"intValue": "3"}} in spans["child"]["attributes"]
+        assert spans["failed"]["status"] == {"code": 2, "message": "boom"}
+        assert int(spans["root"]["endTimeUnixNano"]) >= int(spans["root"]["startTimeUnixNano"])
+
+    def test_auto_flush_runs_off_caller_thread(self, tmp_path):
+        """测试自动写盘在后台线程执行，close等待写盘完成"""
+        output = tmp_path / "traces.jsonl"
+        tracer = Tracer("gateway", output_path=str(output), sample_rate=1.0, flush_every=2)
+        writers = []
+        original_write = tracer._write
+
+        def write(spans):
+            writers.append(threading.current_thread())
+            return original_write(spans)
+        tracer._write = write
+
+        request_id = new_request_id()
+        for name in ("a", "b", "c"):
+            tracer.start_span(name, request_id).end()
+        tracer.close()
+
+        assert writers[0] is not threading.current_thread()
+        lines = output.read_text(encoding='utf-8').splitlines()
+        names = [s["name"] for line in lines
+                 for s in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+        assert names == ["a", "b", "c"]
+
+    def test_launcher_span_from_entrypoint(self, tmp_path):
+        """测试entrypoint.sh路径通过server.py记录launcher.setup span"""
+        from server import VLLMServer
+
+        output = tmp_path / "launcher.jsonl"
+        server = VLLMServer(mode='fast')
+        server.tracer = Tracer("vllm-launcher-fast", output_path=str(output), sample_rate=0.1)
+        server.record_launch(['--model', '/models/qwen3-0.6b', '--tensor-parallel-size', '1'], start_ns=1000)
+
+        span = json.loads(output.read_text(encoding='utf-8'))["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert span["name"] == "launcher.setup"
+        assert span["startTimeUnixNano"] == "1000"
+        assert {"key": "launcher.vllm_args",
+                "value": {"stringValue": "--model /models/qwen3-0.6b --tensor-parallel-size 1"}} in span["attributes"]